@@ -202,15 +202,44 @@ function searchOne(tl, clear=true) {
 }
 
 function searchAll(clear=true) {
-    // Handler for searching all timelines
-    var params = 'searchterms=' + document.getElementById('searchterms').value;
+    // Handler for searching all timelines, in one request
+    var names = [];
 
     for (tl in depScrub) {
         if (depScrub[tl].status != "READY") continue;
         if (faces.includes(tl)) continue;
 
         if (clear) clearResults(tl);
-        searchTimeline(tl, params);
+        names.push(tl);
+    }
+
+    if (names.length == 0) return;
+
+    var params = 'searchterms=' + document.getElementById('searchterms').value + '&timelines=' + names.join(',');
+
+    console.log("Searching " + names.join(", ") + ": " + params);
+    doPost('search', params, addAllResults);
+}
+
+function addAllResults(results) {
+    // Adds the results of a search of several timelines, given as
+    // {timeline: [[start, end, snippet text, highlights], ...]}
+
+    if (results == null) {
+        console.log("No results found.");
+        return;
+    }
+
+    for (var tl in results) {
+        var converted = [];
+
+        for (var i = 0; i < results[tl].length; i++) {
+            var result = results[tl][i];
+            var snippet = result.length > 2 ? {text: result[2], highlights: result[3]} : null;
+            converted.push({start: result[0], end: result[1], snippet: snippet});
+        }
+
+        if (converted.length > 0) addResults(converted, [tl]);
     }
 }
 
@@ -445,12 +474,30 @@ function addResults(results, args) {
     console.log("Adding " + results.length + " results to " + timeline);
 
     for (var result in results) {
-        if (args.length > 1) addResultToTimeline(timeline, results[result].start, results[result].end, args[1]);
-        else addResultToTimeline(timeline, results[result].start, results[result].end);
+        var tag = snippetText(results[result].snippet);
+        if (args.length > 1) addResultToTimeline(timeline, results[result].start, results[result].end, args[1], tag);
+        else addResultToTimeline(timeline, results[result].start, results[result].end, "#FFDD00", tag);
     }
     
 }
 
+function snippetText(snippet) {
+    // Returns a result's snippet text with the matched words in [brackets]
+
+    if (!snippet) return "";
+
+    var text = snippet.text;
+
+    // work backwards so earlier offsets stay valid
+    for (var i = snippet.highlights.length - 1; i >= 0; i--) {
+        var start = snippet.highlights[i][0];
+        var end = snippet.highlights[i][1];
+        text = text.slice(0, start) + "[" + text.slice(start, end) + "]" + text.slice(end);
+    }
+
+    return text;
+}
+
 function addResultToTimeline(tl, start, end, colour = "#FFDD00", tag = "") {
     // Adds a given result to a given timeline, with optional tag and colour
 
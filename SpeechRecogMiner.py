@@ -291,9 +291,10 @@ class SpeechRecogMiner(DataMiner):
         :param chunkList: List of AudioChunk objects
         :param nThreads: Number of worker threads to use for SpeechRecognition (will be equal to number of CPU cores if
         nThreads is -1).
-        :return: returns a list of SRTChunk objects
+        :return: returns a ChunkTable of the transcribed chunks
         """
         from copy import deepcopy
+        from chunker import ChunkTable
 
         self.tempSRTChunkList = [] # Clear temp list
 
@@ -328,10 +329,11 @@ class SpeechRecogMiner(DataMiner):
         if self.returnStatus != ERROR:
             self.returnStatus = READY
 
-        # Order the tempSRTChunkList by startTime before returning it.
+        # Order the tempSRTChunkList by startTime, and store it as one table
+        # rather than an object per chunk.
         self.tempSRTChunkList.sort(key=lambda x: x.startTime)
 
-        return self.tempSRTChunkList, self.returnStatus
+        return ChunkTable(self.tempSRTChunkList), self.returnStatus
 
 
     def thread_build(self, *args):
@@ -379,6 +381,10 @@ class SpeechRecogMiner(DataMiner):
             
             if chunk != None:
                 chunks.append(chunk)
+
+                # Let the pipeline index this chunk while the rest are transcribed
+                if self.publish is not None:
+                    self.publish([chunk])
             else:
                 print "SpeechRecog Error: Problem occurred processing file " + c.fname
                 self.returnStatus = ERROR
@@ -449,8 +455,11 @@ class AudioSplitSpeechRecog(DataMiner):
             print "AudioSplitSpeechRecog: Audio splitter error, returning None."
             return None, ERROR
 		
-        # Populate and return a series of SRTChunk objects.
+        # Populate and return a series of SRTChunk objects, publishing
+        # each as it is transcribed.
+        self.SRMiner.publish = self.publish
         srtChunks, status = self.SRMiner.build(listOfPaths, nThreads=self.nThreads)
+        self.SRMiner.publish = None
         
         if status == ERROR:
             print "AudioSplitSpeechRecog: SpeechRecog error, returning None."
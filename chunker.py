@@ -17,6 +17,8 @@
 """
 
 import re
+from array import array
+from tokeniser import uniqueWords
 
 class SRTChunk:
 	""" Defines a Chunk of an SRT file - some content that exists between
@@ -29,73 +31,254 @@ class SRTChunk:
 
 	def getFullText(self):
 		return " ".join(self.content)
-		
 
-class SRTChunker:
-	""" Takes a .srt subtitle file and converts it into an array of Chunks and
-		a reverse-indexed lookup table by whole words """
+class ChunkView(object):
+	""" Lightweight view of one chunk in a ChunkTable, with the same
+		startTime, endTime, content and getFullText() as an SRTChunk """
 
-	file = 0
-	chunks = []
+	__slots__ = ('table', 'index')
 
-	words = {}
+	def __init__(self, table, index):
+		self.table = table
+		self.index = index
 
-	def __init__(self, filename):
-		""" Reads provided file, chunks it and runs tagWords on each chunk """
+	def __getstate__(self):
+		return (self.table, self.index)
+
+	def __setstate__(self, state):
+		self.table, self.index = state
+
+	@property
+	def startTime(self):
+		return self.table.starts[self.index]
+
+	@property
+	def endTime(self):
+		return self.table.ends[self.index]
+
+	@property
+	def content(self):
+		return self.table.getText(self.index).split("\n")
+
+	def getFullText(self):
+		return self.table.getText(self.index).replace("\n", " ")
+
+class ChunkTable(object):
+	""" Columnar store of chunks: start and end times in two arrays, and
+		every chunk's lines in one UTF-8 text buffer, the i'th chunk's
+		being text[offsets[i]:offsets[i+1]], joined by newlines.
+
+		Indexing or iterating over the table gives one ChunkView per
+		chunk, always the same object for the same chunk, so views can
+		be used wherever SRTChunks are, including in posting lists.
+	"""
+
+	def __init__(self, chunks=()):
+		""" Builds a table holding a copy of each of the given chunks """
+
+		self.starts = array('d')
+		self.ends = array('d')
+		self.text = ''
+		self.offsets = array('l', [0])
+		self.views = []
+
+		self.pending = [] # texts appended since self.text was last joined
+		self.pendingLength = 0
+
+		for chunk in chunks:
+			self.append(chunk.startTime, chunk.endTime, chunk.content)
+
+	def __getstate__(self):
+		""" Pickles arrays as raw bytes rather than lists of floats """
+
+		self.join()
+		state = self.__dict__.copy()
+		for key in ('starts', 'ends', 'offsets'):
+			state[key] = (state[key].typecode, state[key].tostring())
+		return state
+
+	def __setstate__(self, state):
+		for key in ('starts', 'ends', 'offsets'):
+			state[key] = array(*state[key])
+		self.__dict__.update(state)
+
+	def __len__(self):
+		return len(self.views)
+
+	def __getitem__(self, index):
+		return self.views[index]
+
+	def __iter__(self):
+		return iter(self.views)
+
+	def append(self, startTime, endTime, lines):
+		""" Adds a chunk with the given times and lines of content, and
+			returns its view """
+
+		text = "\n".join(lines)
+
+		# the buffer holds bytes, so offsets stay valid whatever the mix
+		# of byte and unicode strings appended
+		if isinstance(text, unicode):
+			text = text.encode('utf-8')
+
+		self.starts.append(startTime)
+		self.ends.append(endTime)
+		self.pending.append(text)
+		self.pendingLength += len(text)
+		self.offsets.append(len(self.text) + self.pendingLength)
+
+		view = ChunkView(self, len(self.views))
+		self.views.append(view)
+		return view
+
+	def join(self):
+		""" Moves appended texts into the text buffer """
+
+		if not self.pending:
+			return
+
+		self.text = ''.join([self.text] + self.pending)
+
+		self.pending = []
+		self.pendingLength = 0
+
+	def getText(self, index):
+		""" Returns the lines of the index'th chunk, joined by newlines """
 
-		with open(filename, "r") as file:
-			chunk = None
-			identifier = True # sentinel for skipping Identifier lines
+		# chunks are usually read just after being appended, e.g. to be
+		# indexed, so pending texts are read without joining the buffer
+		first = len(self.views) - len(self.pending)
+		if index >= first:
+			return self.pending[index - first]
+
+		if self.pending:
+			self.join()
+		return self.text[self.offsets[index]:self.offsets[index + 1]]
 		
+
+# HTML-style codes, e.g. <i>...</i>, stripped from subtitle lines
+htmlCodes = re.compile(r"<.*?>")
+
+def timestampToSeconds(timestamp):
+	""" Takes a timestamp in .srt (hh:mm:ss,mmm) or .vtt (hh:mm:ss.mmm
+		or mm:ss.mmm) format and converts it to a (float) number of
+		seconds """
+
+	timestamp, millis = timestamp.replace(",", ".").split(".")
+
+	seconds = 0
+	for part in timestamp.split(":"):
+		seconds = seconds*60 + int(part)
+
+	return seconds + float(millis)/1000
+
+def readLines(data):
+	""" Yields the lines of 'data', which is either a filename, read a
+		line at a time, or any iterable of lines such as an open file """
+
+	if isinstance(data, basestring):
+		with open(data, "r") as file:
 			for line in file:
-				line = line.strip() # trims leading/trailing whitespace etc.
+				yield line
+	else:
+		for line in data:
+			yield line
+
+def readSRT(data):
+	""" Yields an SRTChunk for each subtitle in 'data', a filename or
+		iterable of lines in .srt format, as soon as its last line is
+		read.  Only the current chunk is held, so memory does not grow
+		with the length of the file. """
+
+	chunk = None
+	identifier = True # sentinel for skipping Identifier lines
+
+	for line in readLines(data):
+		line = line.strip() # trims leading/trailing whitespace etc.
+
+		# strip out HTML-style codes
+		line = htmlCodes.sub("", line)
+
+		if ("-->" in line):
+			if chunk:			# if we have an existing chunk, yield it...
+				yield chunk
+
+			chunk = SRTChunk()		# ... and make a new one
+			chunk.startTime, chunk.endTime = map(timestampToSeconds, line.split(" --> "))
+
+		elif identifier == True: 		# skip message identifier lines following blank lines
+			identifier = False
+
+		elif line != "":			# append line to content
+			if chunk:
+				chunk.content.append(line)
+
+		else:					# blank line found, skip next identifier line
+			identifier = True
 
-				# strip out HTML-style codes
-				line = re.sub(r"<.+>", "", line)
+	if chunk:
+		yield chunk
 
-				if ("-->" in line):
-					if chunk:			# if we have an existing chunk, save it...
-						self.tagWords(chunk)	# Add chunk reference to words in chunk
-						self.chunks.append(chunk)
+def readVTT(data):
+	""" Yields an SRTChunk for each cue in 'data', a filename or iterable
+		of lines in .vtt (as .vss) format, as readSRT() does """
 
-					chunk = SRTChunk()		# ... and make a new one
+	chunk = None
+	skip = True # skip the header, up to the '##' line
 
+	for line in readLines(data):
+		line = line.strip() # trims leading/trailing whitespace etc.
 
-					chunk.startTime, chunk.endTime = map(self.timestampToSeconds, line.split(" --> "))
+		if line == '##':
+			skip = False
+			continue
 
-				elif identifier == True: 		# skip message identifier lines following blank lines
-					identifier = False
+		if skip: continue
 
-				elif line != "":			# append line to content
-					chunk.content.append(line)
+		# strip out HTML-style codes
+		line = htmlCodes.sub("", line)
 
-				else:					# blank line found, skip next identifier line
-					identifier = True
+		if ("-->" in line):
+			if chunk:			# if we have an existing chunk, yield it...
+				yield chunk
+
+			chunk = SRTChunk()		# ... and make a new one
+			start, end = line.split("-->", 1)
+			end = end.split()[0]	# drop cue settings ('align' etc.)
+			chunk.startTime, chunk.endTime = timestampToSeconds(start.strip()), timestampToSeconds(end)
+
+		elif line != "" and chunk:			# append line to content
+			chunk.content.append(line)
+
+	if chunk:
+		yield chunk
+
+class SRTChunker:
+	""" Takes a .srt subtitle file and converts it into an array of Chunks and
+		a reverse-indexed lookup table by whole words """
+
+	def __init__(self, filename):
+		""" Reads provided file, chunks it and runs tagWords on each chunk """
+
+		self.chunks = []
+		self.words = {}
+
+		for chunk in readSRT(filename):
+			self.tagWords(chunk)	# Add chunk reference to words in chunk
+			self.chunks.append(chunk)
 
 	def timestampToSeconds(self, timestamp):
 		""" Takes a timestamp in .srt (hh:mm:ss,mmm) format and
 			converts it to a (float) number of seconds """
 
-		timestamp, millis = timestamp.split(",")
-		stamp = map(int, timestamp.split(":"))
-		
-		seconds = stamp[0]*3600 + stamp[1]*60 + stamp[2] + float(millis)/1000
-		return seconds
+		return timestampToSeconds(timestamp)
 
 	def tagWords(self, chunk):
 		""" Adds a reference to the current chunk to each word
 			in the Words dictionary """
 
-		for word in chunk.getFullText().split(" "):
-			
-			# isolate actual word - no punctuation on either side
-			tmp = re.search("([A-Za-z']+)", word)
-
-			if tmp:
-				word = tmp.group(1)
-
-			word = word.lower()
-
+		for word in uniqueWords(chunk.getFullText()):
 			if not self.words.has_key(word):
 				self.words[word] = []
 			self.words[word].append(chunk)
@@ -0,0 +1,269 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from postings import chunkKey, encodeIds, decodeIds
+from reverseindex import Positions
+from tokeniser import tokeniserFor
+from array import array
+from bisect import bisect_left
+import sys
+
+class CompressedIndexNode(object):
+	""" Lightweight view of one prefix of a CompressedIndex, exposing the
+		same attributes as a TrieNode """
+
+	__slots__ = ('index', 'word')
+
+	def __init__(self, index, word):
+		self.index = index
+		self.word = word
+
+	@property
+	def content(self):
+		chunks = self.index.chunks
+		return [chunks[i] for i in self.index.idsOf(self.word)]
+
+	@property
+	def frequencies(self):
+		frequencies = self.index.frequencies
+		return None if frequencies is None else frequencies.get(self.word)
+
+	@property
+	def positions(self):
+		positions = self.index.positions
+		return None if positions is None else positions.get(self.word)
+
+	@property
+	def children(self):
+		index = self.index
+		words = index.words
+		depth = len(self.word)
+		lo, hi = index.wordRange(self.word)
+
+		# one child per distinct next letter, skipping over each child's
+		# whole range of words before looking for the next
+		children = {}
+		while lo < hi:
+			if len(words[lo]) == depth:
+				lo += 1
+				continue
+			child = words[lo][:depth + 1]
+			children[child[-1]] = CompressedIndexNode(index, child)
+			lo = index.wordRange(child)[1]
+
+		return children
+
+class CompressedIndex(object):
+	""" Read-only reverse index whose posting lists are compressed.
+
+		Every chunk gets a dense integer ID: its position in self.chunks,
+		which is sorted by time.  Each word's posting list is then stored
+		as a byte string of delta-encoded varint IDs (see postings.py)
+		rather than a list of chunk references.  The vocabulary is one
+		sorted list, so prefix lookups are a binary search, and the
+		encoded lists are concatenated into one byte string, the i'th
+		word's being data[offsets[i]:offsets[i+1]].
+
+		Supports the getNode()/getPostings()/getSubtree() interface of a
+		Trie, so the trie search engines can search it unchanged.
+		BooleanSearch intersects the IDs from getPostingIds() instead, and
+		looks up only the chunks left.
+	"""
+
+	# cumulative posting counts, missing from indexes pickled without them
+	counts = None
+
+	def __init__(self, words=None):
+		""" Builds a compressed copy of a dict of word => list of chunks,
+			such as a ReverseIndex """
+
+		if words is None:
+			words = {}
+
+		self.prefix = '' # words outside a subtree are out of range
+		self.suffixes = None
+		self.intervals = None
+		self.stats = getattr(words, 'stats', None)
+		self.tokens = getattr(words, 'tokens', None)
+		self.tokeniser = tokeniserFor(words)
+
+		self.chunks = sorted(set(chunk for chunks in words.itervalues() for chunk in chunks), key=chunkKey)
+		ids = dict((id(chunk), i) for i, chunk in enumerate(self.chunks))
+
+		frequencies = getattr(words, 'frequencies', None)
+		positions = getattr(words, 'positions', None)
+
+		self.words = sorted(word for word in words if word != '')
+		postings = []
+		self.frequencies = {} if frequencies is not None else None
+		self.positions = {} if positions is not None else None
+
+		for word in self.words:
+			chunkIds = [ids[id(chunk)] for chunk in words[word]]
+
+			# IDs must be ascending to delta-encode; chunks were appended
+			# in build order, which is normally time order already
+			order = range(len(chunkIds))
+			if any(chunkIds[i] >= chunkIds[i + 1] for i in range(len(chunkIds) - 1)):
+				order.sort(key=chunkIds.__getitem__)
+
+			postings.append(encodeIds([chunkIds[i] for i in order]))
+
+			if frequencies is not None and word in frequencies:
+				counts = frequencies[word]
+				self.frequencies[word] = array(counts.typecode, [counts[i] for i in order])
+
+			if positions is not None and word in positions:
+				reordered = Positions()
+				for i in order:
+					reordered.append(positions[word].get(i))
+				self.positions[word] = reordered
+
+		self.data = ''.join(postings)
+		self.offsets = array('l', [0])
+		for data in postings:
+			self.offsets.append(self.offsets[-1] + len(data))
+
+		# number of postings of the words before each word, for costing
+		self.counts = array('l', [0])
+		for word in self.words:
+			self.counts.append(self.counts[-1] + len(words[word]))
+
+	def __getstate__(self):
+		""" Pickles arrays as raw bytes rather than lists of ints """
+
+		state = self.__dict__.copy()
+		for key in ('offsets', 'counts'):
+			if key in state:
+				state[key] = state[key].tostring()
+		return state
+
+	def __setstate__(self, state):
+		for key in ('offsets', 'counts'):
+			if key in state:
+				state[key] = array('l', state[key])
+		self.__dict__.update(state)
+
+	def encoded(self, i):
+		""" Returns the encoded posting list of the i'th word """
+
+		return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+	def wordRange(self, prefix):
+		""" Returns the [lo, hi) range of self.words starting with prefix """
+
+		words = self.words
+		lo = bisect_left(words, prefix)
+
+		# words starting with prefix sort before its successor: the
+		# prefix with its last character incremented
+		if isinstance(prefix, unicode):
+			character, last = unichr, sys.maxunicode
+		else:
+			character, last = chr, 255
+
+		end = prefix
+		while end and ord(end[-1]) == last:
+			end = end[:-1]
+
+		if not end:
+			return lo, len(words)
+		return lo, bisect_left(words, end[:-1] + character(ord(end[-1]) + 1), lo)
+
+	def idsOf(self, word):
+		""" Returns the sorted chunk IDs of the chunks containing the
+			whole word 'word', ignoring self.prefix """
+
+		i = bisect_left(self.words, word)
+
+		if i < len(self.words) and self.words[i] == word:
+			return decodeIds(self.encoded(i))
+		return []
+
+	def postingCount(self, target):
+		""" Returns the number of postings of the words starting with
+			'target', or None if not recorded """
+
+		if self.counts is None:
+			return None
+
+		lo, hi = self.wordRange(self.prefix + target)
+		return self.counts[hi] - self.counts[lo]
+
+	def getPostingIds(self, target):
+		""" Returns the sorted IDs of the chunks containing any word starting
+			with 'target', or None if no word starts with it """
+
+		target = self.prefix + target
+		lo, hi = self.wordRange(target)
+
+		if lo == hi and target != self.prefix:
+			return None
+
+		if hi - lo == 1:
+			return decodeIds(self.encoded(lo))
+
+		ids = set()
+		for i in range(lo, hi):
+			ids.update(decodeIds(self.encoded(i)))
+		return sorted(ids)
+
+	def chunksOf(self, ids):
+		""" Returns the chunks with the given IDs """
+
+		chunks = self.chunks
+		return [chunks[i] for i in ids]
+
+	def getPostings(self, target):
+		""" Returns the chunks containing any word starting with 'target',
+			in time order, or None if no word starts with it """
+
+		ids = self.getPostingIds(target)
+
+		if ids is None:
+			return None
+		return self.chunksOf(ids)
+
+	def getNode(self, target):
+		""" Returns a view of the node 'target' or None if not found """
+
+		target = self.prefix + target
+		lo, hi = self.wordRange(target)
+
+		if lo == hi and target != self.prefix:
+			return None
+		return CompressedIndexNode(self, target)
+
+	def getSubtree(self, target):
+		""" Returns an index of the words starting with 'target', relative
+			to 'target' as a subtrie's are, or None if not found """
+
+		if self.getNode(target) is None:
+			return None
+
+		# shares the underlying lists with this index
+		subtree = CompressedIndex.__new__(CompressedIndex)
+		subtree.__dict__.update(self.__dict__)
+		subtree.prefix = self.prefix + target
+		subtree.suffixes = None # covers words outside the subtree
+		return subtree
+
+	@property
+	def root(self):
+		return CompressedIndexNode(self, self.prefix)
@@ -0,0 +1,568 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+# Binary corpus file format, read through mmap so a saved corpus opens in
+# near-constant time and its pages are shared between processes.
+#
+# The file starts with a header (see HEADER), then a table of (offset,
+# length) pairs locating each section listed in SECTIONS.  All numbers are
+# little-endian.  The string table holds one label per trie node, then the
+# text of each chunk (lines joined by newlines), then the words of every
+# node's stored completions, then the distinct words of the chunks'
+# recorded tokens, as UTF-8.  The trie is stored as the flat arrays of a
+# CompactTrie, with postings given as chunk IDs: a chunk's ID is its
+# position in the chunk table, sorted by time.  Token positions are flat
+# in step with the postings, and each chunk's tokens are indices into
+# their words, with each token's [start, end) offsets within the chunk's
+# UTF-8 text.  Sections added
+# later are appended to SECTIONS, so older files simply have fewer.
+# Corpora that are not word indexes are pickled instead.
+
+from trie import Trie, CompactTrie, FlatFrequencies
+from reverseindex import ReverseIndex
+from tokeniser import Tokeniser, tokeniserFor
+from chunker import ChunkView
+from postings import chunkKey
+from array import array
+import mmap, os, pickle, struct, sys
+
+MAGIC = 'SIAVIDCF'
+VERSION = 1
+
+# magic, version, flags, rootIndex, nodeCount, postingCount, chunkCount,
+# total chunk length, section count
+HEADER = struct.Struct('<8sIIIIIIQI')
+SECTION = struct.Struct('<QQ')
+
+SECTIONS = (
+	('stringOffsets', 'I'),
+	('strings', 'c'),
+	('firstChild', 'i'),
+	('childCount', 'i'),
+	('contentStart', 'i'),
+	('contentEnd', 'i'),
+	('subtreeEnd', 'i'),
+	('postings', 'I'),
+	('frequencies', 'H'),
+	('starts', 'd'),
+	('ends', 'd'),
+	('lengths', 'I'),
+	('completionStart', 'I'),
+	('completionCounts', 'I'),
+	('completionLimit', 'I'),
+	('positionOffsets', 'I'),
+	('positions', 'I'),
+	('tokenStart', 'I'),
+	('tokenWords', 'I'),
+	('tokenOffsets', 'I'),
+)
+
+# flags
+FREQUENCIES = 1
+LENGTHS = 2
+UNICODE_LABELS = 4
+UNICODE_WORDS = 8 # built with Tokeniser(unicode=True)
+FOLDED_WORDS = 16 # built with Tokeniser(fold=True)
+COMPLETIONS = 32
+POSITIONS = 64
+TOKENS = 128
+
+def compactCorpus(corpus):
+	""" Returns the corpus as a CompactTrie, or None if it is not a word
+		index of chunks """
+
+	if isinstance(corpus, CompactTrie):
+		return corpus
+
+	if isinstance(corpus, Trie):
+		return CompactTrie(corpus)
+
+	if isinstance(corpus, dict):
+		for postings in corpus.itervalues():
+			if not isinstance(postings, list) or not all(hasattr(chunk, 'getFullText') for chunk in postings):
+				return None
+		words = corpus
+
+	elif hasattr(corpus, 'getNode') and hasattr(corpus, 'getSubtree'):
+		from suffixarray import vocabulary
+
+		words = ReverseIndex(recordPositions=True, tokeniser=tokeniserFor(corpus))
+		words.stats = getattr(corpus, 'stats', None)
+		words.tokens = getattr(corpus, 'tokens', None)
+		for word in vocabulary(corpus):
+			node = corpus.getNode(word)
+			words[word] = node.content
+			if node.frequencies is not None:
+				words.frequencies[word] = node.frequencies
+			if node.positions is not None:
+				words.positions[word] = node.positions
+
+	else:
+		return None
+
+	trie = Trie()
+	trie.bulkLoad(words)
+	return CompactTrie(trie)
+
+def saveCorpusFile(corpus, filename):
+	""" Saves a corpus to 'filename', in the binary format if it is a word
+		index and pickled otherwise.  The file is written alongside and
+		renamed into place, so processes reading the old file through
+		mmap are not affected.
+	"""
+
+	compact = compactCorpus(corpus)
+
+	with open(filename + '.tmp', 'wb') as file:
+		if compact is None:
+			pickle.dump(corpus, file, pickle.HIGHEST_PROTOCOL)
+		else:
+			writeCorpus(compact, file)
+
+	os.rename(filename + '.tmp', filename)
+
+def writeCorpus(compact, file):
+	""" Writes a CompactTrie to an open file in the binary format """
+
+	nodeCount = len(compact.firstChild)
+	postings = compact.postings[0:len(compact.postings)]
+
+	# number the chunks in time order
+	chunks = dict((id(chunk), chunk) for chunk in postings).values()
+	chunks.sort(key=chunkKey)
+	ids = dict((id(chunk), index) for index, chunk in enumerate(chunks))
+
+	flags = 0
+	sections = {}
+
+	labels = [compact.labels[index] for index in range(nodeCount)]
+	if any(isinstance(label, unicode) for label in labels):
+		flags |= UNICODE_LABELS
+
+	tokeniser = tokeniserFor(compact)
+	if tokeniser.unicode:
+		flags |= UNICODE_WORDS
+	if tokeniser.fold:
+		flags |= FOLDED_WORDS
+
+	strings = []
+	for label in labels:
+		strings.append(label.encode('utf-8') if isinstance(label, unicode) else label)
+	for chunk in chunks:
+		text = "\n".join(chunk.content)
+		strings.append(text.encode('utf-8') if isinstance(text, unicode) else text)
+
+	# each node's completions, their words after the chunks' text
+	if compact.completions is not None:
+		flags |= COMPLETIONS
+		for word in compact.completionWords:
+			strings.append(word.encode('utf-8') if isinstance(word, unicode) else word)
+		sections['completionStart'] = array('I', compact.completionStart)
+		sections['completionCounts'] = array('I', compact.completionCounts)
+		sections['completionLimit'] = array('I', [compact.completions])
+	else:
+		for key in ('completionStart', 'completionCounts', 'completionLimit'):
+			sections[key] = array('I')
+
+	# each chunk's tokens, as indices into their distinct words, which
+	# follow in the string table
+	tokens = compact.tokens
+	recorded = [tokens.get(chunk) for chunk in chunks] if tokens is not None else []
+	if recorded and None not in recorded:
+		flags |= TOKENS
+		vocabulary = {}
+		tokenStart = array('I', [0])
+		tokenWords = array('I')
+		tokenOffsets = array('I')
+		for chunk, (chunkWords, chunkOffsets) in zip(chunks, recorded):
+			# offsets within the text as loaded, which is UTF-8
+			text = chunk.getFullText()
+			if isinstance(text, unicode) and len(text.encode('utf-8')) != len(text):
+				chunkOffsets = [len(text[:offset].encode('utf-8')) for offset in chunkOffsets]
+
+			for word in chunkWords:
+				if word not in vocabulary:
+					vocabulary[word] = len(vocabulary)
+					strings.append(word.encode('utf-8') if isinstance(word, unicode) else word)
+				tokenWords.append(vocabulary[word])
+			tokenOffsets.extend(chunkOffsets)
+			tokenStart.append(len(tokenWords))
+		sections['tokenStart'] = tokenStart
+		sections['tokenWords'] = tokenWords
+		sections['tokenOffsets'] = tokenOffsets
+	else:
+		for key in ('tokenStart', 'tokenWords', 'tokenOffsets'):
+			sections[key] = array('I')
+
+	offsets = array('I', [0])
+	for string in strings:
+		offsets.append(offsets[-1] + len(string))
+	sections['stringOffsets'] = offsets
+	sections['strings'] = ''.join(strings)
+
+	for key in ('firstChild', 'childCount', 'contentStart', 'contentEnd', 'subtreeEnd'):
+		sections[key] = array('i', compact.__dict__[key])
+
+	sections['postings'] = array('I', [ids[id(chunk)] for chunk in postings])
+
+	# frequencies in step with postings; 1 where not recorded
+	frequencies = array('H', [1] * len(postings))
+	for index in range(nodeCount):
+		found = compact.frequencies.get(index)
+		if found is not None and len(found) and len(found) == compact.contentEnd[index] - compact.contentStart[index]:
+			flags |= FREQUENCIES
+			frequencies[compact.contentStart[index]:compact.contentEnd[index]] = array('H', found)
+	sections['frequencies'] = frequencies if flags & FREQUENCIES else array('H')
+
+	# positions in step with postings, stored only if every word has them
+	positionOffsets = array('I', [0])
+	positions = array('I')
+	complete = bool(postings)
+	for index in sorted(range(nodeCount), key=compact.contentStart.__getitem__):
+		count = compact.contentEnd[index] - compact.contentStart[index]
+		if not count:
+			continue
+		found = compact.positions.get(index)
+		if found is None or len(found) != count:
+			complete = False
+			break
+		for i in range(count):
+			positions.extend(found.get(i))
+			positionOffsets.append(len(positions))
+	if complete:
+		flags |= POSITIONS
+	sections['positionOffsets'] = positionOffsets if flags & POSITIONS else array('I')
+	sections['positions'] = positions if flags & POSITIONS else array('I')
+
+	sections['starts'] = array('d', [chunk.startTime for chunk in chunks])
+	sections['ends'] = array('d', [chunk.endTime for chunk in chunks])
+
+	stats = compact.stats
+	if stats is not None and stats.count():
+		flags |= LENGTHS
+		sections['lengths'] = array('I', [stats.lengths.get(chunk, 0) for chunk in chunks])
+	else:
+		sections['lengths'] = array('I')
+
+	# lay out the sections after the header, each 8-byte aligned
+	data = []
+	table = []
+	position = HEADER.size + SECTION.size * len(SECTIONS)
+	for key, typecode in SECTIONS:
+		section = sections[key]
+		if isinstance(section, array):
+			if sys.byteorder == 'big':
+				section = array(section.typecode, section)
+				section.byteswap()
+			section = section.tostring()
+
+		padding = -position % 8
+		data.append('\0' * padding)
+		position += padding
+
+		table.append(SECTION.pack(position, len(section)))
+		data.append(section)
+		position += len(section)
+
+	total = sum(sections['lengths'])
+	file.write(HEADER.pack(MAGIC, VERSION, flags, compact.rootIndex, nodeCount, len(postings), len(chunks), total, len(SECTIONS)))
+	file.write(''.join(table))
+	file.write(''.join(data))
+
+def loadCorpusFile(filename):
+	""" Loads a corpus saved by saveCorpusFile(), or an older pickled one """
+
+	with open(filename, 'rb') as file:
+		magic = file.read(len(MAGIC))
+
+		if magic != MAGIC:
+			file.seek(0)
+			return pickle.load(file)
+
+	return MappedCorpus(filename)
+
+class MappedArray(object):
+	""" Read-only sequence of numbers stored in a section of a buffer """
+
+	def __init__(self, buffer, offset, typecode, count):
+		self.buffer = buffer
+		self.offset = offset
+		self.typecode = typecode
+		self.size = struct.calcsize(typecode)
+		self.count = count
+		self.item = struct.Struct('<' + typecode)
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(self.count)
+			if stop <= start:
+				return []
+			values = struct.unpack_from('<%d%s' % (stop - start, self.typecode), self.buffer, self.offset + start * self.size)
+			return list(values[::step])
+
+		if index < 0:
+			index += self.count
+		if not 0 <= index < self.count:
+			raise IndexError('MappedArray index out of range')
+		return self.item.unpack_from(self.buffer, self.offset + index * self.size)[0]
+
+	def __iter__(self):
+		return iter(self[0:self.count])
+
+class MappedStrings(object):
+	""" Read-only sequence of strings 'first' onwards of a string table """
+
+	def __init__(self, buffer, offset, offsets, first, count, decode=False):
+		self.buffer = buffer
+		self.offset = offset
+		self.offsets = offsets
+		self.first = first
+		self.count = count
+		self.decode = decode
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(self.count))]
+
+		if not 0 <= index < self.count:
+			raise IndexError('MappedStrings index out of range')
+
+		index += self.first
+		string = self.buffer[self.offset + self.offsets[index]:self.offset + self.offsets[index + 1]]
+
+		if self.decode:
+			return string.decode('utf-8', 'replace')
+		return string
+
+class MappedChunkTable(object):
+	""" The chunks of a MappedCorpus.  As with a ChunkTable, each chunk is
+		a ChunkView, always the same object for the same chunk; views are
+		made as chunks are first used.
+	"""
+
+	def __init__(self, starts, ends, texts):
+		self.starts = starts
+		self.ends = ends
+		self.texts = texts
+		self.views = {}
+
+	def __len__(self):
+		return len(self.starts)
+
+	def __getitem__(self, index):
+		if not 0 <= index < len(self.starts):
+			raise IndexError('MappedChunkTable index out of range')
+
+		view = self.views.get(index)
+		if view is None:
+			view = self.views.setdefault(index, ChunkView(self, index))
+		return view
+
+	def __iter__(self):
+		for index in range(len(self.starts)):
+			yield self[index]
+
+	def getText(self, index):
+		return self.texts[index]
+
+class MappedPostings(object):
+	""" The flat postings list of a MappedCorpus, as chunks """
+
+	def __init__(self, ids, chunks):
+		self.ids = ids
+		self.chunks = chunks
+
+	def __len__(self):
+		return len(self.ids)
+
+	def __getitem__(self, index):
+		chunks = self.chunks
+
+		if isinstance(index, slice):
+			return [chunks[chunkID] for chunkID in self.ids[index]]
+		return chunks[self.ids[index]]
+
+class MappedLengths(object):
+	""" Chunk => number of words, as in ChunkStats.lengths """
+
+	def __init__(self, lengths, chunks):
+		self.lengths = lengths
+		self.chunks = chunks
+
+	def get(self, chunk, default=None):
+		if isinstance(chunk, ChunkView) and chunk.table is self.chunks:
+			return self.lengths[chunk.index]
+		return default
+
+class MappedStats(object):
+	""" ChunkStats of a MappedCorpus """
+
+	def __init__(self, lengths, chunks, total):
+		self.lengths = MappedLengths(lengths, chunks)
+		self.total = total
+
+	def count(self):
+		return len(self.lengths.lengths)
+
+	def averageLength(self):
+		if not self.count():
+			return 0.0
+		return float(self.total) / self.count()
+
+class MappedNodePositions(object):
+	""" Token positions of one word within each chunk of its posting
+		list, read as a Positions object is """
+
+	def __init__(self, positions, start, count):
+		self.positions = positions
+		self.start = start
+		self.count = count
+
+	def __len__(self):
+		return self.count
+
+	def get(self, index):
+		offsets = self.positions.offsets
+		return self.positions.positions[offsets[self.start + index]:offsets[self.start + index + 1]]
+
+class MappedPositions(object):
+	""" Node index => token positions of a MappedCorpus, held flat in step
+		with its postings, as FlatFrequencies holds frequencies """
+
+	def __init__(self, offsets, positions, trie):
+		self.offsets = offsets
+		self.positions = positions
+		self.trie = trie
+
+	def get(self, index, default=None):
+		trie = self.trie
+		start, end = trie.contentStart[index], trie.contentEnd[index]
+		if start == end:
+			return default
+		return MappedNodePositions(self, start, end - start)
+
+class MappedTokens(object):
+	""" Chunk => (words, offsets) of a MappedCorpus, as in ChunkTokens """
+
+	def __init__(self, starts, words, offsets, vocabulary, chunks):
+		self.starts = starts
+		self.words = words
+		self.offsets = offsets
+		self.vocabulary = vocabulary
+		self.chunks = chunks
+
+	def get(self, chunk):
+		if not isinstance(chunk, ChunkView) or chunk.table is not self.chunks:
+			return None
+
+		start, end = self.starts[chunk.index], self.starts[chunk.index + 1]
+		vocabulary = self.vocabulary
+		return tuple(vocabulary[word] for word in self.words[start:end]), array('I', self.offsets[2 * start:2 * end])
+
+class MappedCorpus(CompactTrie):
+	""" A CompactTrie read from a binary corpus file through mmap.  Only
+		the header is read on opening; nodes, postings and chunks are read
+		from the mapped file as they are used.
+	"""
+
+	def __init__(self, filename):
+		with open(filename, 'rb') as file:
+			self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		if len(self.map) < HEADER.size:
+			raise ValueError("{} is not a corpus file".format(filename))
+
+		magic, version, flags, rootIndex, nodeCount, postingCount, chunkCount, total, sectionCount = HEADER.unpack_from(self.map, 0)
+
+		if magic != MAGIC:
+			raise ValueError("{} is not a corpus file".format(filename))
+		if version != VERSION:
+			raise ValueError("{} is corpus file version {}, expected {}".format(filename, version, VERSION))
+
+		sections = {}
+		for index, (key, typecode) in enumerate(SECTIONS[:sectionCount]):
+			sections[key] = SECTION.unpack_from(self.map, HEADER.size + index * SECTION.size)
+
+		def section(key, count=None):
+			offset, length = sections[key]
+			typecode = dict(SECTIONS)[key]
+			if count is None:
+				count = length // struct.calcsize(typecode)
+			return MappedArray(self.map, offset, typecode, count)
+
+		stringOffsets = section('stringOffsets')
+		stringsOffset = sections['strings'][0]
+
+		self.rootIndex = rootIndex
+		self.labels = MappedStrings(self.map, stringsOffset, stringOffsets, 0, nodeCount, flags & UNICODE_LABELS)
+
+		for key in ('firstChild', 'childCount', 'contentStart', 'contentEnd', 'subtreeEnd'):
+			self.__dict__[key] = section(key, nodeCount)
+
+		texts = MappedStrings(self.map, stringsOffset, stringOffsets, nodeCount, chunkCount)
+		self.chunks = MappedChunkTable(section('starts', chunkCount), section('ends', chunkCount), texts)
+		self.postings = MappedPostings(section('postings', postingCount), self.chunks)
+
+		if flags & FREQUENCIES:
+			self.frequencies = FlatFrequencies(section('frequencies', postingCount), self)
+		else:
+			self.frequencies = {}
+
+		if flags & LENGTHS:
+			self.stats = MappedStats(section('lengths', chunkCount), self.chunks, total)
+		else:
+			self.stats = None
+
+		completionCount = 0
+		if flags & COMPLETIONS:
+			self.completions = section('completionLimit', 1)[0]
+			self.completionStart = section('completionStart', nodeCount + 1)
+			self.completionCounts = section('completionCounts')
+			completionCount = len(self.completionCounts)
+			self.completionWords = MappedStrings(self.map, stringsOffset, stringOffsets, nodeCount + chunkCount, completionCount, flags & UNICODE_LABELS)
+
+		if flags & POSITIONS:
+			self.positions = MappedPositions(section('positionOffsets', postingCount + 1), section('positions'), self)
+		else:
+			self.positions = {}
+
+		if flags & TOKENS:
+			first = nodeCount + chunkCount + completionCount
+			vocabulary = MappedStrings(self.map, stringsOffset, stringOffsets, first, len(stringOffsets) - 1 - first, flags & UNICODE_LABELS)
+			self.tokens = MappedTokens(section('tokenStart', chunkCount + 1), section('tokenWords'), section('tokenOffsets'), vocabulary, self.chunks)
+		else:
+			self.tokens = None
+		self.tokeniser = Tokeniser(bool(flags & UNICODE_WORDS), bool(flags & FOLDED_WORDS))
+		self.suffixes = None
+		self.intervalIndex = None
+
+	@property
+	def intervals(self):
+		""" IntervalIndex of every chunk, built on first use """
+
+		if self.intervalIndex is None:
+			from intervalindex import IntervalIndex
+			self.intervalIndex = IntervalIndex(self.chunks)
+		return self.intervalIndex
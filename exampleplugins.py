@@ -245,6 +245,9 @@ class YoutubeAudioAcquirer(Acquirer):
 		return audioFileName, READY
 
 class FileToLineMiner(DataMiner):
+	""" Reads a file into a list of lines.  The subtitle miners stream
+		files themselves, so do not need this first. """
+
 	def build(self, data):
 		lines = []
 		
@@ -253,288 +256,306 @@ class FileToLineMiner(DataMiner):
 		
 		return lines
 
-import re
-from chunker import SRTChunk
+from chunker import ChunkTable, readSRT, readVTT
+from reverseindex import ReverseIndex
 
 class SRTChunkListToRIDict(DataMiner):
 	""" Takes a list of SRTChunks and builds a reverse-indexed dict of
 		word => list of chunks containing word
 	"""
 
+	def __init__(self, recordPositions=False, tokeniser=None, tempDir='./tmp/'):
+		""" If recordPositions is set, the reverse index also records
+			each word's token positions within its chunks.  Chunks are
+			split into words by 'tokeniser', or the default Tokeniser.
+		"""
+
+		DataMiner.__init__(self, tempDir)
+		self.recordPositions = recordPositions
+		self.tokeniser = tokeniser
+
 	def build(self, data):
-		words = {}
+		words = ReverseIndex(self.recordPositions, self.tokeniser)
 
 		for chunk in data:
 			self.tagWords(chunk, words)
 
 		return words
 
+	def indexChunks(self, chunks):
+		""" Indexes a stream of chunks, e.g. from readSRT(), copying each
+			into a ChunkTable as it arrives so the stream need not be
+			held in full """
+
+		words = ReverseIndex(self.recordPositions, self.tokeniser)
+		table = ChunkTable()
+
+		for chunk in chunks:
+			self.tagWords(table.append(chunk.startTime, chunk.endTime, chunk.content), words)
+
+		return words
+
 	def tagWords(self, chunk, words):
 		""" Adds a reference to the current chunk to each word
 			in the Words dictionary """
-		usedwords = []
 
-		for word in chunk.getFullText().split(" "):
-			
-			# isolate actual word - no punctuation on either side
-			tmp = re.search("([A-Za-z']+)", word)
+		words.addChunk(chunk)
 
-			if tmp:
-				word = tmp.group(1)
+	def addChunks(self, corpus, chunks):
+		if corpus is None:
+			corpus = ReverseIndex(self.recordPositions, self.tokeniser)
 
-			word = word.lower()
+		for chunk in chunks:
+			self.tagWords(chunk, corpus)
 
-			if not word in usedwords:
-				usedwords.append(word)
+		return corpus
 
-				if not words.has_key(word):
-					words[word] = []
-				words[word].append(chunk)
+	def removeChunks(self, corpus, chunks):
+		for chunk in chunks:
+			corpus.removeChunk(chunk)
 
+		return corpus
 
-class SRTChunkMiner(DataMiner):
-	""" Takes a filename, returns a dict of lists of chunks, indexed by word """
+
+class SRTChunkMiner(SRTChunkListToRIDict):
+	""" Takes a filename, or a list of lines, of a .srt file and returns a
+		dict of lists of chunks, indexed by word """
 
 	def build(self, data):
-		words = {}
-		chunks = []
+		return self.indexChunks(readSRT(data))
 
-		chunk = None
-		identifier = True # sentinel for skipping Identifier lines
-		
-		for line in data:
-			line = line.strip() # trims leading/trailing whitespace etc.
+class VSSChunkMiner(SRTChunkListToRIDict):
+	""" Takes a filename, or a list of lines, of a .vss file and returns a
+		dict of lists of chunks, indexed by word """
 
-			# strip out HTML-style codes
-			line = re.sub(r"<.+>", "", line)
+	def build(self, data):
+		return self.indexChunks(readVTT(data))
 
-			if ("-->" in line):
-				if chunk:			# if we have an existing chunk, save it...
-					self.tagWords(chunk, words)	# Add chunk reference to words in chunk
-					chunks.append(chunk)
+from trie import Trie, TrieNode, CompactTrie
+from suffixarray import SuffixArray, vocabulary
+from intervalindex import IntervalIndex, timed
+from compressedindex import CompressedIndex
 
-				chunk = SRTChunk()		# ... and make a new one
 
-				chunk.startTime, chunk.endTime = map(self.timestampToSeconds, line.split(" --> "))
+class TrieMiner(DataMiner):
+	def __init__(self, subtreeRanges=False, infixIndex=False, completions=None, tempDir='./tmp/'):
+		""" If subtreeRanges is set, the trie also stores the postings
+			range of each node's subtree, so prefix searches do not need
+			to walk the subtree.  If infixIndex is set, the trie also
+			gets a suffix array over its vocabulary for InfixSearch.  If
+			completions is set, each node stores that many of the most
+			common words beginning with its prefix, for suggestions.
+		"""
 
-			elif identifier == True: 		# skip message identifier lines following blank lines
-				identifier = False
+		DataMiner.__init__(self, tempDir)
+		self.subtreeRanges = subtreeRanges
+		self.infixIndex = infixIndex
+		self.completions = completions
 
-			elif line != "":			# append line to content
-				chunk.content.append(line)
+	def build(self, data):
+		return self.buildTrie(data)
 
-			else:					# blank line found, skip next identifier line
-				identifier = True
-		return words
+	def buildTrie(self, words):
+		""" Builds a trie from a dict of word-indexed chunklists """
 
-	def timestampToSeconds(self, timestamp):
-		""" Takes a timestamp in .srt (hh:mm:ss,mmm) format and
-			converts it to a (float) number of seconds """
+		trie = Trie()
+		trie.bulkLoad(words)
 
-		timestamp, millis = timestamp.split(",")
-		stamp = map(int, timestamp.split(":"))
-		
-		seconds = stamp[0]*3600 + stamp[1]*60 + stamp[2] + float(millis)/1000
-		return seconds
+		return self.indexTrie(trie, words, set(chunk for chunks in words.itervalues() for chunk in chunks))
 
-	def tagWords(self, chunk, words):
-		""" Adds a reference to the current chunk to each word
-			in the Words dictionary """
-		usedwords = []
+	def indexTrie(self, trie, words, chunks):
+		""" Builds the optional indexes of a newly loaded trie, given its
+			vocabulary and the chunks it holds """
 
-		for word in chunk.getFullText().split(" "):
-			
-			# isolate actual word - no punctuation on either side
-			tmp = re.search("([A-Za-z']+)", word)
+		# subtree ranges also give the posting counts queries are planned by
+		if self.subtreeRanges:
+			trie.indexSubtrees()
+		else:
+			trie.indexCounts()
 
-			if tmp:
-				word = tmp.group(1)
+		if self.infixIndex:
+			trie.suffixes = SuffixArray(words)
 
-			word = word.lower()
+		if self.completions:
+			trie.indexCompletions(self.completions)
 
-			if not word in usedwords:
-				usedwords.append(word)
+		# every chunk by time, for time-window searches
+		if timed(chunks):
+			trie.intervals = IntervalIndex(chunks)
 
-				if not words.has_key(word):
-					words[word] = []
-				words[word].append(chunk)
+		return trie
 
-class VSSChunkMiner(DataMiner):
-	def build(self, data):
-		words = {}
-		chunks = []
+	def addChunks(self, corpus, chunks):
+		""" Adds new chunks to a trie built by this miner, or to a new
+			trie if corpus is None """
 
-		chunk = None
-		skip = True
+		if corpus is None:
+			corpus = Trie()
+			if timed(chunks):
+				corpus.intervals = IntervalIndex([])
 
-		for line in data:
-			line = line.strip() # trims leading/trailing whitespace etc.
+		words = ReverseIndex(recordPositions=True, tokeniser=corpus.tokeniser)
+		for chunk in chunks:
+			words.addChunk(chunk)
 
-			if line == '##':
-				skip = False
-				continue
+		# only words not yet found need adding to the suffix array
+		newWords = []
+		for word in words:
+			node = corpus.getNode(word)
+			if node is None or not node.content:
+				newWords.append(word)
 
-			if skip: continue
+		corpus.addChunks(words)
 
-			# strip out HTML-style codes
-			line = re.sub(r"<.*?>", "", line)
+		if corpus.intervals is not None:
+			for chunk in chunks:
+				corpus.intervals.add(chunk)
 
-			if ("-->" in line):
-				line = line[:29] 	# clip 'align' etc.
-				if chunk:			# if we have an existing chunk, save it...
-					self.tagWords(chunk, words)	# Add chunk reference to words in chunk
-					chunks.append(chunk)
+		self.update(corpus, newWords)
+		return corpus
 
-				chunk = SRTChunk()		# ... and make a new one
+	def removeChunks(self, corpus, chunks):
+		""" Removes chunks from a trie built by this miner """
 
-				chunk.startTime, chunk.endTime = map(self.timestampToSeconds, line.split(" --> "))
-			elif line != "":			# append line to content
-				chunk.content.append(line)
+		corpus.removeChunks(chunks)
 
-		return words
+		if corpus.intervals is not None:
+			for chunk in chunks:
+				corpus.intervals.remove(chunk)
 
-	def timestampToSeconds(self, timestamp):
-		""" Takes a timestamp in .vss (hh:mm:ss.mmm) format and
-			converts it to a (float) number of seconds """
+		self.update(corpus, [])
+		return corpus
 
-		timestamp, millis = timestamp.split(".")
-		stamp = map(int, timestamp.split(":"))
-		
-		seconds = stamp[0]*3600 + stamp[1]*60 + stamp[2] + float(millis)/1000
-		return seconds		
+	def merge(self, corpus, other):
+		""" Merges another trie (e.g. another timeline's) into a trie
+			built by this miner """
 
-	def tagWords(self, chunk, words):
-		""" Adds a reference to the current chunk to each word
-			in the Words dictionary """
-		usedwords = []
+		corpus.merge(other)
 
-		for word in chunk.getFullText().split(" "):
-			
-			# isolate actual word - no punctuation on either side
-			tmp = re.search("([A-Za-z']+)", word)
+		if corpus.intervals is None:
+			chunks = set(corpus.getPostings(''))
+			if timed(chunks):
+				corpus.intervals = IntervalIndex(chunks)
 
-			if tmp:
-				word = tmp.group(1)
+		self.reindex(corpus)
+		return corpus
 
-			word = word.lower()
+	def reindex(self, trie):
+		""" Rebuilds the optional indexes of a trie after a merge """
 
-			if not word in usedwords:
-				usedwords.append(word)
-
-				if not words.has_key(word):
-					words[word] = []
-				words[word].append(chunk)
-
-from trie import Trie, TrieNode
+		if self.subtreeRanges:
+			trie.indexSubtrees()
+		else:
+			trie.indexCounts()
+
+		if self.infixIndex:
+			trie.suffixes = SuffixArray(vocabulary(trie))
+
+		if self.completions:
+			trie.indexCompletions(self.completions)
+
+	def update(self, trie, newWords):
+		""" Brings the optional indexes of a trie up to date after chunks
+			are added or removed.  The trie updates its counts and
+			completions along the changed words, and lays its subtree
+			ranges out again when next used, so only indexes it does not
+			have yet are built, and new words are added to the suffix
+			array.  Words no longer found are harmless in the suffix
+			array.
+		"""
 
+		if not trie.counted and trie.postings is None and not trie.subtreesStale:
+			if self.subtreeRanges:
+				trie.indexSubtrees()
+			else:
+				trie.indexCounts()
 
-class SRTTrieMiner(DataMiner):
-	def build(self, data):
+		if self.infixIndex:
+			if trie.suffixes is None:
+				trie.suffixes = SuffixArray(vocabulary(trie))
+			elif newWords:
+				trie.suffixes.add(newWords)
 
-		# build list of actual lines for chunking
-		lines = []
-		
-		with open(data, "r") as file:
-			lines = file.readlines()
+		if self.completions and trie.completions is None:
+			trie.indexCompletions(self.completions)
 
-		# get our dict of word-indexed chunklists
-		chunker = SRTChunkMiner()
-		words = chunker.build(lines)
+class SRTTrieMiner(TrieMiner):
+	""" SRTChunkMiner and TrieMiner fused into one step: takes a .srt
+		file, or a list of its lines, and inserts each chunk into the
+		trie as it is read, so no list of lines or word dict is built """
 
-		# build a trie from chunklists
-		trie = Trie()
-		for word in words:
-			if word != '':
-				target = trie.getSubtree(word)
-				if target == None:
-					target = TrieNode()
-					trie.addSubtree(word, target)
-				else:
-					target = target.root
+	read = staticmethod(readSRT)
 
-				for item in words[word]:
-					target.content.append(item)
+	def __init__(self, recordPositions=False, tokeniser=None, subtreeRanges=False, infixIndex=False, completions=None, tempDir='./tmp/'):
+		""" recordPositions and tokeniser are as for SRTChunkMiner, the
+			rest as for TrieMiner """
 
-		return trie
+		TrieMiner.__init__(self, subtreeRanges, infixIndex, completions, tempDir)
+		self.recordPositions = recordPositions
+		self.tokeniser = tokeniser
 
-class VSSTrieMiner(DataMiner):
 	def build(self, data):
+		trie = Trie()
+		if self.tokeniser is not None:
+			trie.tokeniser = self.tokeniser
 
-		# build list of actual lines for chunking
-		lines = []
-		
-		with open(data, "r") as file:
-			lines = file.readlines()
+		# copy each chunk into a ChunkTable as it is streamed from the file
+		table = ChunkTable()
+		words = trie.loadChunks((table.append(chunk.startTime, chunk.endTime, chunk.content) for chunk in self.read(data)), self.recordPositions)
 
-		# get our dict of word-indexed chunklists
-		chunker = VSSChunkMiner()
-		words = chunker.build(lines)
+		return self.indexTrie(trie, words, [chunk for chunk in table if trie.stats.lengths[chunk]])
 
-		# build a trie from chunklists
-		trie = Trie()
-		for word in words:
-			if word != '':
-				target = trie.getSubtree(word)
-				if target == None:
-					target = TrieNode()
-					trie.addSubtree(word, target)
-				else:
-					target = target.root
+class VSSTrieMiner(SRTTrieMiner):
+	""" VSSChunkMiner and TrieMiner fused into one step, as SRTTrieMiner """
 
-				for item in words[word]:
-					target.content.append(item)
+	read = staticmethod(readVTT)
 
-		return trie
+class CompactTrieMiner(TrieMiner):
+	""" Builds a trie as TrieMiner does, then packs it into a read-only
+		CompactTrie for a smaller, faster-pickling corpus """
 
-class TrieMiner(DataMiner):
 	def build(self, data):
-		words = data
+		return CompactTrie(TrieMiner.build(self, data))
 
-		# build a trie from chunklists
-		trie = Trie()
-		for word in words:
-			if word != '':
-				target = trie.getSubtree(word)
-				if target == None:
-					target = TrieNode()
-					trie.addSubtree(word, target)
-				else:
-					target = target.root
+	def addChunks(self, corpus, chunks):
+		""" CompactTries are read-only """
+		return None
 
-				for item in words[word]:
-					target.content.append(item)
-
-		return trie
+	def removeChunks(self, corpus, chunks):
+		""" CompactTries are read-only """
+		return None
 
+class CompressedIndexMiner(DataMiner):
+	""" Takes a dict of word-indexed chunklists, returns a CompressedIndex
+		of them, which the trie search engines can search as a trie """
 
+	def build(self, data):
+		index = CompressedIndex(data)
 
-from sets import Set
+		# every chunk by time, for time-window searches
+		index.intervals = IntervalIndex(index.chunks)
 
-class TrieSearch(SearchEngine):
+		return index
 
-	def walkTrie(self, node, results):
-		""" Walk the trie rooted at 'node', appending results as we go """
 
-		for item in node.content:
-			results.add(item)
 
-		for child in node.children:
-			self.walkTrie(node.children[child], results)
+from sets import Set
+from queryplanner import coveringTerms
 
+class TrieSearch(SearchEngine):
 
 	def performSearch(self, corpus, terms):
-		""" For each search term, get the trie rooted at it add children to results  """
+		""" For each search term, add the contents of the trie rooted at it to results  """
 
 		results = Set() # only want unique results
 		
-		for term in terms:
-			candidates = corpus.getSubtree(term)
+		# 'learn' already finds 'learning'
+		for term in coveringTerms(terms):
+			candidates = corpus.getPostings(term)
 
 			if candidates is None:
 				continue
 
-			root = candidates.getNode("")
-
-			self.walkTrie(root, results)				
+			results.update(candidates)
 		
 		return results	
@@ -0,0 +1,129 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from pipeline import SearchEngine, logger
+from tokeniser import tokeniserFor
+from sets import Set
+import timeit
+
+class FuzzySearch(SearchEngine):
+	""" Finds chunks containing words within a given Levenshtein distance
+		of the search terms, for misrecognised or misspelt words.
+
+		Walks the trie keeping one row of the edit distance table per
+		node, so words sharing a prefix share the work, and abandons a
+		branch as soon as every entry in its row exceeds the limit.
+	"""
+
+	def __init__(self, maxDistance=None, prefix=False):
+		""" maxDistance is the number of edits allowed; if None it is
+			chosen from the term's length.  If prefix is set, terms
+			fuzzily match the start of words, as in TrieSearch.
+		"""
+
+		self.maxDistance = maxDistance
+		self.prefix = prefix
+
+	def distanceFor(self, term):
+		""" Edits allowed for a term: none for very short terms, where
+			any edit matches most of the vocabulary """
+
+		if self.maxDistance is not None:
+			return self.maxDistance
+		if len(term) <= 2:
+			return 0
+		if len(term) <= 5:
+			return 1
+		return 2
+
+	def performSearch(self, corpus, terms, timings=None):
+		""" If 'timings' is a list, (term, seconds, nodes visited, words
+			matched) is appended to it for each term.  It is passed per
+			call, so concurrent searches do not share it. """
+
+		if isinstance(terms, basestring):
+			terms = terms.split()
+
+		results = Set()
+		tokeniser = tokeniserFor(corpus)
+
+		for term in terms:
+			term = tokeniser.normalise(term)
+			if term == '':
+				continue
+
+			start = timeit.default_timer()
+			matches, visited = self.matchWords(corpus, term, self.distanceFor(term))
+
+			for word, distance, node in matches:
+				if self.prefix:
+					results.update(corpus.getPostings(word))
+				else:
+					results.update(node.content)
+
+			elapsed = timeit.default_timer() - start
+			if timings is not None:
+				timings.append((term, elapsed, visited, len(matches)))
+			logger.info("Fuzzy search for '{}': {} words within {} edits, {} nodes visited in {:.2f} ms".format(
+				term, len(matches), self.distanceFor(term), visited, elapsed * 1000))
+
+		return results
+
+	def matchWords(self, corpus, term, maxDistance):
+		""" Returns a list of (word, distance, node) for each word in the
+			trie within maxDistance edits of term (or, in prefix mode, each
+			shortest prefix within maxDistance edits), and the number of
+			trie nodes visited.
+		"""
+
+		matches = []
+		visited = 0
+
+		firstRow = range(len(term) + 1)
+		stack = [(corpus.getNode(""), "", firstRow)]
+
+		while stack:
+			node, word, previousRow = stack.pop()
+			visited += 1
+
+			children = node.children
+			for label in children:
+				child = children[label]
+
+				# next row of the edit distance table, for word + label
+				row = [previousRow[0] + 1]
+				for column in range(1, len(term) + 1):
+					if term[column - 1] == label:
+						cost = previousRow[column - 1]
+					else:
+						cost = previousRow[column - 1] + 1
+					row.append(min(cost, row[column - 1] + 1, previousRow[column] + 1))
+
+				if row[-1] <= maxDistance:
+					if self.prefix:
+						# the whole subtree matches; no need to go deeper
+						matches.append((word + label, row[-1], child))
+						continue
+					if child.content:
+						matches.append((word + label, row[-1], child))
+
+				if min(row) <= maxDistance:
+					stack.append((child, word + label, row))
+
+		return matches, visited
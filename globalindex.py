@@ -0,0 +1,202 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from pipeline import logger
+from tokeniser import normaliseWord
+from suffixarray import vocabulary
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+from bisect import bisect_left
+from corpusfile import loadCorpusFile
+import os
+
+def corpusOccurrences(corpus):
+	""" Returns a dict of word => list of (startTime, endTime) of the chunks
+		containing it, for a trie or reverse-indexed dict.  Returns an
+		empty dict for other kinds of corpus.
+	"""
+
+	if isinstance(corpus, dict):
+		items = corpus.iteritems()
+	elif hasattr(corpus, 'getNode') and hasattr(corpus, 'getSubtree'):
+		items = ((word, corpus.getNode(word).content) for word in vocabulary(corpus))
+	else:
+		return {}
+
+	occurrences = {}
+	for word, chunks in items:
+		if word != '' and chunks:
+			occurrences[word] = sorted(set((chunk.startTime, chunk.endTime) for chunk in chunks))
+
+	return occurrences
+
+class Shard:
+	""" Word index over a subset of the saved corpora """
+
+	def __init__(self):
+		self.corpora = {} # (videoID, corpusTag) => (mtime, occurrences)
+		self.words = []	  # sorted vocabulary of every corpus in this shard
+		self.postings = {} # word => list of (videoID, corpusTag, start, end)
+		self.dirty = False
+		self.lock = Lock()
+
+	def update(self, key, mtime, occurrences):
+		with self.lock:
+			self.corpora[key] = (mtime, occurrences)
+			self.dirty = True
+
+	def remove(self, key):
+		with self.lock:
+			del self.corpora[key]
+			self.dirty = True
+
+	def modified(self, key):
+		""" Returns the mtime of the given corpus when it was indexed """
+
+		if key in self.corpora:
+			return self.corpora[key][0]
+		return None
+
+	def rebuild(self):
+		""" Rebuilds the combined word index after corpora change """
+
+		postings = {}
+		for (videoID, corpusTag), (mtime, occurrences) in self.corpora.iteritems():
+			for word, times in occurrences.iteritems():
+				entries = postings.setdefault(word, [])
+				for start, end in times:
+					entries.append((videoID, corpusTag, start, end))
+
+		self.postings = postings
+		self.words = sorted(postings)
+		self.dirty = False
+
+	def search(self, terms):
+		""" Returns a list of (videoID, corpusTag, start, end) for every
+			occurrence of a word starting with any of the terms """
+
+		with self.lock:
+			if self.dirty:
+				self.rebuild()
+			words, postings = self.words, self.postings
+
+		results = []
+		for term in terms:
+			index = bisect_left(words, term)
+			while index < len(words) and words[index].startswith(term):
+				results.extend(postings[words[index]])
+				index += 1
+
+		return results
+
+class GlobalIndex:
+	""" Searches every corpus saved under saveDir by Pipeline.saveCorpus,
+		answering which videos mention a word, and when.
+
+		Saved corpora are split into shards by video ID.  Each corpus is
+		only loaded when it is first seen or its file changes, and its
+		words and chunk times are kept in its shard's index, so a query
+		only fans out across the shards on a pool of worker threads and
+		merges their results.
+	"""
+
+	def __init__(self, saveDir='./sav/', shardCount=4, workers=4):
+		self.saveDir = saveDir
+		self.shards = [Shard() for index in range(shardCount)]
+		self.pool = ThreadPool(workers)
+		self.lock = Lock()
+
+	def shardFor(self, videoID):
+		return self.shards[hash(videoID) % len(self.shards)]
+
+	def loadCorpus(self, filename):
+		return loadCorpusFile(filename)
+
+	def refresh(self):
+		""" Indexes saved corpora that are new or have changed since the
+			last refresh, and forgets deleted ones """
+
+		with self.lock:
+			found = set()
+
+			if os.path.isdir(self.saveDir):
+				for videoID in os.listdir(self.saveDir):
+					vidDir = os.path.join(self.saveDir, videoID)
+					if not os.path.isdir(vidDir):
+						continue
+
+					for corpusTag in os.listdir(vidDir):
+						# partly written by saveCorpusFile
+						if corpusTag.endswith('.tmp'):
+							continue
+
+						filename = os.path.join(vidDir, corpusTag)
+						key = (videoID, corpusTag)
+						found.add(key)
+
+						mtime = os.path.getmtime(filename)
+						shard = self.shardFor(videoID)
+
+						if shard.modified(key) == mtime:
+							continue
+
+						logger.info("Indexing saved corpus {} for global search".format(filename))
+
+						try:
+							occurrences = corpusOccurrences(self.loadCorpus(filename))
+						except Exception as e:
+							logger.error("Could not index saved corpus {}: {}".format(filename, e))
+							occurrences = {}
+
+						shard.update(key, mtime, occurrences)
+
+			for shard in self.shards:
+				for key in shard.corpora.keys():
+					if key not in found:
+						shard.remove(key)
+
+	def search(self, terms):
+		""" Returns a dict of videoID => list of {'corpus', 'start', 'end'}
+			dicts, in time order, for every saved corpus containing a word
+			starting with any of the terms """
+
+		if isinstance(terms, basestring):
+			terms = terms.split()
+
+		terms = [normaliseWord(term) for term in terms]
+		terms = [term for term in terms if term != '']
+
+		self.refresh()
+
+		if not terms:
+			return {}
+
+		shardResults = self.pool.map(lambda shard: shard.search(terms), self.shards)
+
+		merged = {}
+		for results in shardResults:
+			for videoID, corpusTag, start, end in results:
+				merged.setdefault(videoID, set()).add((start, end, corpusTag))
+
+		results = {}
+		for videoID in merged:
+			results[videoID] = [{'corpus': corpusTag, 'start': start, 'end': end}
+				for start, end, corpusTag in sorted(merged[videoID])]
+
+		return results
@@ -0,0 +1,200 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from exampleplugins import SRTTrieMiner, VSSTrieMiner
+from corpusfile import saveCorpusFile
+from multiprocessing import Pool, cpu_count
+import argparse, os, time
+
+# subtitle file extension => (miner, tag of the corpus it is saved as);
+# the tags match the sample timelines', so saved corpora are found by
+# Pipeline.loadCorpus()
+formats = {
+	'.srt': (SRTTrieMiner, 'srttrieminer'),
+	'.vtt': (VSSTrieMiner, 'vsstrieminer'),
+	'.vss': (VSSTrieMiner, 'vsstrieminer'),
+}
+
+def subtitleFiles(paths):
+	""" Returns the subtitle files given by 'paths'.  Directories are
+		searched recursively, and any other file not ending in a
+		subtitle extension is read as a manifest of paths, one per line,
+		relative to the manifest.
+	"""
+
+	files = []
+
+	for path in paths:
+		if os.path.isdir(path):
+			for directory, subdirectories, filenames in os.walk(path):
+				subdirectories.sort()
+				files.extend(os.path.join(directory, filename) for filename in sorted(filenames) if extension(filename) in formats)
+
+		elif extension(path) in formats:
+			files.append(path)
+
+		else:
+			with open(path, "r") as manifest:
+				listed = [line.strip() for line in manifest]
+			files.extend(subtitleFiles([os.path.join(os.path.dirname(path), line) for line in listed if line and not line.startswith("#")]))
+
+	return files
+
+def extension(path):
+	return os.path.splitext(path)[1].lower()
+
+def videoID(path):
+	""" The video ID a subtitle file is saved under: its name up to the
+		first '.', as in the acquirers' '<id>.en.vtt' """
+
+	return os.path.basename(path).split(".")[0]
+
+def ingestFile(job):
+	""" Parses and indexes one subtitle file and saves the trie to the
+		store, in a worker process.  Returns (path, size in bytes, error
+		message or None), so one bad file does not stop the batch.
+	"""
+
+	path, saveDir, corpusTag, recordPositions, completions = job
+	miner, defaultTag = formats[extension(path)]
+
+	try:
+		trie = miner(recordPositions=recordPositions, completions=completions).build(path)
+
+		vidDir = os.path.join(saveDir, videoID(path))
+		if not os.path.isdir(vidDir):
+			try:
+				os.makedirs(vidDir)
+			except OSError:
+				# another worker made it first
+				if not os.path.isdir(vidDir):
+					raise
+
+		saveCorpusFile(trie, os.path.join(vidDir, corpusTag or defaultTag))
+	except Exception as e:
+		return path, os.path.getsize(path), "{}: {}".format(type(e).__name__, e)
+
+	return path, os.path.getsize(path), None
+
+def ingestFiles(jobs):
+	""" Runs ingestFile() on each of a batch of jobs, in one worker task;
+		only the results are sent back, as the tries are saved there """
+
+	return [ingestFile(job) for job in jobs]
+
+def batches(jobs, tasks):
+	""" Splits jobs, in order, into about 'tasks' batches of similar total
+		file size: several small files to a batch, so each costs one round
+		trip to a worker rather than one each, and a large file alone """
+
+	sizes = [os.path.getsize(job[0]) for job in jobs]
+	share = float(sum(sizes)) / max(tasks, 1)
+
+	batch = []
+	size = 0
+	for job, jobSize in zip(jobs, sizes):
+		batch.append(job)
+		size += jobSize
+		if size >= share:
+			yield batch
+			batch = []
+			size = 0
+
+	if batch:
+		yield batch
+
+def ingest(paths, saveDir='./sav/', corpusTag=None, workers=None, recordPositions=True, completions=10, progress=None):
+	""" Indexes the subtitle files given by 'paths' (as subtitleFiles())
+		across a pool of 'workers' processes, by default one per CPU, and
+		saves each to saveDir as Pipeline.saveCorpus() would, under its
+		video ID and 'corpusTag' (by default the tag for its format),
+		with token positions and offsets if recordPositions is set and
+		'completions' stored per trie node.
+
+		Files are handed out largest first, in batches of about an equal
+		share of the bytes, four per worker, as workers become free: a
+		huge file alone, so it does not hold up the small ones, and small
+		files several at a time.  progress, if given, is called with the
+		result of each file as its batch finishes.  Returns (files,
+		bytes, seconds, failures), failures being a list of (path, error
+		message).
+	"""
+
+	files = subtitleFiles(paths)
+	files.sort(key=os.path.getsize, reverse=True)
+
+	# files saved under the same video ID and tag would overwrite each other
+	seen = {}
+	failures = []
+	jobs = []
+
+	for path in files:
+		target = (videoID(path), corpusTag or formats[extension(path)][1])
+
+		if target in seen:
+			failures.append((path, "same video ID and tag as {}".format(seen[target])))
+		else:
+			seen[target] = path
+			jobs.append((path, saveDir, corpusTag, recordPositions, completions))
+
+	start = time.time()
+	size = 0
+
+	workers = workers or cpu_count()
+
+	pool = Pool(workers)
+	try:
+		for results in pool.imap_unordered(ingestFiles, batches(jobs, 4 * workers)):
+			for result in results:
+				path, fileSize, error = result
+				size += fileSize
+
+				if error is not None:
+					failures.append((path, error))
+				if progress is not None:
+					progress(result)
+	finally:
+		pool.close()
+		pool.join()
+
+	return len(jobs), size, time.time() - start, failures
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="Indexes subtitle files (.srt, .vtt) in parallel into the saved corpus store")
+	parser.add_argument('paths', nargs='+', help="subtitle files, directories of them, or manifests listing one path per line")
+	parser.add_argument('--store', default='./sav/', help="saved corpus directory (default ./sav/)")
+	parser.add_argument('--tag', default=None, help="corpus tag to save as (default srttrieminer or vsstrieminer, by format)")
+	parser.add_argument('--workers', type=int, default=None, help="worker processes (default one per CPU)")
+	parser.add_argument('--completions', type=int, default=10, help="completions stored per trie node, 0 for none (default 10)")
+	parser.add_argument('--no-positions', dest='positions', action='store_false', help="do not record token positions and offsets")
+	parser.add_argument('--verbose', action='store_true', help="print each file as it is indexed")
+	args = parser.parse_args()
+
+	def progress(result):
+		if args.verbose and result[2] is None:
+			print result[0]
+
+	files, size, seconds, failures = ingest(args.paths, args.store, args.tag, args.workers, args.positions, args.completions or None, progress)
+
+	for path, error in failures:
+		print "FAILED", path, error
+
+	megabytes = size / 1048576.0
+	seconds = max(seconds, 1e-6)
+	print "Indexed {} files ({:.1f} MB) in {:.2f}s: {:.1f} files/s, {:.2f} MB/s, {} failed".format(files, megabytes, seconds, files / seconds, megabytes / seconds, len(failures))
@@ -0,0 +1,245 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from pipeline import SearchEngine
+from postings import insertionPoint, mergePoints, splice
+from array import array
+from bisect import bisect_left, bisect_right
+import re
+
+class IntervalIndex:
+	""" Index of chunks (or anything with a startTime and endTime) by time.
+
+		Chunks are sorted by startTime, with their start and end times
+		held in parallel arrays.  A chunk overlapping a window must start
+		no earlier than the window's start minus the longest chunk's
+		duration, so a window or point-in-time lookup is two bisections
+		plus a scan of the chunks starting in that range.
+	"""
+
+	def __init__(self, chunks):
+		self.chunks = sorted(chunks, key=lambda chunk: (chunk.startTime, chunk.endTime))
+		self.starts = array('d', [chunk.startTime for chunk in self.chunks])
+		self.ends = array('d', [chunk.endTime for chunk in self.chunks])
+
+		self.maxDuration = 0
+		for index in range(len(self.chunks)):
+			self.maxDuration = max(self.maxDuration, self.ends[index] - self.starts[index])
+
+	def __getstate__(self):
+		""" Pickles arrays as raw bytes rather than lists of floats """
+
+		state = self.__dict__.copy()
+		for key in ('starts', 'ends'):
+			state[key] = state[key].tostring()
+		return state
+
+	def __setstate__(self, state):
+		for key in ('starts', 'ends'):
+			state[key] = array('d', state[key])
+		self.__dict__.update(state)
+
+	def add(self, chunk):
+		""" Adds a chunk, keeping the chunks in the (startTime, endTime)
+			order of posting lists, which merge() relies on """
+
+		index = insertionPoint(self.chunks, chunk)
+		self.chunks.insert(index, chunk)
+		self.starts.insert(index, chunk.startTime)
+		self.ends.insert(index, chunk.endTime)
+		self.maxDuration = max(self.maxDuration, chunk.endTime - chunk.startTime)
+
+	def remove(self, chunk):
+		""" Removes a chunk.  maxDuration is left as it was, which only
+			widens the range of candidates scanned. """
+
+		lo = bisect_left(self.starts, chunk.startTime)
+		hi = bisect_right(self.starts, chunk.startTime)
+
+		for index in range(lo, hi):
+			if self.chunks[index] is chunk:
+				del self.chunks[index]
+				del self.starts[index]
+				del self.ends[index]
+				return
+
+	def merge(self, other):
+		""" Adds the chunks of another IntervalIndex that are not already
+			in this one """
+
+		base, extra = self, other
+		if len(base.chunks) < len(extra.chunks):
+			base, extra = extra, base
+
+		points = mergePoints(base.chunks, extra.chunks)
+
+		self.chunks = splice(base.chunks, points, extra.chunks)
+		self.starts = splice(base.starts, points, extra.starts)
+		self.ends = splice(base.ends, points, extra.ends)
+		self.maxDuration = max(self.maxDuration, other.maxDuration)
+
+	def candidateRange(self, start, end):
+		""" Returns the [lo, hi) range of chunks that might overlap the
+			window, i.e. that start between start - maxDuration and end """
+
+		lo = bisect_left(self.starts, start - self.maxDuration)
+		hi = bisect_right(self.starts, end)
+		return lo, hi
+
+	def overlapping(self, start, end):
+		""" Returns the chunks overlapping the window [start, end], in time
+			order """
+
+		lo, hi = self.candidateRange(start, end)
+		ends = self.ends
+
+		return [self.chunks[index] for index in range(lo, hi) if ends[index] >= start]
+
+	def at(self, time):
+		""" Returns the chunks being shown at the given time """
+
+		return self.overlapping(time, time)
+
+	def restrict(self, results, start, end):
+		""" Returns those of 'results' that overlap the window [start, end].
+			Checks each result's times, or looks results up among the
+			window's chunks, whichever has fewer to check.
+		"""
+
+		results = list(results)
+		lo, hi = self.candidateRange(start, end)
+
+		if len(results) <= hi - lo:
+			return [chunk for chunk in results if chunk.startTime <= end and chunk.endTime >= start]
+
+		window = set(id(chunk) for chunk in self.overlapping(start, end))
+		return [chunk for chunk in results if id(chunk) in window]
+
+def timed(chunks):
+	""" Whether every chunk has the startTime and endTime an IntervalIndex
+		needs, which e.g. plain chunk numbers do not """
+
+	for chunk in chunks:
+		if not hasattr(chunk, 'startTime') or not hasattr(chunk, 'endTime'):
+			return False
+	return True
+
+def parseTime(text):
+	""" Converts '[hh:]mm:ss[.mmm]' or a number of seconds into a float
+		number of seconds """
+
+	seconds = 0.0
+	for part in text.split(":"):
+		seconds = seconds * 60 + float(part)
+	return seconds
+
+class TimeWindowSearch(SearchEngine):
+	""" Restricts another search engine's results to a window of time.
+
+		Search terms of the form 'from:10:00', 'to:20:00' or 'at:12:34'
+		set the window, and the remaining terms are passed to the wrapped
+		engine.  With no other terms, every chunk in the window is
+		returned, e.g. 'at:12:34' gives what is said at 12:34.
+
+		Uses the IntervalIndex a trie miner stores in the corpus's
+		'intervals' attribute, or builds one where there is none.
+	"""
+
+	windowPattern = re.compile(r'^(from|to|at):([0-9:.]+)$', re.IGNORECASE)
+
+	def __init__(self, engine):
+		self.engine = engine
+
+	def splitTerms(self, terms):
+		""" Returns (start, end, remaining terms) """
+
+		if isinstance(terms, basestring):
+			terms = terms.split()
+
+		start = float('-inf')
+		end = float('inf')
+		remaining = []
+
+		for term in terms:
+			match = self.windowPattern.match(term)
+
+			if match is None:
+				remaining.append(term)
+				continue
+
+			try:
+				time = parseTime(match.group(2))
+			except ValueError:
+				remaining.append(term)
+				continue
+
+			kind = match.group(1).lower()
+			if kind in ('from', 'at'):
+				start = time
+			if kind in ('to', 'at'):
+				end = time
+
+		return start, end, remaining
+
+	def intervals(self, corpus):
+		index = getattr(corpus, 'intervals', None)
+
+		if index is None:
+			if isinstance(corpus, dict):
+				chunks = set(chunk for postings in corpus.itervalues() for chunk in postings)
+			else:
+				chunks = set(corpus.getPostings('') or [])
+			index = IntervalIndex(chunks)
+
+		return index
+
+	def performSearch(self, corpus, terms):
+		start, end, terms = self.splitTerms(terms)
+
+		if not terms:
+			return self.intervals(corpus).overlapping(start, end)
+
+		if start == float('-inf') and end == float('inf'):
+			return self.engine.performSearch(corpus, terms)
+
+		return self.restrict(corpus, self.engine.performSearch(corpus, terms), start, end)
+
+	def performRankedSearch(self, corpus, terms, limit):
+		start, end, terms = self.splitTerms(terms)
+
+		if not terms:
+			return self.intervals(corpus).overlapping(start, end)[:limit]
+
+		if start == float('-inf') and end == float('inf'):
+			return self.engine.performRankedSearch(corpus, terms, limit)
+
+		# rank everything, then keep the best results inside the window
+		results = self.engine.performRankedSearch(corpus, terms, None)
+
+		return self.restrict(corpus, results, start, end)[:limit]
+
+	def restrict(self, corpus, results, start, end):
+		""" Returns those of 'results' inside the window, in their order,
+			using the corpus's IntervalIndex if it has one """
+
+		index = getattr(corpus, 'intervals', None)
+		if index is None:
+			return [chunk for chunk in results if chunk.startTime <= end and chunk.endTime >= start]
+
+		return index.restrict(results, start, end)
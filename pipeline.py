@@ -17,8 +17,11 @@
 """
 
 from threading import Thread, current_thread, Lock
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 from time import sleep
-import logging, pickle, os
+from corpusfile import saveCorpusFile, loadCorpusFile
+import logging, os
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -48,6 +51,10 @@ class Timeline:
 		self.search = search
 		self.status = OUT_OF_DATE
 		self.successfulAcquirer=None
+
+		# corpusTag => corpus built from chunks published so far, while
+		# the first miner is still running
+		self.partial = {}
 		
 class Acquirer:
 	""" Basic definition for data acquisition class """
@@ -137,9 +144,21 @@ class SearchEngine:
 
 		return results
 
+	def performRankedSearch(self, corpus, terms, limit):
+		""" Returns at most 'limit' results, best first.  Engines that
+			can rank their results should override this; by default it
+			returns the first 'limit' results of performSearch().
+		"""
+
+		return list(self.performSearch(corpus, terms))[:limit]
+
 class DataMiner:
 	""" Basic definition for DataMiner class """
 
+	# set by the pipeline while build() runs; miners that produce chunks
+	# a few at a time may call publish(chunks) as each batch is ready
+	publish = None
+
 	def __init__(self, tempDir='./tmp/'):
 		self.tempDir = tempDir
 		self.status = OUT_OF_DATE
@@ -206,6 +225,21 @@ class DataMiner:
 
 		return corpus, READY
 
+	def addChunks(self, corpus, chunks):
+		""" Adds new chunks to a corpus built by this miner (a new,
+			empty one if corpus is None) and returns the corpus.  Miners
+			that cannot update a corpus incrementally return None.
+		"""
+
+		return None
+
+	def removeChunks(self, corpus, chunks):
+		""" Removes chunks from a corpus built by this miner and returns
+			the corpus, or None if it cannot be updated incrementally.
+		"""
+
+		return None
+
 	def checkStatus(self):
 		""" Returns plugin status """
 		return self.status
@@ -215,7 +249,7 @@ class DataMiner:
 		self.status = status
 
 class Pipeline:
-	def __init__(self):
+	def __init__(self, cacheSize=256, searchWorkers=4):
 		self.acquire = {}
 		self.mine = {}
 		self.search = {}
@@ -223,6 +257,29 @@ class Pipeline:
 		self.rawData = {}
 		self.corpus = {}
 
+		# search results, least recently used first; keys include the
+		# version of the corpus searched, which setCorpus() increments
+		self.cacheSize = cacheSize
+		self.cache = OrderedDict()
+		self.cacheLock = Lock()
+
+		# serialises chunks published by miners' worker threads
+		self.publishLock = Lock()
+
+		# runs the searches of performSearches(), started on first use
+		self.searchWorkers = searchWorkers
+		self.searchPool = None
+		self.searchPoolLock = Lock()
+		self.cacheHits = 0
+		self.cacheMisses = 0
+		self.corpusVersion = {}
+
+		# tags of intermediate corpora not kept once read, and how many
+		# timelines being generated still need each of them
+		self.transient = set()
+		self.transientUsers = {}
+		self.transientLock = Lock()
+
 	def listAcquirers(self):
 		""" Returns list of currently registered acquirers """
 
@@ -275,6 +332,7 @@ class Pipeline:
 
 		logger.info("Adding search '{0}'".format(tag))
 		self.search[tag] = search
+		self.clearCache()
 
 	def removeSearch(self, tag):
 		""" Remove the search engine tagged 'tag' """
@@ -282,12 +340,13 @@ class Pipeline:
 		if self.search.has_key(tag):
 			logger.info("Deleting search '{0}'".format(tag))
 			del self.search[tag]
+			self.clearCache()
 		else:
 			logger.error("No search '{0}'".format(tag))
 
-	def performSearch(self, corpusTag, searchTag, searchTerms):
+	def performSearch(self, corpusTag, searchTag, searchTerms, limit=None):
 		""" Perform a search on a given corpus with a given search engine, using searchterms
-			Returns a list of results """
+			Returns a list of results, or only the best 'limit' results if given """
 
 		logger.info("Performing search on corpus '{0}' with engine '{1}', terms '{2}'".format(corpusTag, searchTag, searchTerms))
 
@@ -299,7 +358,155 @@ class Pipeline:
 			logger.error("No corpus '{0}' available".format(corpusTag))
 			return
 
-		return self.search[searchTag].performSearch(self.corpus[corpusTag], searchTerms)
+		corpus = self.corpus[corpusTag]
+		key = self.cacheKey(corpusTag, corpus, searchTag, searchTerms, limit)
+
+		if key is not None:
+			with self.cacheLock:
+				if key in self.cache:
+					self.cacheHits += 1
+					results = self.cache.pop(key)
+					self.cache[key] = results # now most recently used
+					return results
+				self.cacheMisses += 1
+
+		if limit is not None:
+			results = self.search[searchTag].performRankedSearch(corpus, searchTerms, limit)
+		else:
+			results = self.search[searchTag].performSearch(corpus, searchTerms)
+
+		if key is not None and self.cacheSize > 0:
+			with self.cacheLock:
+				self.cache[key] = results
+				while len(self.cache) > self.cacheSize:
+					self.cache.popitem(last=False)
+
+		return results
+
+	def performSearches(self, searches, searchTerms, limit=None):
+		""" Performs several searches for the same terms, e.g. one per
+			timeline, given as a list of (corpusTag, searchTag) pairs.
+			Distinct searches run concurrently on a pool of
+			'searchWorkers' threads.  Returns a list of each search's
+			results, as performSearch() would, in the same order.
+		"""
+
+		distinct = list(OrderedDict.fromkeys(searches))
+
+		def search(pair):
+			return self.performSearch(pair[0], pair[1], searchTerms, limit)
+
+		if len(distinct) < 2 or self.searchWorkers < 2:
+			found = map(search, distinct)
+		else:
+			with self.searchPoolLock:
+				if self.searchPool is None:
+					self.searchPool = ThreadPool(self.searchWorkers)
+			found = self.searchPool.map(search, distinct)
+
+		results = dict(zip(distinct, found))
+		return [results[pair] for pair in searches]
+
+	def cacheKey(self, corpusTag, corpus, searchTag, searchTerms, limit):
+		""" Returns the search cache key for a search, or None if the
+			terms cannot be used as one """
+
+		if isinstance(searchTerms, basestring):
+			searchTerms = searchTerms.split()
+
+		try:
+			# not lowercased, as query operators are upper case
+			terms = tuple(term.strip() for term in searchTerms if term.strip())
+		except (TypeError, AttributeError):
+			return None
+
+		# the corpus's id guards against corpora written by buildAsyncCorpus,
+		# which bypasses setCorpus()
+		return (corpusTag, self.corpusVersion.get(corpusTag, 0), id(corpus), searchTag, terms, limit)
+
+	def clearCache(self):
+		""" Empties the search result cache """
+
+		with self.cacheLock:
+			self.cache.clear()
+
+	def setCorpus(self, corpusTag, corpus):
+		""" Stores a corpus, invalidating cached searches of any corpus it
+			replaces """
+
+		with self.cacheLock:
+			self.corpusVersion[corpusTag] = self.corpusVersion.get(corpusTag, 0) + 1
+
+			for key in self.cache.keys():
+				if key[0] == corpusTag:
+					del self.cache[key]
+
+		self.corpus[corpusTag] = corpus
+
+	def dropCorpus(self, corpusTag):
+		""" Forgets a corpus, invalidating cached searches of it """
+
+		self.setCorpus(corpusTag, None)
+		self.corpus.pop(corpusTag, None)
+
+	def markTransient(self, *corpusTags):
+		""" Marks corpora as transient: intermediate results that are
+			dropped as soon as the next miner of the timeline being
+			generated has been run on them, once no other timeline being
+			generated needs them.  The dropped corpus's miner is set
+			OUT_OF_DATE, so it is rebuilt if a later stage needs it again.
+			A timeline's last corpus is always kept.
+		"""
+
+		self.transient.update(corpusTags)
+
+	def holdTransient(self, timeline):
+		""" Returns the indexes of the transient corpora a timeline reads,
+			which are not dropped by other timelines until released """
+
+		held = [index for index, corpusTag in enumerate(timeline.corpus[:-1]) if corpusTag in self.transient]
+
+		with self.transientLock:
+			for index in held:
+				corpusTag = timeline.corpus[index]
+				self.transientUsers[corpusTag] = self.transientUsers.get(corpusTag, 0) + 1
+
+		return held
+
+	def releaseTransient(self, timeline, held, end=None):
+		""" Releases the transient corpora of a timeline held before index
+			'end' (or all of them), dropping those no longer needed.
+			Returns the set of corpus tags dropped. """
+
+		dropped = set()
+
+		with self.transientLock:
+			for index in list(held):
+				if end is not None and index >= end:
+					continue
+
+				held.remove(index)
+				corpusTag = timeline.corpus[index]
+				self.transientUsers[corpusTag] -= 1
+
+				if self.transientUsers[corpusTag] == 0:
+					del self.transientUsers[corpusTag]
+					logger.info("Dropping transient corpus '{}'".format(corpusTag))
+					self.dropCorpus(corpusTag)
+					self.setMinerStatus(timeline.miner[index], OUT_OF_DATE)
+					dropped.add(corpusTag)
+
+		return dropped
+
+	def stageNeeded(self, timeline, index):
+		""" A dropped transient corpus need not be rebuilt while every
+			later corpus of the timeline is up to date """
+
+		if timeline.corpus[index] not in self.transient or timeline.corpus[index] in self.corpus:
+			return True
+
+		later = timeline.miner[index + 1:]
+		return not later or any(self.getMinerStatus(miner) != READY for miner in later)
 
 	def performAcquire(self, acquireTag, *acquireArgs):
 		""" Performs an Acquire using the tagged Acquirer and stores
@@ -332,7 +539,7 @@ class Pipeline:
 		with self.mine[minerTag].lock:
 			if self.mine[minerTag].status != READY:
 				logger.info("Building corpus '{}' from rawData '{}' using miner '{}'".format(corpusTag, acquireTag, minerTag))
-				self.corpus[corpusTag] = self.mine[minerTag].buildCorpus(self.rawData[acquireTag])
+				self.setCorpus(corpusTag, self.mine[minerTag].buildCorpus(self.rawData[acquireTag]))
 			elif self.mine[minerTag].status == READY:
 				logger.info("Corpus '{}' already exists; skipping".format(corpusTag))
 
@@ -351,7 +558,7 @@ class Pipeline:
 		with self.mine[minerTag].lock:
 			if self.mine[minerTag].status != READY:
 				logger.info("Reprocessing corpus '{}' to corpus '{}' using miner '{}'".format(sourceCorpusTag, destCorpusTag, minerTag))
-				self.corpus[destCorpusTag] = self.mine[minerTag].buildCorpus(self.corpus[sourceCorpusTag])
+				self.setCorpus(destCorpusTag, self.mine[minerTag].buildCorpus(self.corpus[sourceCorpusTag]))
 			elif self.mine[minerTag].status == READY:
 				logger.info("Corpus '{}' already exists; skipping".format(destCorpusTag))
 
@@ -369,10 +576,16 @@ class Pipeline:
 		self.rawData = {}
 		self.corpus = {}
 
+		with self.cacheLock:
+			for corpusTag in self.corpusVersion:
+				self.corpusVersion[corpusTag] += 1
+			self.cache.clear()
+
 	def saveCorpus(self, corpusTag, id):
-		""" Pickles and saves a given searchable corpus to the storage
-			folder, tagged with both the video ID and the name of the
-			corpus.
+		""" Saves a given searchable corpus to the storage folder, tagged
+			with both the video ID and the name of the corpus.  Word
+			indexes are written in the binary format of corpusfile.py,
+			anything else is pickled.
 		"""
 
 		if not self.corpus.has_key(corpusTag) or not self.corpus[corpusTag]:
@@ -385,13 +598,12 @@ class Pipeline:
 			if not os.path.isdir(vidDir):
 				os.makedirs(vidDir)
 
-			with open(filename, "w") as file:
-				pickle.dump(self.corpus[corpusTag], file)
-				logger.info("Corpus saved to {}".format(filename))
+			saveCorpusFile(self.corpus[corpusTag], filename)
+			logger.info("Corpus saved to {}".format(filename))
 
 	def loadCorpus(self, corpusTag, id):
-		""" Loads and unpickles a given searchable corpus from the
-			storage folder.
+		""" Loads a given searchable corpus from the storage folder.
+			Binary corpus files are memory-mapped rather than read in.
 			Returns True if file exists, False if not.
 		"""
 
@@ -401,8 +613,13 @@ class Pipeline:
 		if os.path.isfile(filename):
 			logger.info("Loading saved corpus {}".format(filename))
 
-			with open(filename, "r") as file:
-				self.corpus[corpusTag] = pickle.load(file)
+			try:
+				corpus = loadCorpusFile(filename)
+			except ValueError as e:
+				logger.error("Could not load corpus {}: {}".format(filename, e))
+				return False
+
+			self.setCorpus(corpusTag, corpus)
 			return True
 		else:
 			logger.info("No saved corpus {}".format(filename))
@@ -428,6 +645,7 @@ class Pipeline:
 		print len(self.mine), "Data Miners registered:", self.listMiners()
 		print len(self.search), "Search Engines registered:", self.listSearch()
 		print len(self.corpus), "corpuses registered:", self.corpus.keys()
+		print len(self.cache), "cached searches,", self.cacheHits, "hits,", self.cacheMisses, "misses"
 
 	def getAcquireStatus(self, acquireTag):
 		return self.acquire[acquireTag].checkStatus()
@@ -502,6 +720,8 @@ class Pipeline:
 		t = current_thread().name
 		timeline.status = WAIT
 
+		held = self.holdTransient(timeline)
+
 		# result will hold ERROR only if this timeline triggered the error
 		result = None
 
@@ -519,31 +739,71 @@ class Pipeline:
 		else: # Log error state and do not proceed
 			timeline.status = ERROR
 			logger.error("No successful acquisition among acquirers {}".format(timeline.acquirer))
+			self.releaseTransient(timeline, held)
 			return
 
-		# perform initial mine
-		result = self.buildCorpus(timeline.miner[0], timeline.corpus[0], timeline.acquirer[acquireIndex])
+		# perform initial mine, letting the miner publish chunks as it goes
+		timeline.partial = {}
+
+		if self.stageNeeded(timeline, 0):
+			self.mine[timeline.miner[0]].publish = lambda chunks: self.publishChunks(timeline, chunks)
+
+			result = self.buildCorpus(timeline.miner[0], timeline.corpus[0], timeline.acquirer[acquireIndex])
+
+			self.mine[timeline.miner[0]].publish = None
 
 		# Did the prior mine complete successfully?
 		if self.getMinerStatus(timeline.miner[0]) == ERROR:
 			timeline.status = ERROR
 			logger.error("Error in miner {}".format(timeline.miner[0]))
+			self.releaseTransient(timeline, held)
 			return
 
 		# process remaining miner steps, if any
 		for index in range(1, len(timeline.miner)):
 
-			result = self.reprocess(timeline.miner[index], timeline.corpus[index-1], timeline.corpus[index])
+			if self.stageNeeded(timeline, index):
+				result = self.reprocess(timeline.miner[index], timeline.corpus[index-1], timeline.corpus[index])
 
 			# check for errors
 			if self.getMinerStatus(timeline.miner[index]) == ERROR:
 				logger.error("Error in miner {}".format(timeline.miner[index]))
 				timeline.status = ERROR
+				self.releaseTransient(timeline, held)
 				return
 
+			# the previous corpus has been read, so may be dropped
+			self.releaseTransient(timeline, held, index)
+
 		logger.info("{} done".format(timeline.prettyName))
+		timeline.partial = {}
 		timeline.status = READY
 
+	def publishChunks(self, timeline, chunks):
+		""" Adds chunks published by a timeline's first miner, while it is
+			still running, to partial versions of the timeline's later
+			corpora through each miner's addChunks(), so the timeline can
+			be searched as it fills in.  The later miners still build
+			the full corpora once the first miner finishes.
+		"""
+
+		with self.publishLock:
+			for index in range(1, len(timeline.miner)):
+				minerTag = timeline.miner[index]
+				corpusTag = timeline.corpus[index]
+
+				# an up-to-date corpus will not be rebuilt, so leave it be
+				if self.getMinerStatus(minerTag) == READY:
+					return
+
+				corpus = self.mine[minerTag].addChunks(timeline.partial.get(corpusTag), chunks)
+
+				if corpus is None:
+					return
+
+				timeline.partial[corpusTag] = corpus
+				self.setCorpus(corpusTag, corpus)
+
 	def getCorpus(self, tag):
 		""" Returns a reference to a given corpus, given its minerTag
 		"""
@@ -0,0 +1,253 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Operations on posting lists: lists of chunks sorted by time.
+#
+# The miners append chunks to each word's list in the order the chunks
+# were built, so the content of a single trie node or reverse-index entry
+# is already a posting list.  Lists gathered from several words (e.g. a
+# whole prefix subtree) must go through sortPostings() first.
+
+from bisect import bisect_left
+
+def chunkKey(chunk):
+	""" Sort key for posting lists """
+	return (chunk.startTime, chunk.endTime)
+
+def sortPostings(chunks):
+	""" Returns the given chunks as a sorted, deduplicated posting list """
+
+	unique = {}
+	for chunk in chunks:
+		unique[id(chunk)] = chunk
+
+	return sorted(unique.itervalues(), key=chunkKey)
+
+def gallop(postings, target, lo=0):
+	""" Returns the first index >= lo in 'postings' whose key is not less
+		than 'target'.  Probes lo+1, lo+2, lo+4... then bisects the last
+		step, so skipping k entries costs O(log k) key comparisons.
+	"""
+
+	n = len(postings)
+
+	if lo >= n or chunkKey(postings[lo]) >= target:
+		return lo
+
+	# postings[lo] < target from here on
+	step = 1
+	while lo + step < n and chunkKey(postings[lo + step]) < target:
+		lo += step
+		step *= 2
+
+	lo, hi = lo + 1, min(lo + step, n)
+	while lo < hi:
+		mid = (lo + hi) // 2
+		if chunkKey(postings[mid]) < target:
+			lo = mid + 1
+		else:
+			hi = mid
+	return lo
+
+def locate(postings, chunk, lo=0):
+	""" Searches 'postings' for 'chunk' from index lo.  Returns a tuple
+		of the chunk's index (None if not found) and the lo to use when
+		searching for the next, later chunk.
+	"""
+
+	key = chunkKey(chunk)
+	index = gallop(postings, key, lo)
+
+	# distinct chunks may share a timestamp, so check identity
+	probe = index
+	while probe < len(postings) and chunkKey(postings[probe]) == key:
+		if postings[probe] is chunk:
+			return probe, index
+		probe += 1
+
+	return None, index
+
+def insertionPoint(postings, chunk):
+	""" Returns the index at which inserting 'chunk' keeps 'postings' in
+		time order, after any chunks with the same times """
+
+	key = chunkKey(chunk)
+	lo, hi = 0, len(postings)
+
+	# chunks usually arrive in time order
+	if not hi or chunkKey(postings[-1]) <= key:
+		return hi
+
+	while lo < hi:
+		mid = (lo + hi) // 2
+		if key < chunkKey(postings[mid]):
+			hi = mid
+		else:
+			lo = mid + 1
+	return lo
+
+def mergePoints(postings, other):
+	""" Returns, for each chunk of 'other' not already in 'postings' (both
+		sorted), a pair of the index in 'postings' it belongs before and
+		its index in 'other'.  Gallops through 'postings', so merging m
+		chunks into n costs O(m log(n/m)) key comparisons.
+	"""
+
+	points = []
+	lo = 0
+	n = len(postings)
+
+	for index, chunk in enumerate(other):
+		found, lo = locate(postings, chunk, lo)
+		if found is not None:
+			continue
+
+		# after any chunks with the same times
+		key = chunkKey(chunk)
+		at = lo
+		while at < n and chunkKey(postings[at]) == key:
+			at += 1
+		points.append((at, index))
+
+	return points
+
+def splice(sequence, points, other):
+	""" Returns a copy of 'sequence' (a list or array) with the elements
+		of 'other' inserted at the points given by mergePoints() """
+
+	result = sequence[:0]
+	previous = 0
+
+	for at, index in points:
+		result.extend(sequence[previous:at])
+		result.append(other[index])
+		previous = at
+
+	result.extend(sequence[previous:])
+	return result
+
+def intersect(postingLists):
+	""" Returns the chunks found in every one of the given posting lists.
+		Starts from the rarest list and gallops through the others,
+		stopping as soon as the intersection is empty.
+	"""
+
+	if not postingLists:
+		return []
+
+	postingLists = sorted(postingLists, key=len)
+	result = postingLists[0]
+
+	for postings in postingLists[1:]:
+		if not result:
+			break
+
+		matches = []
+		index = 0
+		for chunk in result:
+			found, index = locate(postings, chunk, index)
+			if found is not None:
+				matches.append(chunk)
+		result = matches
+
+	return list(result)
+
+def union(postingLists):
+	""" Returns the chunks found in any of the given posting lists """
+
+	chunks = []
+	for postings in postingLists:
+		chunks.extend(postings)
+
+	return sortPostings(chunks)
+
+def difference(postings, exclude):
+	""" Returns the chunks in 'postings' that are not in 'exclude' """
+
+	excluded = set(id(chunk) for chunk in exclude)
+
+	return [chunk for chunk in postings if id(chunk) not in excluded]
+
+# Compressed posting lists: sorted integer chunk IDs, stored as the gaps
+# between successive IDs, each packed as a varint (7 bits per byte, high
+# bit set on every byte but the last).
+
+def encodeIds(ids):
+	""" Packs a sorted list of integer IDs into a byte string """
+
+	data = bytearray()
+	previous = 0
+
+	for value in ids:
+		gap = value - previous
+		previous = value
+
+		while gap >= 0x80:
+			data.append((gap & 0x7f) | 0x80)
+			gap >>= 7
+		data.append(gap)
+
+	return str(data)
+
+def decodeIds(data):
+	""" Unpacks a byte string from encodeIds into a list of IDs """
+
+	ids = []
+	append = ids.append
+	value = 0
+	gap = 0
+	shift = 0
+
+	for byte in bytearray(data):
+		if byte & 0x80:
+			gap |= (byte & 0x7f) << shift
+			shift += 7
+		else:
+			value += gap | (byte << shift)
+			append(value)
+			gap = 0
+			shift = 0
+
+	return ids
+
+def intersectIds(idLists):
+	""" Returns the IDs found in every one of the given sorted ID lists,
+		starting from the shortest and bisecting through the others """
+
+	if not idLists:
+		return []
+
+	idLists = sorted(idLists, key=len)
+	result = idLists[0]
+
+	for ids in idLists[1:]:
+		if not result:
+			break
+
+		matches = []
+		lo = 0
+		n = len(ids)
+		for value in result:
+			lo = bisect_left(ids, value, lo)
+			if lo == n:
+				break
+			if ids[lo] == value:
+				matches.append(value)
+		result = matches
+
+	return list(result)
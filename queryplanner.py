@@ -0,0 +1,128 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+# Query planning: orders and prunes the terms of a search using the
+# posting counts the corpora record per trie node, so the cheapest terms
+# are evaluated first and no subtree is walked when the result is already
+# known.
+
+from tokeniser import tokeniserFor
+
+# words per chunk assumed when the corpus has no chunk stats
+DEFAULT_CHUNK_LENGTH = 10
+
+def postingCount(corpus, prefix):
+	""" Returns the number of postings under 'prefix' in the corpus, or
+		None if it cannot be told without fetching them """
+
+	count = getattr(corpus, 'postingCount', None)
+
+	if count is None:
+		return None
+	return count(prefix)
+
+def coveringTerms(terms):
+	""" Returns the distinct prefix terms that do not extend another one,
+		for OR: a search for 'learn' already finds 'learning' """
+
+	kept = []
+
+	for term in sorted(set(terms)):
+		if kept and term.startswith(kept[-1]):
+			continue
+		kept.append(term)
+
+	return kept
+
+def narrowestTerms(terms):
+	""" Returns the distinct prefix terms that no other one extends, for
+		AND: every chunk with a word starting 'learning' has one starting
+		'learn' """
+
+	terms = sorted(set(terms))
+
+	# any extension of a term sorts immediately after it
+	return [term for index, term in enumerate(terms) if index + 1 == len(terms) or not terms[index + 1].startswith(term)]
+
+def estimate(corpus, query):
+	""" Returns the estimated number of postings evaluating a query tree
+		(see querysearch.QueryParser) reads, or None if unknown """
+
+	kind = query[0]
+
+	if kind == 'TERM':
+		return postingCount(corpus, query[1])
+
+	if kind == 'PHRASE':
+		counts = [postingCount(corpus, word) for word in query[1]]
+	elif kind == 'NEAR':
+		counts = [postingCount(corpus, query[2]), postingCount(corpus, query[3])]
+	elif kind == 'NOT':
+		return postingCount(corpus, '')
+	else:
+		counts = [estimate(corpus, q) for q in query[1] if q[0] != 'NOT']
+
+	if None in counts or not counts:
+		return None
+	if kind == 'OR':
+		return sum(counts)
+	return min(counts)
+
+def orderByCost(corpus, queries):
+	""" Returns the queries cheapest first.  Queries of unknown cost keep
+		their order, after the others. """
+
+	def cost(query):
+		count = estimate(corpus, query)
+		return (count is None, count)
+
+	return sorted(queries, key=cost)
+
+def chunkWords(corpus, chunk):
+	""" Returns the words of a chunk, as recorded at index time where the
+		corpus has them """
+
+	tokens = getattr(corpus, 'tokens', None)
+
+	if tokens is not None:
+		found = tokens.get(chunk)
+		if found is not None:
+			return found[0]
+
+	return tokeniserFor(corpus).words(chunk.getFullText())
+
+def cheaperToFilter(corpus, chunks, prefix):
+	""" Returns whether checking the words of each of 'chunks' for
+		'prefix' is cheaper than fetching the prefix's postings """
+
+	count = postingCount(corpus, prefix)
+
+	if count is None:
+		return False
+
+	stats = getattr(corpus, 'stats', None)
+	length = stats.averageLength() if stats is not None and stats.count() else DEFAULT_CHUNK_LENGTH
+
+	return len(chunks) * length < count
+
+def filterPrefix(corpus, chunks, prefix, keep=True):
+	""" Returns those of 'chunks' containing a word starting with
+		'prefix', or if keep is False those not containing one """
+
+	return [chunk for chunk in chunks if any(word.startswith(prefix) for word in chunkWords(corpus, chunk)) == keep]
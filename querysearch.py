@@ -0,0 +1,452 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from pipeline import SearchEngine
+from postings import sortPostings, locate, intersect, intersectIds, union, difference
+from tokeniser import defaultTokeniser, tokeniserFor
+from rankedsearch import BM25Scorer
+from queryplanner import coveringTerms, narrowestTerms, orderByCost, cheaperToFilter, filterPrefix
+import re
+
+class QueryParser:
+	""" Parses a query string into a tree of tuples:
+
+		('TERM', prefix)		chunks containing a word starting with prefix
+		('PHRASE', [words])		chunks containing the exact words in order
+		('NEAR', k, a, b)		chunks where words a and b are at most k
+								words apart
+		('AND', [queries])
+		('OR', [queries])
+		('NOT', query)
+
+		Terms next to each other are ANDed.  Operators are only
+		recognised in upper case, so 'not' and 'or' are searched for as
+		words.  Parentheses group.  The operands of NEAR/k are matched as
+		whole words.
+
+		Words are normalised by 'tokeniser', which should be the one the
+		searched corpus was built with.
+	"""
+
+	tokenPattern = re.compile(r'"[^"]*"?|\(|\)|[^\s()"]+')
+	nearPattern = re.compile(r'^NEAR/(\d+)$')
+
+	def __init__(self, tokeniser=defaultTokeniser):
+		self.tokeniser = tokeniser
+
+	def parse(self, query):
+		""" Returns the query tree for 'query', or None if it is empty """
+
+		self.tokens = self.tokenPattern.findall(query)
+		self.position = 0
+
+		result = self.parseOr()
+
+		# ignore any unbalanced closing parentheses
+		while self.position < len(self.tokens):
+			self.position += 1
+			result = self.combine('AND', [result, self.parseOr()])
+
+		return result
+
+	def peek(self):
+		if self.position < len(self.tokens):
+			return self.tokens[self.position]
+		return None
+
+	def isOperator(self, token, operator):
+		return token == operator
+
+	def combine(self, operator, queries):
+		queries = [query for query in queries if query is not None]
+
+		if not queries:
+			return None
+		if len(queries) == 1:
+			return queries[0]
+		return (operator, queries)
+
+	def parseOr(self):
+		queries = [self.parseAnd()]
+
+		while self.isOperator(self.peek(), 'OR'):
+			self.position += 1
+			queries.append(self.parseAnd())
+
+		return self.combine('OR', queries)
+
+	def parseAnd(self):
+		queries = []
+
+		while True:
+			token = self.peek()
+
+			if token is None or token == ')' or self.isOperator(token, 'OR'):
+				break
+
+			if self.isOperator(token, 'AND'):
+				self.position += 1
+				continue
+
+			queries.append(self.parseNot())
+
+		return self.combine('AND', queries)
+
+	def parseNot(self):
+		if self.isOperator(self.peek(), 'NOT'):
+			self.position += 1
+			query = self.parseNot()
+			if query is None:
+				return None
+			return ('NOT', query)
+
+		return self.parseNear()
+
+	def nearDistance(self, token):
+		""" Returns k if token is a NEAR/k operator, otherwise None """
+
+		if token is None:
+			return None
+
+		match = self.nearPattern.match(token)
+		if match:
+			return int(match.group(1))
+		return None
+
+	def parseNear(self):
+		query = self.parseAtom()
+
+		while self.nearDistance(self.peek()) is not None:
+			distance = self.nearDistance(self.peek())
+			self.position += 1
+
+			query = self.near(query, self.parseAtom(), distance)
+
+		return query
+
+	def edgeWord(self, query, end):
+		""" Returns the first (end=0) or last (end=-1) word of a query, if
+			it has one that a NEAR operator can be applied to """
+
+		if query is None:
+			return None
+
+		kind = query[0]
+
+		if kind == 'TERM':
+			return query[1]
+		if kind == 'PHRASE':
+			return query[1][end]
+		if kind == 'NEAR':
+			return query[3 if end else 2]
+		if kind == 'AND':
+			return self.edgeWord(query[1][end], end)
+		return None
+
+	def near(self, left, right, distance):
+		first = self.edgeWord(left, -1)
+		second = self.edgeWord(right, 0)
+
+		if first is None or second is None:
+			return self.combine('AND', [left, right])
+
+		# a lone term is fully covered by the NEAR itself
+		queries = [q for q in (left, right) if q[0] != 'TERM']
+
+		return self.combine('AND', queries + [('NEAR', distance, first, second)])
+
+	def parseAtom(self):
+		token = self.peek()
+
+		if token is None or token == ')':
+			return None # dangling operator
+
+		self.position += 1
+
+		if token == '(':
+			query = self.parseOr()
+			if self.peek() == ')':
+				self.position += 1
+			return query
+
+		if token.startswith('"'):
+			words = self.tokeniser.words(token.strip('"'))
+			if not words:
+				return None
+			return ('PHRASE', words)
+
+		return ('TERM', self.tokeniser.normalise(token))
+
+class BooleanSearch(SearchEngine):
+	""" Searches a trie (or a reverse-indexed dict of word => chunks) with
+		AND, OR, NOT and "exact phrase" queries, by intersecting sorted
+		posting lists rarest-first.  Returns a time-ordered list of chunks.
+
+		The operands of an AND are evaluated cheapest first, by the posting
+		counts the corpus records (see queryplanner.py), stopping once the
+		result is empty.  Once few chunks are left, later terms are checked
+		against the chunks' words rather than fetching their postings.  On
+		a CompressedIndex the leading terms are intersected as chunk IDs,
+		and only the IDs left are looked up as chunks.
+	"""
+
+	def performSearch(self, corpus, terms):
+		""" 'terms' is a query string, or a list of words as split by the
+			frontend, which are rejoined before parsing """
+
+		if not isinstance(terms, basestring):
+			terms = " ".join(terms)
+
+		query = QueryParser(tokeniserFor(corpus)).parse(terms)
+
+		if query is None:
+			return []
+
+		return self.evaluate(corpus, query)
+
+	def performRankedSearch(self, corpus, terms, limit):
+		""" Returns the best 'limit' matches, ranked by the BM25 score of
+			the query's words (negated words are not scored) """
+
+		if not isinstance(terms, basestring):
+			terms = " ".join(terms)
+
+		query = QueryParser(tokeniserFor(corpus)).parse(terms)
+
+		if query is None:
+			return []
+
+		matches = self.evaluate(corpus, query)
+
+		scores = dict((id(chunk), (0.0, chunk)) for chunk in matches)
+		scores.update(BM25Scorer().score(corpus, self.queryWords(query), matches))
+
+		return BM25Scorer().topChunks(scores, limit)
+
+	def queryWords(self, query):
+		""" Returns the words a query tree looks for, outside NOT """
+
+		kind = query[0]
+
+		if kind == 'TERM':
+			return [query[1]]
+		if kind == 'PHRASE':
+			return list(query[1])
+		if kind == 'NEAR':
+			return [query[2], query[3]]
+		if kind == 'NOT':
+			return []
+
+		words = []
+		for q in query[1]:
+			words.extend(self.queryWords(q))
+		return words
+
+	def evaluate(self, corpus, query):
+		""" Returns the posting list matching the given query tree """
+
+		kind = query[0]
+
+		if kind == 'TERM':
+			return self.prefixPostings(corpus, query[1])
+
+		if kind == 'PHRASE':
+			return self.phrasePostings(corpus, query[1])
+
+		if kind == 'NEAR':
+			return self.nearPostings(corpus, query[2], query[3], query[1])
+
+		if kind == 'OR':
+			# 'learn' already finds 'learning'
+			terms = coveringTerms([q[1] for q in query[1] if q[0] == 'TERM'])
+			queries = [('TERM', term) for term in terms] + [q for q in query[1] if q[0] != 'TERM']
+			return union([self.evaluate(corpus, q) for q in queries])
+
+		if kind == 'NOT':
+			return difference(self.prefixPostings(corpus, ''), self.evaluate(corpus, query[1]))
+
+		# AND: intersect the positive parts, then remove negated ones
+		positive = [q for q in query[1] if q[0] not in ('NOT', 'TERM')]
+		negative = [q[1] for q in query[1] if q[0] == 'NOT']
+
+		# a chunk with a word starting 'learning' has one starting 'learn'
+		terms = narrowestTerms([q[1] for q in query[1] if q[0] == 'TERM'])
+		positive = orderByCost(corpus, [('TERM', term) for term in terms] + positive)
+
+		if positive:
+			result = None
+			if hasattr(corpus, 'getPostingIds'):
+				result, positive = self.intersectTermIds(corpus, positive)
+
+			for q in positive:
+				if result is not None and not result:
+					return []
+
+				if result is not None and q[0] == 'TERM' and cheaperToFilter(corpus, result, q[1]):
+					result = filterPrefix(corpus, result, q[1])
+					continue
+
+				postings = self.evaluate(corpus, q)
+				result = postings if result is None else intersect([result, postings])
+		else:
+			result = self.prefixPostings(corpus, '')
+
+		for q in negative:
+			if not result:
+				break
+
+			if q[0] == 'TERM' and cheaperToFilter(corpus, result, q[1]):
+				result = filterPrefix(corpus, result, q[1], keep=False)
+			else:
+				result = difference(result, self.evaluate(corpus, q))
+
+		return result
+
+	def intersectTermIds(self, corpus, queries):
+		""" Intersects the chunk IDs of the leading TERM queries (as far as
+			fetching their postings beats filtering) in a CompressedIndex.
+			Returns the matching chunks, or None if no query was used, and
+			the queries left.
+		"""
+
+		ids = None
+		used = 0
+
+		for q in queries:
+			if q[0] != 'TERM' or ids is not None and (not ids or cheaperToFilter(corpus, ids, q[1])):
+				break
+
+			found = corpus.getPostingIds(q[1]) or []
+			ids = found if ids is None else intersectIds([ids, found])
+			used += 1
+
+		if ids is None:
+			return None, queries
+		return corpus.chunksOf(ids), queries[used:]
+
+	def prefixPostings(self, corpus, prefix):
+		""" Posting list of chunks containing a word starting with prefix """
+
+		if isinstance(corpus, dict):
+			return union([corpus[word] for word in corpus if word.startswith(prefix)])
+
+		postings = corpus.getPostings(prefix)
+
+		if postings is None:
+			return []
+		return sortPostings(postings)
+
+	def wordPostings(self, corpus, word):
+		""" Returns the posting list of chunks containing exactly 'word',
+			and its token positions within them (None if not recorded) """
+
+		if isinstance(corpus, dict):
+			positions = getattr(corpus, 'positions', None)
+
+			if positions is None:
+				return corpus.get(word, []), None
+			return corpus.get(word, []), positions.get(word)
+
+		node = corpus.getNode(word)
+
+		if node is None:
+			return [], None
+		return node.content, node.positions
+
+	def candidates(self, corpus, words):
+		""" Returns each word's (postings, positions), and the chunks that
+			contain every word """
+
+		lists = []
+		for word in words:
+			postings, positions = self.wordPostings(corpus, word)
+			if not postings:
+				return lists, []
+			lists.append((postings, positions))
+
+		return lists, intersect([postings for postings, positions in lists])
+
+	def wordPositions(self, lists, words, chunks, tokeniser):
+		""" Yields each chunk with the token positions of each word in it.
+			Uses the recorded positions, and only reads (with 'tokeniser')
+			the chunk's text for words whose positions were not recorded.
+		"""
+
+		cursors = [0] * len(words)
+
+		for chunk in chunks:
+			text = None
+			found = []
+
+			for i in range(len(words)):
+				postings, positions = lists[i]
+
+				if positions is not None:
+					index, cursors[i] = locate(postings, chunk, cursors[i])
+					found.append(positions.get(index))
+				else:
+					if text is None:
+						text = tokeniser.words(chunk.getFullText())
+					found.append([p for p, word in enumerate(text) if word == words[i]])
+
+			yield chunk, found
+
+	def phrasePostings(self, corpus, words):
+		""" Posting list of chunks containing 'words' consecutively """
+
+		lists, candidates = self.candidates(corpus, words)
+
+		if len(words) == 1:
+			return candidates
+
+		results = []
+		for chunk, found in self.wordPositions(lists, words, candidates, tokeniserFor(corpus)):
+			following = [set(positions) for positions in found[1:]]
+
+			for start in found[0]:
+				for offset in range(len(following)):
+					if start + offset + 1 not in following[offset]:
+						break
+				else:
+					results.append(chunk)
+					break
+
+		return results
+
+	def nearPostings(self, corpus, first, second, distance):
+		""" Posting list of chunks where the words 'first' and 'second'
+			occur at most 'distance' words apart """
+
+		lists, candidates = self.candidates(corpus, [first, second])
+
+		results = []
+		for chunk, found in self.wordPositions(lists, [first, second], candidates, tokeniserFor(corpus)):
+			# both position lists are ascending; step through them together
+			a, b = found
+			i = j = 0
+			while i < len(a) and j < len(b):
+				if abs(a[i] - b[j]) <= distance:
+					results.append(chunk)
+					break
+				if a[i] < b[j]:
+					i += 1
+				else:
+					j += 1
+
+		return results
@@ -0,0 +1,144 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from pipeline import SearchEngine
+from tokeniser import tokeniserFor
+from heapq import nlargest
+from math import log
+
+class BM25Scorer:
+	""" Scores chunks against a list of words with Okapi BM25, using the
+		word frequencies and chunk lengths recorded by a ReverseIndex (and
+		carried onto tries built from one).  Where they were not recorded
+		each word counts once and chunk length is ignored.
+	"""
+
+	def __init__(self, k1=1.2, b=0.75):
+		self.k1 = k1
+		self.b = b
+
+	def wordPostings(self, corpus, word):
+		""" Returns the chunks containing exactly 'word' and the word's
+			frequency in each (None if not recorded) """
+
+		if isinstance(corpus, dict):
+			frequencies = getattr(corpus, 'frequencies', None)
+
+			if frequencies is None:
+				return corpus.get(word, []), None
+			return corpus.get(word, []), frequencies.get(word)
+
+		node = corpus.getNode(word)
+
+		if node is None:
+			return [], None
+		return node.content, node.frequencies
+
+	def countChunks(self, corpus):
+		""" Counts the chunks in a corpus without recorded stats """
+
+		if isinstance(corpus, dict):
+			postings = [chunk for chunks in corpus.itervalues() for chunk in chunks]
+		else:
+			postings = corpus.getPostings('') or []
+
+		return len(set(id(chunk) for chunk in postings))
+
+	def score(self, corpus, words, candidates=None):
+		""" Returns a dict of id(chunk) => (score, chunk) for every chunk
+			containing any of the words, or only for those in the
+			'candidates' list if given """
+
+		stats = getattr(corpus, 'stats', None)
+
+		if stats is not None and stats.count():
+			chunkCount = stats.count()
+			averageLength = stats.averageLength() or 1.0
+		else:
+			stats = None
+			chunkCount = self.countChunks(corpus) or 1
+
+		if candidates is not None:
+			candidates = set(id(chunk) for chunk in candidates)
+
+		k1, b = self.k1, self.b
+		scores = {}
+
+		for word in set(words):
+			postings, frequencies = self.wordPostings(corpus, word)
+
+			if not postings:
+				continue
+
+			documentFrequency = len(postings)
+			idf = log(1 + (chunkCount - documentFrequency + 0.5) / (documentFrequency + 0.5))
+
+			for index, chunk in enumerate(postings):
+				if candidates is not None and id(chunk) not in candidates:
+					continue
+
+				if frequencies is not None:
+					frequency = frequencies[index]
+				else:
+					frequency = 1
+
+				if stats is not None:
+					norm = 1 - b + b * stats.lengths.get(chunk, averageLength) / averageLength
+				else:
+					norm = 1
+
+				score = idf * frequency * (k1 + 1) / (frequency + k1 * norm)
+
+				if id(chunk) in scores:
+					score += scores[id(chunk)][0]
+				scores[id(chunk)] = (score, chunk)
+
+		return scores
+
+	def topChunks(self, scores, limit):
+		""" Returns the chunks with the best scores, best first.  Uses a
+			heap, so only 'limit' chunks are ever kept in order.
+		"""
+
+		if limit is None:
+			ranked = sorted(scores.itervalues(), key=lambda item: item[0], reverse=True)
+		else:
+			ranked = nlargest(limit, scores.itervalues(), key=lambda item: item[0])
+
+		return [chunk for score, chunk in ranked]
+
+class BM25Search(SearchEngine):
+	""" Ranks the chunks of a trie or reverse index containing any of the
+		search terms (as whole words) by BM25 score """
+
+	def __init__(self, k1=1.2, b=0.75):
+		self.scorer = BM25Scorer(k1, b)
+
+	def performSearch(self, corpus, terms):
+		return self.performRankedSearch(corpus, terms, None)
+
+	def performRankedSearch(self, corpus, terms, limit):
+		if isinstance(terms, basestring):
+			terms = terms.split()
+
+		tokeniser = tokeniserFor(corpus)
+		words = [tokeniser.normalise(term) for term in terms]
+		scores = self.scorer.score(corpus, [word for word in words if word != ''])
+
+		return self.scorer.topChunks(scores, limit)
@@ -0,0 +1,281 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from postings import insertionPoint, locate
+from tokeniser import defaultTokeniser
+from array import array
+
+def wordPositions(words):
+	""" Returns a dict of word => list of its positions in 'words' """
+
+	found = {}
+
+	for position, word in enumerate(words):
+		if word in found:
+			found[word].append(position)
+		else:
+			found[word] = [position]
+
+	return found
+
+class Positions:
+	""" Token positions of one word within each chunk of its posting
+		list, packed into two arrays: the positions within the i'th chunk
+		are positions[offsets[i]:offsets[i+1]].
+	"""
+
+	def __init__(self):
+		self.offsets = array('I', [0])
+		self.positions = array('I')
+
+	def __len__(self):
+		return len(self.offsets) - 1
+
+	def __getstate__(self):
+		return (self.offsets.tostring(), self.positions.tostring())
+
+	def __setstate__(self, state):
+		self.offsets = array('I', state[0])
+		self.positions = array('I', state[1])
+
+	def append(self, positions):
+		""" Adds the positions within the next chunk of the posting list """
+
+		self.positions.extend(positions)
+		self.offsets.append(len(self.positions))
+
+	def get(self, index):
+		""" Returns the positions within the index'th chunk """
+
+		return self.positions[self.offsets[index]:self.offsets[index + 1]]
+
+	def inserted(self, index, positions):
+		""" Returns a copy with the given positions inserted as those of
+			the index'th chunk.  Tries may share Positions objects with the
+			ReverseIndex they were loaded from, so they are never changed
+			in place.
+		"""
+
+		copy = Positions()
+		copy.positions = self.positions[:self.offsets[index]]
+		copy.positions.extend(positions)
+		copy.positions.extend(self.positions[self.offsets[index]:])
+
+		copy.offsets = self.offsets[:index + 1]
+		copy.offsets.append(self.offsets[index] + len(positions))
+		copy.offsets.extend(offset + len(positions) for offset in self.offsets[index + 1:])
+		return copy
+
+	def spliced(self, points, other):
+		""" Returns a copy with the positions of chunks of 'other' (another
+			Positions) inserted at the points given by mergePoints() """
+
+		copy = Positions()
+		previous = 0
+
+		for at, index in points + [(len(self), None)]:
+			start, end = self.offsets[previous], self.offsets[at]
+			shift = len(copy.positions) - start
+
+			copy.offsets.extend(offset + shift for offset in self.offsets[previous + 1:at + 1])
+			copy.positions.extend(self.positions[start:end])
+
+			if index is not None:
+				copy.append(other.get(index))
+			previous = at
+
+		return copy
+
+	def removed(self, index):
+		""" Returns a copy without the positions of the index'th chunk """
+
+		start, end = self.offsets[index], self.offsets[index + 1]
+
+		copy = Positions()
+		copy.positions = self.positions[:start] + self.positions[end:]
+		copy.offsets = self.offsets[:index + 1]
+		copy.offsets.extend(offset - (end - start) for offset in self.offsets[index + 2:])
+		return copy
+
+class ChunkStats:
+	""" Number of words in each indexed chunk, for ranking """
+
+	def __init__(self):
+		self.lengths = {} # chunk => number of words
+		self.total = 0
+
+	def add(self, chunk, length):
+		# a trie shares its ReverseIndex's stats, so both may add a chunk
+		self.total += length - self.lengths.get(chunk, 0)
+		self.lengths[chunk] = length
+
+	def remove(self, chunk):
+		self.total -= self.lengths.pop(chunk, 0)
+
+	def count(self):
+		return len(self.lengths)
+
+	def copy(self):
+		stats = ChunkStats()
+		stats.lengths = dict(self.lengths)
+		stats.total = self.total
+		return stats
+
+	def averageLength(self):
+		if not self.lengths:
+			return 0.0
+		return float(self.total) / len(self.lengths)
+
+class ChunkTokens:
+	""" Words of each indexed chunk, with their character offsets within
+		the chunk's full text, so search results can be given snippets
+		without re-reading and re-tokenising the text """
+
+	def __init__(self):
+		self.tokens = {} # chunk => (tuple of words, array of offsets)
+
+	def add(self, chunk, words, offsets):
+		self.tokens[chunk] = (tuple(words), offsets)
+
+	def remove(self, chunk):
+		self.tokens.pop(chunk, None)
+
+	def get(self, chunk):
+		""" Returns the chunk's (words, offsets), or None if not recorded """
+		return self.tokens.get(chunk)
+
+	def copy(self):
+		tokens = ChunkTokens()
+		tokens.tokens = dict(self.tokens)
+		return tokens
+
+class ReverseIndex(dict):
+	""" Reverse-indexed dict of word => list of chunks containing word.
+
+		self.frequencies maps each word to an array of how often it occurs
+		in each of those chunks, and self.stats holds the chunks' lengths,
+		for ranking.
+
+		If recordPositions is set, self.positions also maps each word to
+		a Positions object holding its token positions within each of
+		those chunks, so phrase and proximity queries can be answered
+		without re-reading the chunks' text, and self.tokens holds the
+		words of each chunk and their offsets, for snippets.
+
+		Chunks are split into words by 'tokeniser', by default the
+		shared defaultTokeniser.
+	"""
+
+	# ChunkTokens, if recording positions
+	tokens = None
+
+	tokeniser = defaultTokeniser
+
+	def __init__(self, recordPositions=False, tokeniser=None):
+		dict.__init__(self)
+
+		if tokeniser is not None:
+			self.tokeniser = tokeniser
+
+		self.frequencies = {}
+		self.stats = ChunkStats()
+
+		if recordPositions:
+			self.positions = {}
+			self.tokens = ChunkTokens()
+		else:
+			self.positions = None
+			self.tokens = None
+
+	def addChunk(self, chunk):
+		""" Adds a reference to the chunk to each word it contains.  The
+			chunk is inserted in time order if it is earlier than chunks
+			already added.
+		"""
+
+		if self.tokens is not None:
+			words, offsets = self.tokeniser.withOffsets(chunk.getFullText())
+			self.tokens.add(chunk, words, offsets)
+		else:
+			words = self.tokeniser.words(chunk.getFullText())
+
+		self.stats.add(chunk, len(words))
+
+		found = wordPositions(words)
+
+		for word in found:
+			if word not in self:
+				self[word] = [chunk]
+				self.frequencies[word] = array('H', [len(found[word])])
+
+				if self.positions is not None:
+					self.positions[word] = Positions()
+					self.positions[word].append(found[word])
+				continue
+
+			postings = self[word]
+			index = insertionPoint(postings, chunk)
+			postings.insert(index, chunk)
+
+			# frequencies and positions may be shared with a trie, which
+			# only reads entries in step with its own content, so they
+			# are replaced rather than changed in place unless appending
+			if index == len(postings) - 1:
+				self.frequencies[word].append(len(found[word]))
+			else:
+				frequencies = array('H', self.frequencies[word])
+				frequencies.insert(index, len(found[word]))
+				self.frequencies[word] = frequencies
+
+			if self.positions is not None:
+				if index == len(postings) - 1:
+					self.positions[word].append(found[word])
+				else:
+					self.positions[word] = self.positions[word].inserted(index, found[word])
+
+	def removeChunk(self, chunk):
+		""" Removes every reference to the chunk """
+
+		self.stats.remove(chunk)
+		if self.tokens is not None:
+			self.tokens.remove(chunk)
+
+		for word in self.tokeniser.unique(chunk.getFullText()):
+			if word not in self:
+				continue
+
+			index = locate(self[word], chunk)[0]
+			if index is None:
+				continue
+
+			if len(self[word]) == 1:
+				del self[word]
+				del self.frequencies[word]
+				if self.positions is not None:
+					del self.positions[word]
+				continue
+
+			del self[word][index]
+
+			frequencies = array('H', self.frequencies[word])
+			del frequencies[index]
+			self.frequencies[word] = frequencies
+
+			if self.positions is not None:
+				self.positions[word] = self.positions[word].removed(index)
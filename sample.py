@@ -18,7 +18,6 @@
 
 import json, sys
 import os
-from threading import Thread
 from time import sleep
 
 from flask import Flask, request, make_response, redirect
@@ -26,7 +25,17 @@ from flask import Flask, request, make_response, redirect
 from pipeline import Pipeline, Timeline, statuses, READY, WAIT, OUT_OF_DATE, ERROR
 from exampleplugins import VSSChunkMiner, TrieMiner, TrieSearch, ReadFileAcquirer, \
     AlwaysFailAcquirer, YoutubeAutoVSSAcquirer, FileToLineMiner, YoutubeAudioAcquirer, \
-    SRTChunkListToRIDict, YoutubeVideoAcquirer
+    SRTChunkListToRIDict, YoutubeVideoAcquirer, VSSTrieMiner
+from querysearch import BooleanSearch
+from rankedsearch import BM25Search
+from fuzzysearch import FuzzySearch
+from suffixarray import InfixSearch
+from intervalindex import TimeWindowSearch
+from globalindex import GlobalIndex
+from scheduler import Scheduler
+from snippets import snippetTerms, makeSnippet
+from trie import completions
+from tokeniser import tokeniserFor
 from SpeechRecogMiner import AudioSplitSpeechRecog
 from faceRecognitionPlugins import VideoFaceFinder, FaceVectoriser, FaceClusterer, \
     FaceSearchMiner, FaceSearch
@@ -34,6 +43,8 @@ from faceRecognitionPlugins import VideoFaceFinder, FaceVectoriser, FaceClustere
 app = Flask(__name__, static_url_path='', static_folder=os.getcwd() + '/Frontend-Web')
 
 pl = Pipeline()
+scheduler = Scheduler(pl) # generates timelines as one graph, running shared stages once
+globalIndex = GlobalIndex() # searches every saved corpus in ./sav/
 timelines = {}
 faceTimelines = []
 
@@ -64,6 +75,7 @@ def setURL():
     url = url.encode("ascii")
 
     pl.clearMemory()
+    scheduler.clear()
 
     resp = make_response(json.dumps("URL updated"))
     resp.headers['Access-Control-Allow-Origin'] = '*'
@@ -100,6 +112,57 @@ def checkReady(timeline):
 
     return resp
 
+def searchableCorpus(timeline):
+    """ Returns the tag of a timeline's final corpus if it can be searched,
+        or None
+    """
+
+    if timeline not in timelines:
+        return None
+
+    status = timelines[timeline].status
+    corpus = timelines[timeline].corpus[-1]
+
+    # a timeline still being mined may be searched as it fills in
+    partial = status == WAIT and corpus in timelines[timeline].partial
+
+    if status == READY or partial:
+        return corpus
+    return None
+
+def requestTerms():
+    """ Returns the search terms of the current request as a list.  They
+        are not lowercased, as query operators are upper case; the engines
+        normalise words themselves.
+    """
+
+    terms = request.form['searchterms'] # TODO: Sanitising of search terms
+    terms = terms.encode("ascii")
+    terms = terms.strip()
+    terms = terms.split(" ")
+
+    return terms
+
+def requestWindow():
+    """ Returns the current request's optional time window, in seconds or
+        [hh:]mm:ss, as from:/to: search terms
+    """
+
+    terms = []
+
+    if 'start' in request.values:
+        terms.append("from:" + request.values['start'])
+    if 'end' in request.values:
+        terms.append("to:" + request.values['end'])
+
+    return terms
+
+def takesWindow(timeline):
+    """ Whether the timeline's search engine understands from:/to: terms;
+        others would search for them as words """
+
+    return isinstance(pl.search.get(timelines[timeline].search), TimeWindowSearch)
+
 @app.route("/search/<timeline>", methods=['POST'])
 def doSearch(timeline):
     """ Performs a search on a given timeline
@@ -107,34 +170,122 @@ def doSearch(timeline):
 
     convertedResults = None # Sentinel value
 
-    if timeline in timelines:
+    corpus = searchableCorpus(timeline)
+
+    if corpus is not None:
 
-        if timelines[timeline].status == READY:
+        search = timelines[timeline].search
+        terms = requestTerms()
+        if takesWindow(timeline):
+            terms += requestWindow()
 
-            search = timelines[timeline].search
-            corpus = timelines[timeline].corpus[-1]
+        # optional maximum number of results, best first
+        limit = request.values.get('limit', None, type=int)
 
-            terms = request.form['searchterms'] # TODO: Sanitising of search terms
-            terms = terms.encode("ascii").lower()
-            terms = terms.strip()
-            terms = terms.split(" ")
+        results = pl.performSearch(corpus, search, terms, limit)
 
-            results = pl.performSearch(corpus, search, terms)
+        # Convert to serialisable format...
+        if len(results) > 0:
+            convertedResults = []
 
-            # Convert to serialisable format...
-            if len(results) > 0:
-                convertedResults = []
+        # words to highlight in each result's snippet
+        highlight = snippetTerms(terms)
 
-            for result in results:
-                curr = {}
-                curr['start'] = result.startTime
-                curr['end'] = result.endTime
-                convertedResults.append(curr)
+        for result in results:
+            curr = {}
+            curr['start'] = result.startTime
+            curr['end'] = result.endTime
+            if hasattr(result, 'getFullText'):
+                curr['snippet'] = makeSnippet(pl.corpus[corpus], result, highlight)
+            convertedResults.append(curr)
 
     resp = make_response(json.dumps(convertedResults))
     resp.headers['Access-Control-Allow-Origin'] = '*'
     return resp
 
+@app.route("/search", methods=['POST'])
+def doSearchTimelines():
+    """ Performs one search on several timelines, given as a comma
+        separated 'timelines' list, concurrently.  Returns
+        {timeline: [[start, end, snippet text, highlights], ...]} for each
+        timeline that could be searched.
+    """
+
+    names = []
+    for value in request.form.getlist('timelines'):
+        for name in value.split(","):
+            if name not in names and name not in faceTimelines and searchableCorpus(name) is not None:
+                names.append(name)
+
+    terms = requestTerms()
+    limit = request.values.get('limit', None, type=int)
+    highlight = snippetTerms(terms)
+
+    searches = [(timelines[name].corpus[-1], timelines[name].search) for name in names]
+    found = [None] * len(searches)
+
+    # only timelines whose engine takes the time window are given it
+    for windowed, searchTerms in ((True, terms + requestWindow()), (False, terms)):
+        indexes = [index for index, name in enumerate(names) if takesWindow(name) == windowed]
+        results = pl.performSearches([searches[index] for index in indexes], searchTerms, limit)
+        for index, result in zip(indexes, results):
+            found[index] = result
+
+    convertedResults = {}
+
+    for name, (corpus, search), results in zip(names, searches, found):
+        converted = []
+
+        for result in results or []:
+            if hasattr(result, 'getFullText'):
+                snippet = makeSnippet(pl.corpus[corpus], result, highlight)
+                converted.append([result.startTime, result.endTime, snippet['text'], snippet['highlights']])
+            else:
+                converted.append([result.startTime, result.endTime])
+
+        convertedResults[name] = converted
+
+    resp = make_response(json.dumps(convertedResults, separators=(',', ':')))
+    resp.headers['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+@app.route("/suggest/<timeline>", methods=['GET'])
+def doSuggest(timeline):
+    """ Suggests completions of the last word of the query 'q', most
+        common first, as [{word, count}, ...]
+    """
+
+    suggestions = []
+
+    corpus = searchableCorpus(timeline)
+    words = request.args.get('q', '').encode("ascii", "ignore").split()
+
+    if corpus is not None and words:
+        prefix = tokeniserFor(pl.corpus[corpus]).normalise(words[-1])
+        limit = request.args.get('limit', 10, type=int)
+
+        for word, count in completions(pl.corpus[corpus], prefix, limit):
+            suggestions.append({'word': word, 'count': count})
+
+    resp = make_response(json.dumps(suggestions))
+    resp.headers['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+@app.route("/globalsearch", methods=['POST'])
+def doGlobalSearch():
+    """ Searches every saved video's corpora, returning
+        {videoID: [{corpus, start, end}, ...]}
+    """
+
+    terms = request.form['searchterms'] # TODO: Sanitising of search terms
+    terms = terms.encode("ascii").lower()
+    terms = terms.strip()
+    terms = terms.split(" ")
+
+    resp = make_response(json.dumps(globalIndex.search(terms)))
+    resp.headers['Access-Control-Allow-Origin'] = '*'
+    return resp
+
 @app.route("/add/<timeline>", methods=['GET'])
 def doAcquire(timeline):
     """ Trigger acquisition and processing for a new timeline, unless
@@ -167,18 +318,18 @@ def regen(timeline):
 
     if timeline in timelines:
         result = timeline
-        regenerate(timeline)
+        scheduler.regenerate(timelines[timeline], url)
 
     resp = make_response(json.dumps(result))
     resp.headers['Access-Control-Allow-Origin'] = '*'
     return resp   
 
 def regenerate(timeline):
-    """ Generates a corpus using the given timeline, in a separate thread
+    """ Generates a corpus using the given timeline, in the scheduler's
+        worker threads, sharing stages with other timelines
     """
 
-    t = Thread(target=pl.generateTimeline, name = timeline, args=(timelines[timeline], url))
-    t.start()
+    scheduler.submit(timelines[timeline], url)
 
 # Special-cased route for acquiring face information
 @app.route("/getfaces/<timeline>", methods=['GET'])
@@ -204,21 +355,29 @@ if __name__ == "__main__":
     pl.addAcquirer(YoutubeAutoVSSAcquirer(), 'ytautosub') # downloads an autogenerated VSS file from Youtube to temp folder
     pl.addAcquirer(YoutubeVideoAcquirer(), 'ytvid') # Downloads a video from youtube at the highest possible quality
     pl.addMiner(FileToLineMiner(), 'fileline') # processes a file into a list of lines
-    pl.addMiner(VSSChunkMiner(), 'vssminer') # processes a list of lines in VSS format into a list of SRTChunks
-    pl.addMiner(VSSChunkMiner(), 'vssminer2') # processes a list of lines in VSS format into a list of SRTChunks
+    pl.addMiner(VSSChunkMiner(recordPositions=True), 'vssminer') # streams a VSS file into a reverse index of SRTChunks, recording token positions and offsets for phrases and snippets
+    pl.addMiner(VSSChunkMiner(recordPositions=True), 'vssminer2') # streams a VSS file into a reverse index of SRTChunks, recording token positions and offsets for phrases and snippets
     pl.addMiner(AudioSplitSpeechRecog(3, 1, 'en-US'), 'speechRecog') # processes a single audio file in wav format into a list of SRTChunks
-    pl.addMiner(SRTChunkListToRIDict(), 'chunkToRIDict') # builds a reverse-indexed dict of word => list of chunks containing word
+    pl.addMiner(SRTChunkListToRIDict(recordPositions=True), 'chunkToRIDict') # builds a reverse-indexed dict of word => list of chunks containing word, with token positions and offsets
     pl.addMiner(VideoFaceFinder(), 'faceFinder') # Finds faces in the frames of a video and outputs them.
     pl.addMiner(FaceVectoriser(), 'faceVec') # Encodes images of faces as LBP vectors.
     pl.addMiner(FaceClusterer(n_clusters=None), 'faceClust') # Assigns faces/face vectors to clusters
     pl.addMiner(FaceSearchMiner(faceFolder='./Frontend-Web/faces/'), 'faceSearchMine') # Formats the output from the FaceClusterer to be searchable
-    pl.addMiner(TrieMiner(), 'trieminer') # Processes list of SRTChunks into a trie
-    pl.addMiner(TrieMiner(), 'trieminer2') # Processes list of SRTChunks into a trie
+    pl.addMiner(TrieMiner(completions=10), 'trieminer') # Processes list of SRTChunks into a trie, storing the top 10 completions of each prefix for /suggest
+    pl.addMiner(TrieMiner(completions=10), 'trieminer2') # Processes list of SRTChunks into a trie, storing the top 10 completions of each prefix for /suggest
     pl.addMiner(TrieMiner(), 'trieminer3') # Processes list of SRTChunks into a trie
-    pl.addMiner(TrieMiner(), 'trieminerSR') # Processes list of SRTChunks into a trie
+    pl.addMiner(VSSTrieMiner(recordPositions=True, completions=10), 'vsstrieminer') # streams a VSS file straight into a trie in one step, as vssminer then trieminer
+    pl.addMiner(TrieMiner(completions=10), 'trieminerSR') # Processes list of SRTChunks into a trie, storing the top 10 completions of each prefix for /suggest
     pl.addSearch(TrieSearch(), 'triesearch') # searches a trie
+    pl.addSearch(TimeWindowSearch(BooleanSearch()), 'boolsearch') # searches a trie with AND/OR/NOT, "phrase" and from:/to:/at: time queries
+    pl.addSearch(BM25Search(), 'bm25search') # ranks chunks of a trie containing any of the terms
+    pl.addSearch(FuzzySearch(), 'fuzzysearch') # finds words within a few edits of the terms in a trie
+    pl.addSearch(InfixSearch(), 'infixsearch') # finds words containing the terms anywhere in a trie
     pl.addSearch(FaceSearch(), 'faceSearch') # Searches faces by cluster id across a timeline
 
+    # intermediate corpora, dropped once the next miner has read them
+    pl.markTransient('vssminer', 'vssminer2', 'speechRecog', 'chunkToRIDict')
+
 
     print ""
 
@@ -229,9 +388,9 @@ if __name__ == "__main__":
     timelines['subtitles'] = Timeline(
         "Auto Subtitles",                 # prettyName
         ['fail', 'ytautosub'],                                # acquireTag
-        ['fileline', 'vssminer', 'trieminer'],  # minerTags in order
-        ['fileline', 'vssminer', 'trieminer'],  # corpusTags in order
-        'triesearch'                            # searchTag
+        ['vsstrieminer'],  # minerTags in order
+        ['vsstrieminer'],  # corpusTags in order
+        'boolsearch'                            # searchTag
     )
     
     timelines['speechRecog'] = Timeline(
@@ -239,29 +398,29 @@ if __name__ == "__main__":
         'ytaudio',                              # acqireTag
         ['speechRecog', 'chunkToRIDict', 'trieminerSR'],         # minerTag
         ['speechRecog', 'chunkToRIDict', 'trieminerSR'],         # corpusTag
-        'triesearch'                            # searchTag
+        'boolsearch'                            # searchTag
     )
 
     timelines['subtitles2'] = Timeline(
         "Duplicate auto subs",                 # prettyName
         'ytautosub',                                # acquireTag
-        ['fileline', 'vssminer', 'trieminer'],  # minerTags in order
-        ['fileline', 'vssminer', 'trieminer'],  # corpusTags in order
+        ['vssminer', 'trieminer'],  # minerTags in order
+        ['vssminer', 'trieminer'],  # corpusTags in order
         'triesearch'                            # searchTag
     )
 
     timelines['fail'] = Timeline(
         "This timeline always fails to acquire", # prettyName
         'fail',                                # acquireTag
-        ['fileline', 'vssminer', 'trieminer2'],  # minerTags in order
-        ['fileline', 'vssminer', 'trieminer2'],  # corpusTags in order
+        ['vssminer', 'trieminer2'],  # minerTags in order
+        ['vssminer', 'trieminer2'],  # corpusTags in order
         'triesearch'                            # searchTag
     )
     timelines['alttrieminer'] = Timeline(
         "Secondary Trieminer",                 # prettyName
         'ytautosub',                                # acquireTag
-        ['fileline', 'vssminer2', 'trieminer2'],  # minerTags in order
-        ['fileline', 'vssminer2', 'trieminer2'],  # corpusTags in order
+        ['vssminer2', 'trieminer2'],  # minerTags in order
+        ['vssminer2', 'trieminer2'],  # corpusTags in order
         'triesearch'                            # searchTag
     )
 
@@ -0,0 +1,401 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from pipeline import logger, READY, WAIT, ERROR, OUT_OF_DATE
+from multiprocessing.pool import ThreadPool
+from threading import Lock, Event
+
+class Stage:
+	""" One step of the merged graph of timelines: an acquirer run on the
+		acquire arguments, or a miner run on the output of another stage.
+		Stages are keyed by (plugin tag, input), so every timeline
+		sharing a step shares its stage.
+	"""
+
+	def __init__(self, key, tag, source):
+		self.key = key
+		self.tag = tag			# acquirer or miner tag
+		self.source = source	# stage whose output is mined, None to acquire
+		self.corpusTags = set()	# tags its output is stored under
+		self.status = OUT_OF_DATE
+		self.result = None
+
+		self.waiting = []		# (walk, callback) to call once it has run
+
+class Walk:
+	""" A timeline's progress through the graph """
+
+	def __init__(self, timeline, acquireArgs):
+		self.timeline = timeline
+		self.acquireArgs = acquireArgs
+		self.acquireIndex = 0	# acquirer being tried
+		self.index = 0			# miner being run
+		self.held = []			# indexes of transient corpora still to read
+		self.done = Event()
+
+def outcome(result):
+	""" Splits a plugin's return value into (result, status), as
+		performAcquire() and buildCorpus() do """
+
+	if type(result) == tuple:
+		return result[0], result[1]
+	return result, READY
+
+class Scheduler:
+	""" Generates timelines as one graph of stages rather than one thread
+		per timeline.  A stage already in the graph, running or finished,
+		is shared by every timeline needing it, so it runs once; stages
+		whose inputs are ready run concurrently on a pool of 'workers'
+		threads.
+
+		Stages stay in the graph, so timelines submitted later reuse
+		them, until clear() is called for new data.  A failed stage is
+		not retried until the timeline is regenerated.  The corpora of
+		a finished stage are dropped, and the stage forgotten, once every
+		timeline submitted to read them has run its next miner or
+		finished, if all its corpus tags are transient
+		(Pipeline.markTransient()).
+
+		The pipeline stores corpora by tag alone, so a corpus tag is
+		stored by one stage of the graph at a time: a timeline that
+		would store it from other input (e.g. other acquire arguments)
+		fails, until the first is regenerated or the graph cleared.
+	"""
+
+	def __init__(self, pipeline, workers=4):
+		self.pipeline = pipeline
+		self.workers = workers
+		self.pool = None # started on first use
+
+		self.lock = Lock() # guards the graph and its stages
+		self.stages = {} # key => Stage
+		self.owners = {} # corpus tag => stage storing it
+
+	def submit(self, timeline, *acquireArgs):
+		""" Adds a timeline's stages to the graph, starting any not yet
+			there, and returns an Event set once the timeline is READY or
+			ERROR """
+
+		walk = self.walk(timeline, acquireArgs)
+
+		if not walk.done.is_set():
+			self.acquire(walk)
+		return walk.done
+
+	def walk(self, timeline, acquireArgs):
+		""" Returns a new walk through a timeline, holding the transient
+			corpora it reads, or a finished one if the timeline is not
+			sane """
+
+		walk = Walk(timeline, acquireArgs)
+
+		if not self.pipeline.saneTimeline(timeline):
+			self.finish(walk, ERROR, "Timeline {} is missing plugins.".format(timeline.prettyName))
+			return walk
+
+		timeline.status = WAIT
+		timeline.partial = {}
+
+		# held so they are not dropped before it has read them
+		walk.held = self.pipeline.holdTransient(timeline)
+		return walk
+
+	def regenerate(self, timeline, *acquireArgs):
+		""" Forgets the finished stages of a timeline's plugins, so they
+			run again, and submits it """
+
+		if self.pipeline.saneTimeline(timeline):
+			plugins = set(timeline.acquirer) | set(timeline.miner)
+
+			with self.lock:
+				for key, stage in self.stages.items():
+					if stage.tag in plugins and stage.status in (READY, ERROR):
+						del self.stages[key]
+
+		return self.submit(timeline, *acquireArgs)
+
+	def generate(self, timelines, *acquireArgs):
+		""" Submits several timelines at once and waits for them all.  Each
+			holds its transient corpora before any starts, so none is
+			dropped before every timeline has read it. """
+
+		walks = [self.walk(timeline, acquireArgs) for timeline in timelines]
+
+		for walk in walks:
+			if not walk.done.is_set():
+				self.acquire(walk)
+
+		for walk in walks:
+			walk.done.wait()
+
+	def clear(self):
+		""" Forgets every stage, e.g. after Pipeline.clearMemory() """
+
+		with self.lock:
+			self.stages = {}
+			self.owners = {}
+
+	def acquire(self, walk):
+		""" Runs the walk's next acquirer, falling through to the one after
+			if it fails """
+
+		timeline = walk.timeline
+
+		if walk.acquireIndex == len(timeline.acquirer):
+			self.finish(walk, ERROR, "No successful acquisition among acquirers {}".format(timeline.acquirer))
+			return
+
+		tag = timeline.acquirer[walk.acquireIndex]
+		self.request(('acquire', tag, walk.acquireArgs), tag, None, None, walk, self.acquired)
+
+	def acquired(self, walk, stage):
+		if stage.status != READY:
+			walk.acquireIndex += 1
+			self.acquire(walk)
+			return
+
+		walk.timeline.succesfulAcquirer = walk.acquireIndex
+
+		if not walk.timeline.miner:
+			self.finish(walk, READY)
+		else:
+			self.mine(walk, stage, 0)
+
+	def mine(self, walk, source, index):
+		""" Runs the walk's index'th miner on the output of 'source' """
+
+		timeline = walk.timeline
+		keys = []
+		key = source.key
+
+		for miner in timeline.miner[index:]:
+			key = ('mine', miner, key)
+			keys.append(key)
+
+		# carry on from the last stage already built, so a dropped
+		# transient corpus is not rebuilt for nothing
+		with self.lock:
+			for offset in reversed(range(1, len(keys))):
+				stage = self.stages.get(keys[offset])
+				if stage is not None and stage.status == READY:
+					break
+			else:
+				stage = None
+
+		if stage is not None:
+			walk.index = index + offset
+			self.release(walk, walk.index)
+			self.attach(stage, timeline.corpus[walk.index], walk, self.mined)
+			return
+
+		walk.index = index
+		self.request(keys[0], timeline.miner[index], source, timeline.corpus[index], walk, self.mined)
+
+	def mined(self, walk, stage):
+		timeline = walk.timeline
+
+		if stage.status != READY:
+			self.finish(walk, ERROR, "Error in miner {}".format(stage.tag))
+		elif walk.index == len(timeline.miner) - 1:
+			self.finish(walk, READY)
+		else:
+			# the corpora before this one have been read
+			self.release(walk, walk.index)
+			self.mine(walk, stage, walk.index + 1)
+
+	def finish(self, walk, status, error=None):
+		if error is not None:
+			logger.error(error)
+		else:
+			logger.info("{} done".format(walk.timeline.prettyName))
+
+		self.release(walk)
+
+		walk.timeline.partial = {}
+		walk.timeline.status = status
+		walk.done.set()
+
+	def request(self, key, tag, source, corpusTag, walk, callback):
+		""" Calls callback(walk, stage) once the stage keyed 'key' has run,
+			adding it to the graph and starting it if it is not there """
+
+		with self.lock:
+			stage = self.stages.get(key)
+			new = stage is None and self.owner(corpusTag) is None
+
+			if new:
+				stage = Stage(key, tag, source)
+				self.stages[key] = stage
+
+				if self.pool is None:
+					self.pool = ThreadPool(self.workers)
+
+		if stage is None:
+			self.reject(walk, corpusTag)
+			return
+
+		self.attach(stage, corpusTag, walk, callback)
+
+		if new:
+			self.pool.apply_async(self.run, (stage,))
+
+	def owner(self, corpusTag):
+		""" Returns the stage in the graph storing its result as corpusTag,
+			or None.  Called with the lock held. """
+
+		stage = self.owners.get(corpusTag)
+
+		if stage is None or self.stages.get(stage.key) is not stage:
+			return None
+		return stage
+
+	def reject(self, walk, corpusTag):
+		self.finish(walk, ERROR, "Corpus '{}' of {} is already built from other input; regenerate the timeline or clear the graph first".format(corpusTag, walk.timeline.prettyName))
+
+	def attach(self, stage, corpusTag, walk, callback):
+		""" Calls callback(walk, stage) once the stage has run, storing its
+			result as corpusTag too, unless another stage stores corpusTag """
+
+		with self.lock:
+			rejected = self.owner(corpusTag) not in (None, stage)
+
+			if not rejected:
+				added = corpusTag is not None and corpusTag not in stage.corpusTags
+				if added:
+					stage.corpusTags.add(corpusTag)
+					self.owners[corpusTag] = stage
+
+				finished = stage.status in (READY, ERROR)
+				if not finished:
+					stage.waiting.append((walk, callback))
+
+		if rejected:
+			self.reject(walk, corpusTag)
+			return
+
+		if finished:
+			# a finished stage shared with another timeline's corpus tag
+			if added and stage.status == READY:
+				self.pipeline.setCorpus(corpusTag, stage.result)
+			callback(walk, stage)
+
+	def run(self, stage):
+		""" Runs a stage in a worker thread, then the walks waiting on it """
+
+		stage.status = WAIT
+
+		try:
+			if stage.source is None:
+				result, status = self.runAcquirer(stage)
+			else:
+				result, status = self.runMiner(stage)
+		except Exception as e:
+			logger.error("{} failed: {}".format(stage.tag, e))
+			result, status = None, ERROR
+
+		with self.lock:
+			stage.result = result
+			stage.status = status
+			corpusTags = list(stage.corpusTags)
+			waiting = stage.waiting
+			stage.waiting = []
+
+		if status == READY:
+			try:
+				for corpusTag in corpusTags:
+					self.pipeline.setCorpus(corpusTag, result)
+			except Exception as e:
+				# a stage whose result cannot be stored has failed
+				logger.error("Storing {} failed: {}".format(sorted(corpusTags), e))
+				with self.lock:
+					stage.result = None
+					stage.status = ERROR
+
+		# the pool swallows exceptions, which would leave walks waiting
+		for walk, callback in waiting:
+			try:
+				callback(walk, stage)
+			except Exception as e:
+				error = "{} failed after {}: {}".format(walk.timeline.prettyName, stage.tag, e)
+				if walk.done.is_set():
+					logger.error(error)
+				else:
+					self.finish(walk, ERROR, error)
+
+	def runAcquirer(self, stage):
+		acquirer = self.pipeline.acquire[stage.tag]
+
+		with acquirer.lock:
+			logger.info("Acquiring to data '{}' using Acquirer '{}'".format(stage.tag, stage.tag))
+			acquirer.status = WAIT
+			result, status = outcome(acquirer.acquire(*stage.key[2]))
+			acquirer.status = status
+
+		self.pipeline.rawData[stage.tag] = result
+		return result, status
+
+	def runMiner(self, stage):
+		miner = self.pipeline.mine[stage.tag]
+
+		with miner.lock:
+			logger.info("Building corpus {} using miner '{}'".format(sorted(stage.corpusTags), stage.tag))
+			miner.status = WAIT
+
+			# a timeline's first miner may publish chunks as it goes
+			if stage.source.source is None:
+				miner.publish = lambda chunks: self.publish(stage, chunks)
+
+			try:
+				result, status = outcome(miner.build(stage.source.result))
+			finally:
+				miner.publish = None
+
+			miner.status = status
+
+		return result, status
+
+	def publish(self, stage, chunks):
+		""" Passes chunks published by a stage's miner on to the timelines
+			waiting on it, through Pipeline.publishChunks() """
+
+		with self.lock:
+			walks = [walk for walk, callback in stage.waiting]
+
+		for walk in walks:
+			self.pipeline.publishChunks(walk.timeline, chunks)
+
+	def release(self, walk, end=None):
+		""" Releases the transient corpora a walk holds before index 'end'
+			(or all of them), through Pipeline.releaseTransient(), and
+			forgets the finished stages whose corpora are all dropped """
+
+		dropped = self.pipeline.releaseTransient(walk.timeline, walk.held, end)
+
+		if not dropped:
+			return
+
+		with self.lock:
+			transient = self.pipeline.transient
+			users = self.pipeline.transientUsers
+			for key, stage in self.stages.items():
+				if stage.status != READY or not stage.corpusTags & dropped:
+					continue
+				if stage.corpusTags <= transient and not any(corpusTag in users for corpusTag in stage.corpusTags):
+					stage.result = None
+					del self.stages[key]
@@ -0,0 +1,105 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from tokeniser import normaliseWord, tokeniserFor
+import re
+
+# query syntax that is not a word to highlight
+operatorPattern = re.compile(r"^(AND|OR|NOT|NEAR/\d+)$|:")
+
+def snippetTerms(terms):
+	""" Returns the normalised words of a search to highlight, without
+		operators or time window terms such as 'from:10:00' """
+
+	if isinstance(terms, basestring):
+		terms = terms.split()
+
+	words = []
+	for term in terms:
+		for part in term.split():
+			if operatorPattern.search(part.strip('()"')):
+				continue
+			word = normaliseWord(part)
+			if word and word not in words:
+				words.append(word)
+	return words
+
+def chunkTokens(corpus, chunk):
+	""" Returns the chunk's words and their offsets, as recorded at index
+		time where the corpus has them """
+
+	tokens = getattr(corpus, 'tokens', None)
+
+	if tokens is not None:
+		found = tokens.get(chunk)
+		if found is not None:
+			return found
+
+	return tokeniserFor(corpus).withOffsets(chunk.getFullText())
+
+def makeSnippet(corpus, chunk, terms, width=100):
+	""" Returns a dict of a chunk's text (or a window of about 'width'
+		characters of it around the first match) and the [start, end)
+		offsets within it of each word starting with one of 'terms', a
+		list from snippetTerms()
+	"""
+
+	text = chunk.getFullText()
+	words, offsets = chunkTokens(corpus, chunk)
+
+	matches = [index for index, word in enumerate(words) if any(word.startswith(term) for term in terms)]
+
+	start, end = 0, len(text)
+
+	if end > width:
+		# start a little before the first match, on a word boundary
+		first = offsets[2 * matches[0]] if matches else 0
+		index = 0
+		while index < len(words) and offsets[2 * index] < first - width // 3:
+			index += 1
+		start = offsets[2 * index] if index < len(words) else 0
+
+		# and end on one before 'width' characters
+		end = start + width
+		index = len(words) - 1
+		while index > 0 and offsets[2 * index + 1] > end:
+			index -= 1
+		if words:
+			end = max(offsets[2 * index + 1], start)
+
+	snippet = text[start:end]
+	prefix = "..." if start > 0 else ""
+	suffix = "..." if end < len(text) else ""
+
+	highlights = []
+	for index in matches:
+		if offsets[2 * index] >= start and offsets[2 * index + 1] <= end:
+			highlights.append([offsets[2 * index] - start, offsets[2 * index + 1] - start])
+
+	# offsets are into the UTF-8 bytes; the frontend counts characters
+	if isinstance(snippet, str):
+		try:
+			snippet.decode('ascii')
+		except UnicodeDecodeError:
+			highlights = [[len(snippet[:a].decode('utf-8', 'replace')), len(snippet[:b].decode('utf-8', 'replace'))] for a, b in highlights]
+			snippet = snippet.decode('utf-8', 'replace')
+
+	highlights = [[a + len(prefix), b + len(prefix)] for a, b in highlights]
+
+	return {'text': prefix + snippet + suffix, 'highlights': highlights}
@@ -0,0 +1,209 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from pipeline import SearchEngine
+from tokeniser import tokeniserFor
+from array import array
+from bisect import bisect_right
+from sets import Set
+
+class SuffixArray:
+	""" Suffix array over a vocabulary, for finding every word that
+		contains a given substring.
+
+		The words are joined into one string, separated by '\\0', and
+		'suffixes' holds the start of every suffix of every word, sorted.
+		All suffixes beginning with a substring are then adjacent, and
+		found by binary search in O(m log n) for a substring of length m.
+		Words added later are appended to the string, so 'words' is in
+		the order of the string rather than sorted.
+	"""
+
+	def __init__(self, words):
+		self.words = sorted(word for word in words if word != '')
+		self.text = '\0'.join(self.words) + '\0'
+
+		self.starts = array('l') # offset of each word in text
+		suffixes = []
+
+		offset = 0
+		for word in self.words:
+			self.starts.append(offset)
+			suffixes.extend(range(offset, offset + len(word)))
+			offset += len(word) + 1
+
+		# suffixes only need comparing up to the end of their word
+		text = self.text
+		suffixes.sort(key=lambda start: text[start:text.index('\0', start)])
+		self.suffixes = array('l', suffixes)
+
+	def __getstate__(self):
+		""" Pickles arrays as raw bytes rather than lists of ints """
+
+		state = self.__dict__.copy()
+		for key in ('starts', 'suffixes'):
+			state[key] = state[key].tostring()
+		return state
+
+	def __setstate__(self, state):
+		for key in ('starts', 'suffixes'):
+			state[key] = array('l', state[key])
+		self.__dict__.update(state)
+
+	def add(self, words):
+		""" Adds the words not already in the array.  Their suffixes are
+			sorted on their own, each is placed among the existing ones
+			by binary search, and the two are merged in one pass.
+		"""
+
+		known = set(self.words)
+		words = sorted(set(word for word in words if word != '' and word not in known))
+		if not words:
+			return
+
+		text = self.text + '\0'.join(words) + '\0'
+		suffixes = self.suffixes
+
+		added = []
+		offset = len(self.text)
+		for word in words:
+			self.words.append(word)
+			self.starts.append(offset)
+			added.extend(range(offset, offset + len(word)))
+			offset += len(word) + 1
+
+		added.sort(key=lambda start: text[start:text.index('\0', start)])
+
+		merged = array('l')
+		lo = 0
+		for start in added:
+			suffix = text[start:text.index('\0', start)]
+
+			# added suffixes are sorted, so each is placed after the last
+			first, hi = lo, len(suffixes)
+			while lo < hi:
+				mid = (lo + hi) // 2
+				other = suffixes[mid]
+				if text[other:text.index('\0', other)] < suffix:
+					lo = mid + 1
+				else:
+					hi = mid
+
+			merged.extend(suffixes[first:lo])
+			merged.append(start)
+
+		merged.extend(suffixes[lo:])
+
+		self.suffixes = merged
+		self.text = text
+
+	def suffixRange(self, infix):
+		""" Returns the [lo, hi) range of suffixes beginning with infix """
+
+		text, suffixes, length = self.text, self.suffixes, len(infix)
+
+		lo, hi = 0, len(suffixes)
+		while lo < hi:
+			mid = (lo + hi) // 2
+			start = suffixes[mid]
+			if text[start:start + length] < infix:
+				lo = mid + 1
+			else:
+				hi = mid
+		first = lo
+
+		hi = len(suffixes)
+		while lo < hi:
+			mid = (lo + hi) // 2
+			start = suffixes[mid]
+			if text[start:start + length] <= infix:
+				lo = mid + 1
+			else:
+				hi = mid
+
+		return first, lo
+
+	def find(self, infix):
+		""" Returns the sorted list of words containing infix """
+
+		if infix == '':
+			return sorted(self.words)
+
+		first, last = self.suffixRange(infix)
+
+		found = Set()
+		for index in range(first, last):
+			found.add(bisect_right(self.starts, self.suffixes[index]) - 1)
+
+		return sorted(self.words[index] for index in found)
+
+def vocabulary(corpus):
+	""" Returns every word in a trie or reverse-indexed dict """
+
+	if isinstance(corpus, dict):
+		return [word for word in corpus if corpus[word]]
+
+	words = []
+	stack = [(corpus.getNode(""), "")]
+	while stack:
+		node, word = stack.pop()
+		if node.content:
+			words.append(word)
+		children = node.children
+		for label in children:
+			stack.append((children[label], word + label))
+	return words
+
+class InfixSearch(SearchEngine):
+	""" Finds chunks containing words that contain any of the search
+		terms anywhere, not just at the start, e.g. "ception" finds
+		"inception".  Uses the suffix array built by TrieMiner with
+		infixIndex=True, or scans the vocabulary otherwise.
+	"""
+
+	def performSearch(self, corpus, terms):
+		if isinstance(terms, basestring):
+			terms = terms.split()
+
+		suffixes = getattr(corpus, 'suffixes', None)
+
+		# building a suffix array costs more than one scan of the words
+		if suffixes is None:
+			words = vocabulary(corpus)
+
+		results = Set()
+		tokeniser = tokeniserFor(corpus)
+
+		for term in terms:
+			term = tokeniser.normalise(term)
+			if term == '':
+				continue
+
+			if suffixes is None:
+				found = [word for word in words if term in word]
+			else:
+				found = suffixes.find(term)
+
+			for word in found:
+				if isinstance(corpus, dict):
+					results.update(corpus[word])
+				else:
+					results.update(corpus.getNode(word).content)
+
+		return results
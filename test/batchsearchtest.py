@@ -0,0 +1,63 @@
+from pipeline import Pipeline, DataMiner, SearchEngine
+from threading import current_thread, Lock
+import logging, time
+from testhelpers import check
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+class SlowSearch(SearchEngine):
+	""" Returns the corpus items containing any term, after a delay, as a
+		search waiting on I/O or a C extension would """
+
+	lock = Lock()
+	calls = 0
+	threads = set()
+
+	def __init__(self, delay):
+		self.delay = delay
+
+	def performSearch(self, corpus, terms):
+		with SlowSearch.lock:
+			SlowSearch.calls += 1
+			SlowSearch.threads.add(current_thread().name)
+		time.sleep(self.delay)
+		return [item for item in corpus if any(term in item for term in terms)]
+
+class ListMiner(DataMiner):
+	def build(self, data):
+		return list(data)
+
+pipe = Pipeline(cacheSize=0, searchWorkers=4)
+pipe.addSearch(SlowSearch(0.1), 'slow')
+pipe.addSearch(SlowSearch(0), 'fast')
+pipe.addMiner(ListMiner(), 'list')
+
+for index, words in enumerate((["inception", "limbo"], ["kick", "limbo", "dream"], ["totem"], ["dreamer", "limbo"])):
+	pipe.rawData['raw'] = words
+	pipe.buildCorpus('list', 'words{}'.format(index), 'raw')
+	pipe.mine['list'].status = None # allow rebuilding
+
+searches = [('words0', 'slow'), ('words1', 'slow'), ('words2', 'slow'), ('words3', 'slow')]
+
+print "### Results match separate searches:"
+expected = [pipe.performSearch(corpus, 'fast', ['limbo', 'dream']) for corpus, search in searches]
+check("  results", pipe.performSearches(searches, ['limbo', 'dream']), expected)
+check("  missing corpus", pipe.performSearches([('words0', 'fast'), ('none', 'fast')], ['limbo']), [['limbo'], None])
+check("  no searches", pipe.performSearches([], ['limbo']), [])
+
+print ""
+print "### Searches run concurrently:"
+SlowSearch.threads = set()
+start = time.time()
+pipe.performSearches(searches, ['limbo'])
+elapsed = time.time() - start
+print "  four 100 ms searches took {:.0f} ms".format(elapsed * 1000)
+check("  faster than one after another", elapsed < 0.3, True)
+check("  on worker threads", len(SlowSearch.threads) > 1, True)
+
+print ""
+print "### Repeated searches run once:"
+SlowSearch.calls = 0
+results = pipe.performSearches([('words1', 'slow'), ('words1', 'slow'), ('words3', 'slow')], ['limbo'])
+check("  calls", SlowSearch.calls, 2)
+check("  results", results, [['limbo'], ['limbo'], ['limbo']])
@@ -0,0 +1,78 @@
+from chunker import ChunkTable, ChunkView
+from exampleplugins import SRTChunkMiner, VSSChunkMiner, TrieMiner, TrieSearch
+import pickle, sys
+from testhelpers import makeChunk, makeChunks
+
+srt = """1
+00:00:01,000 --> 00:00:02,500
+What is the most
+resilient parasite?
+
+2
+00:00:03,000 --> 00:00:04,000
+An idea.
+
+3
+00:00:05,000 --> 00:00:06,000
+Resilient, highly contagious.
+
+4
+00:00:07,000 --> 00:00:08,000
+The end.
+""".split("\n")
+
+print "### Views look like SRTChunks:"
+table = ChunkTable()
+first = table.append(1.0, 2.5, ["What is the most", "resilient parasite?"])
+second = table.append(3.0, 4.0, [u"An id\xe9a."])
+for name, result, expected in (("startTime", first.startTime, 1.0), ("endTime", second.endTime, 4.0), ("content", first.content, ["What is the most", "resilient parasite?"]), ("getFullText", first.getFullText(), "What is the most resilient parasite?"), ("unicode text", second.getFullText().decode('utf-8'), u"An id\xe9a."), ("same view", table[0] is first, True), ("length", len(table), 2)):
+	print name, "=>", repr(result), "OK" if result == expected else "FAIL"
+
+print ""
+print "### Chunks just appended are read without joining the text:"
+streamed = ChunkTable()
+texts = []
+for index in range(4):
+	texts.append(streamed.append(index, index + 1, ["line {}".format(index)]).getFullText())
+result = (texts, len(streamed.pending), streamed.text)
+print result, "OK" if result == (["line 0", "line 1", "line 2", "line 3"], 4, '') else "FAIL"
+streamed.join()
+result = (streamed.getText(1), streamed.getText(3))
+print "after joining", result, "OK" if result == ("line 1", "line 3") else "FAIL"
+
+print ""
+print "### Copying SRTChunks:"
+copy = ChunkTable([makeChunk(["one line", "two lines"], 10, 12)])[0]
+result = (copy.startTime, copy.endTime, copy.getFullText())
+print result, "OK" if result == (10, 12, "one line two lines") else "FAIL"
+
+print ""
+print "### Pickling keeps views shared with the table:"
+for protocol in (0, 2):
+	loaded = pickle.loads(pickle.dumps([table, first], protocol))
+	result = loaded[1] is loaded[0][0] and loaded[1].getFullText() == first.getFullText()
+	print "protocol", protocol, "OK" if result else "FAIL"
+
+print ""
+print "### Mined subtitles (start times):"
+words = SRTChunkMiner().build(srt)
+trie = TrieMiner().build(words)
+for term, expected in (("resilient", [1.0, 5.0]), ("idea", [3.0]), ("most", [1.0]), ("end", [7.0])):
+	results = TrieSearch().performSearch(trie, [term])
+	result = sorted(chunk.startTime for chunk in results)
+	print term, "=>", result, "OK" if result == expected and all(isinstance(chunk, ChunkView) for chunk in results) else "FAIL"
+
+vss = ["WEBVTT", "##", "00:00:01.000 --> 00:00:02.000 align:start", "hello there", "", "00:00:03.000 --> 00:00:04.000", "general kenobi", "", "00:00:05.000 --> 00:00:06.000", "bye"]
+words = VSSChunkMiner().build(vss)
+result = sorted(chunk.getFullText() for chunks in words.values() for chunk in chunks)
+print "vss =>", result, "OK" if result == ["bye", "general kenobi", "general kenobi", "hello there", "hello there"] else "FAIL"
+
+print ""
+print "### Memory for 10,000 chunks:"
+lines = ["some subtitle text", "on two lines"]
+chunks = makeChunks([lines] * 10000, 3.0)
+table = ChunkTable(chunks)
+
+objectBytes = sum(sys.getsizeof(chunk) + sys.getsizeof(chunk.__dict__) + sys.getsizeof(chunk.content) + sum(sys.getsizeof(line) for line in chunk.content) for chunk in chunks)
+tableBytes = sum(sys.getsizeof(view) for view in table) + sum(sys.getsizeof(column) for column in (table.views, table.starts, table.ends, table.offsets, table.text))
+print "SRTChunks: {:.0f} KB, ChunkTable: {:.0f} KB".format(objectBytes / 1024.0, tableBytes / 1024.0), "OK" if tableBytes < objectBytes else "FAIL"
@@ -0,0 +1,81 @@
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner, CompressedIndexMiner
+from corpusfile import saveCorpusFile, loadCorpusFile
+from trie import completions, completionKey
+import os, pickle, random, shutil, tempfile, time
+from testhelpers import check, makeChunks
+
+random.seed(3)
+letters = "aabcdeeefghiijklmnoopqrssttuvwy"
+vocabulary = ["".join(random.choice(letters) for i in range(random.randint(2, 8))) for index in range(3000)]
+
+# a skewed choice, so some words are much more common than others
+chunks = makeChunks(" ".join(vocabulary[int(random.paretovariate(0.3)) % len(vocabulary)] for i in range(random.randint(3, 10))) for index in range(2000))
+
+words = SRTChunkListToRIDict().build(chunks)
+
+def expected(prefix, limit):
+	""" Every word's count, sorted """
+	candidates = [(word, len(words[word])) for word in words if word.startswith(prefix)]
+	return sorted(candidates, key=completionKey)[:limit]
+
+prefixes = ['', 'a', 'e', 'st', 'ba', 'zz', 'q'] + [word[:random.randint(1, len(word))] for word in random.sample(vocabulary, 200)]
+
+def checkAll(description, corpus, limit=5):
+	wrong = [prefix for prefix in prefixes if list(completions(corpus, prefix, limit)) != expected(prefix, limit)]
+	check(description, wrong, [])
+
+trie = TrieMiner(completions=5).build(words)
+
+print "### Completions of {} prefixes:".format(len(prefixes))
+check("  'e'", trie.complete('e', 5), expected('e', 5))
+checkAll("  trie, from stored completions", trie)
+checkAll("  trie, more than stored", trie, 8)
+checkAll("  trie without stored completions", TrieMiner().build(words))
+checkAll("  reverse-indexed dict", words)
+compact = CompactTrieMiner(completions=5).build(words)
+checkAll("  compact trie", compact)
+checkAll("  compact trie, more than stored", compact, 8)
+checkAll("  pickled compact trie", pickle.loads(pickle.dumps(compact, pickle.HIGHEST_PROTOCOL)))
+checkAll("  compressed index", CompressedIndexMiner().build(words))
+
+workDir = tempfile.mkdtemp()
+path = os.path.join(workDir, 'corpus')
+saveCorpusFile(compact, path)
+mapped = loadCorpusFile(path)
+check("  memory-mapped corpus, completions stored", mapped.completions, 5)
+checkAll("  memory-mapped corpus", mapped)
+checkAll("  memory-mapped corpus, more than stored", mapped, 8)
+saveCorpusFile(trie, path)
+checkAll("  memory-mapped corpus, saved from a trie", loadCorpusFile(path))
+saveCorpusFile(TrieMiner().build(words), path)
+check("  memory-mapped corpus, none stored", loadCorpusFile(path).completions, None)
+print ""
+
+print "### Kept up to date:"
+miner = TrieMiner(completions=5)
+updated = miner.build(SRTChunkListToRIDict(recordPositions=True).build(chunks[:1500]))
+miner.addChunks(updated, chunks[1500:])
+checkAll("  after adding chunks", updated)
+other = miner.build(SRTChunkListToRIDict().build(chunks[1000:]))
+merged = miner.merge(miner.build(SRTChunkListToRIDict().build(chunks[:1000])), other)
+checkAll("  after merging", merged)
+direct = TrieMiner(completions=5).build(SRTChunkListToRIDict(recordPositions=True).build(chunks[:1500]))
+direct.addChunks(SRTChunkListToRIDict(recordPositions=True).build(chunks[1500:]))
+check("  changed outside the miner", direct.completions, 5)
+checkAll("  ...kept by the trie itself", direct)
+miner.removeChunks(updated, chunks[:700])
+walked = TrieMiner().build(SRTChunkListToRIDict().build(chunks[700:]))
+check("  after removing chunks", [prefix for prefix in prefixes if updated.complete(prefix, 5) != completions(walked, prefix, 5)], [])
+print ""
+
+print "### Time per lookup of a one-letter prefix, from {} words:".format(len(words))
+walking = TrieMiner().build(words)
+short = sorted(set(word[0] for word in words))
+for name, corpus in (("stored", trie), ("walked", walking), ("compact, stored", compact), ("memory-mapped, stored", mapped)):
+	start = time.time()
+	for repeat in range(20):
+		for prefix in short:
+			completions(corpus, prefix, 5)
+	print "  {}: {:.1f} us".format(name, (time.time() - start) * 1e6 / (20 * len(short)))
+
+shutil.rmtree(workDir)
@@ -0,0 +1,66 @@
+from postings import encodeIds, decodeIds, intersectIds
+from compressedindex import CompressedIndex
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompressedIndexMiner, TrieSearch
+from querysearch import BooleanSearch
+from fuzzysearch import FuzzySearch
+from suffixarray import InfixSearch
+from intervalindex import TimeWindowSearch
+import pickle
+from testhelpers import makeChunks
+
+print "### Varint round trips:"
+for ids in ([], [0], [0, 1, 2, 3], [5, 127, 128, 300, 16384, 2 ** 21, 2 ** 40]):
+	data = encodeIds(ids)
+	print ids, "=>", len(data), "bytes", "OK" if decodeIds(data) == ids else "FAIL"
+
+print ""
+print "### Intersections:"
+for lists, expected in ((([1, 3, 5, 7], [3, 4, 5], [0, 3, 5, 9]), [3, 5]), (([1, 2], []), []), (([2, 4, 6],), [2, 4, 6])):
+	result = intersectIds(list(lists))
+	print lists, "=>", result, "OK" if result == expected else "FAIL"
+
+texts = ["the cat sat on the mat", "the dog sat", "a cat and a dog", "cathedral bells", "the end"]
+
+chunks = makeChunks(texts)
+
+words = SRTChunkListToRIDict(recordPositions=True).build(chunks)
+trie = TrieMiner().build(words)
+compressed = CompressedIndexMiner().build(words)
+reloaded = pickle.loads(pickle.dumps(compressed))
+
+def startTimes(results):
+	return sorted(chunk.startTime for chunk in results)
+
+print ""
+print "### Searches agree with a Trie (start times):"
+for name, engine, terms in (("prefix", TrieSearch(), ["cat"]), ("prefix", TrieSearch(), [""]), ("missing", TrieSearch(), ["zebra"]), ("boolean", BooleanSearch(), "sat AND NOT dog"), ("phrase", BooleanSearch(), '"the cat"'), ("fuzzy", FuzzySearch(1), ["dig"]), ("infix", InfixSearch(), ["og"]), ("window", TimeWindowSearch(TrieSearch()), ["the", "from:1", "to:3"])):
+	expected = startTimes(engine.performSearch(trie, terms))
+	for corpusName, corpus in (("CompressedIndex", compressed), ("unpickled", reloaded)):
+		result = startTimes(engine.performSearch(corpus, terms))
+		print name, terms, corpusName, "=>", result, "OK" if result == expected else "FAIL"
+
+print ""
+print "### AND intersects chunk IDs, looking up only the chunks left:"
+for terms, expected, looked in (("the AND sat", [0, 1], [2]), ("ca AND d", [2], [1]), ("the AND zebra", [], [0]), ('"the cat" AND mat', [0], [1])):
+	lookups = []
+	compressed.chunksOf = lambda ids: lookups.append(len(ids)) or CompressedIndex.chunksOf(compressed, ids)
+	result = startTimes(BooleanSearch().performSearch(compressed, terms))
+	del compressed.chunksOf
+	print terms, "=>", result, lookups, "OK" if (result, lookups) == (expected, looked) else "FAIL"
+
+print ""
+print "### Subtrees:"
+subtree = compressed.getSubtree("ca")
+result = startTimes(subtree.getPostings("t"))
+print "ca + t =>", result, "OK" if result == [0, 2, 3] else "FAIL"
+result = sorted(subtree.getNode("t").children)
+print "children of cat =>", result, "OK" if result == ['h'] else "FAIL"
+
+print ""
+print "### Built out of time order:"
+# the index has to re-sort the IDs, keeping positions aligned
+shuffled = CompressedIndexMiner().build(SRTChunkListToRIDict(recordPositions=True).build(chunks[::-1]))
+for terms in ('"the cat"', '"a dog"', 'cat NEAR/4 mat'):
+	result = startTimes(BooleanSearch().performSearch(shuffled, terms))
+	expected = startTimes(BooleanSearch().performSearch(compressed, terms))
+	print terms, "=>", result, "OK" if result == expected and result else "FAIL"
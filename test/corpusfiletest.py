@@ -0,0 +1,141 @@
+from pipeline import Pipeline
+from corpusfile import saveCorpusFile, loadCorpusFile, MappedCorpus, HEADER
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner, CompressedIndexMiner, TrieSearch
+from querysearch import BooleanSearch
+from snippets import makeSnippet
+from rankedsearch import BM25Search
+from fuzzysearch import FuzzySearch
+from suffixarray import InfixSearch
+from intervalindex import TimeWindowSearch
+from chunker import ChunkTable
+from trie import Trie
+import logging, os, pickle, shutil, tempfile, time
+from testhelpers import check, makeChunks
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+# Pipeline saves to ./sav/, so work in a scratch directory
+workDir = tempfile.mkdtemp()
+os.chdir(workDir)
+
+def startTimes(results):
+	return [chunk.startTime for chunk in results]
+
+texts = ["a dream within a dream", "the kick", "dreams collapse", u"caf\xe9 limbo", "limbo is a dream"]
+chunks = makeChunks([[text, "second line"] if index == 1 else text for index, text in enumerate(texts)], 10, 5)
+
+words = SRTChunkListToRIDict(recordPositions=True).build(ChunkTable(chunks))
+
+searches = (
+	("prefix", TrieSearch(), ["dream"]),
+	("missing", TrieSearch(), ["zzz"]),
+	("boolean", BooleanSearch(), "dream AND NOT limbo"),
+	("phrase", BooleanSearch(), '"a dream"'),
+	("fuzzy", FuzzySearch(1), ["kack"]),
+	("infix", InfixSearch(), ["imb"]),
+	("window", TimeWindowSearch(TrieSearch()), ["dream", "from:15", "to:45"]),
+)
+
+print "### Saved corpora give the same results as a Trie:"
+reference = TrieMiner().build(words)
+for name, corpus in (("dict", words), ("Trie", TrieMiner().build(words)), ("CompactTrie", CompactTrieMiner().build(words)), ("CompressedIndex", CompressedIndexMiner().build(words))):
+	saveCorpusFile(corpus, name)
+	loaded = loadCorpusFile(name)
+	check(name + " is mapped", isinstance(loaded, MappedCorpus), True)
+
+	for searchName, engine, terms in searches:
+		expected = sorted(startTimes(engine.performSearch(reference, terms)))
+		check("  {} {}".format(searchName, terms), sorted(startTimes(engine.performSearch(loaded, terms))), expected)
+
+	expected = startTimes(BM25Search().performRankedSearch(reference, ["dream"], 3))
+	check("  ranked", startTimes(BM25Search().performRankedSearch(loaded, ["dream"], 3)), expected)
+
+print ""
+print "### Chunks:"
+loaded = loadCorpusFile("dict")
+chunk = loaded.getNode("kick").content[0]
+check("times", (chunk.startTime, chunk.endTime), (10, 15))
+check("content", chunk.content, ["the kick", "second line"])
+check("unicode text", loaded.getNode("limbo").content[0].getFullText(), u"caf\xe9 limbo".encode('utf-8'))
+check("same chunk object", loaded.getNode("dream").content[0] is loaded.getNode("a").content[0], True)
+check("saved again", startTimes(loadCorpusFile(saveCorpusFile(loaded, "again") or "again").getPostings("dream")), startTimes(loaded.getPostings("dream")))
+
+print ""
+print "### Positions and tokens:"
+for name in ("dict", "CompressedIndex"):
+	loaded = loadCorpusFile(name)
+	check(name + " positions", list(loaded.getNode("dream").positions.get(1)), list(reference.getNode("dream").positions.get(1)))
+	check("  tokens", loaded.tokens.get(loaded.getNode("limbo").content[1]), reference.tokens.get(reference.getNode("limbo").content[1]))
+
+	# chunks' text is only read for snippets, not to find phrases
+	reads = []
+	getText = loaded.chunks.getText
+	loaded.chunks.getText = lambda index: reads.append(index) or getText(index)
+	for terms in ('"a dream"', '"limbo is a"', '"dream within"', 'kick NEAR/1 second'):
+		check("  {} same chunks".format(terms), startTimes(BooleanSearch().performSearch(loaded, terms)), startTimes(BooleanSearch().performSearch(reference, terms)))
+	check("  texts read", reads, [])
+
+	for term, original in (("dream", chunks[0]), ("limbo", chunks[3]), ("kick", chunks[1])):
+		check("  {} snippet".format(term), makeSnippet(loaded, loaded.getNode(term).content[0], [term]), makeSnippet(reference, original, [term]))
+
+saveCorpusFile(TrieMiner().build(SRTChunkListToRIDict().build(chunks)), "unpositioned")
+loaded = loadCorpusFile("unpositioned")
+check("without positions", (loaded.positions, loaded.tokens, startTimes(BooleanSearch().performSearch(loaded, '"a dream"'))), ({}, None, [0, 40]))
+
+print ""
+print "### Other corpora and files:"
+saveCorpusFile([[1], {}], "faces")
+check("pickled", loadCorpusFile("faces"), [[1], {}])
+with open("old", "w") as file:
+	pickle.dump(TrieMiner().build(words), file)
+check("old pickle", sorted(startTimes(TrieSearch().performSearch(loadCorpusFile("old"), ["limbo"]))), [30, 40])
+
+with open("dict", "rb") as file:
+	data = file.read()
+with open("future", "wb") as file:
+	file.write(data[:8] + chr(99) + data[9:])
+try:
+	loadCorpusFile("future")
+	print "newer version FAIL"
+except ValueError as e:
+	print "newer version:", e, "OK"
+
+deep = Trie()
+deep.bulkLoad({"a" * 5000: [chunks[0]]})
+saveCorpusFile(deep, "deep")
+check("5000-letter word", startTimes(loadCorpusFile("deep").getPostings("a" * 2500)), [0])
+
+print ""
+print "### Pipeline:"
+pipe = Pipeline()
+pipe.corpus['trieminer'] = TrieMiner().build(words)
+pipe.saveCorpus('trieminer', 'video1')
+pipe.clearMemory()
+check("loaded", pipe.loadCorpus('trieminer', 'video1'), True)
+pipe.addSearch(TrieSearch(), 'triesearch')
+check("search", sorted(startTimes(pipe.performSearch('trieminer', 'triesearch', ["kick"]))), [10])
+shutil.copy("future", "sav/video1/bad")
+check("bad file", pipe.loadCorpus('bad', 'video1'), False)
+
+print ""
+print "### Opening a large corpus:"
+big = makeChunks(["word%s and other%s words" % (chr(97 + index % 26), chr(97 + index / 26 % 26)), "%d" % index] for index in range(20000))
+bigTrie = CompactTrieMiner().build(SRTChunkListToRIDict().build(big))
+saveCorpusFile(bigTrie, "big")
+with open("big.pickle", "wb") as file:
+	pickle.dump(bigTrie, file, pickle.HIGHEST_PROTOCOL)
+
+start = time.time()
+with open("big.pickle", "rb") as file:
+	pickle.load(file)
+pickleTime = time.time() - start
+
+start = time.time()
+mapped = loadCorpusFile("big")
+mappedTime = time.time() - start
+
+print "pickle: {:.1f} ms, mmap: {:.2f} ms".format(pickleTime * 1000, mappedTime * 1000), "OK" if mappedTime < pickleTime else "FAIL"
+check("search", len(TrieSearch().performSearch(mapped, ["worda"])), len(TrieSearch().performSearch(bigTrie, ["worda"])))
+
+os.chdir("/")
+shutil.rmtree(workDir)
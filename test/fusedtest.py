@@ -0,0 +1,99 @@
+from pipeline import Pipeline, Timeline, Acquirer, READY, OUT_OF_DATE
+from exampleplugins import VSSChunkMiner, SRTChunkListToRIDict, TrieMiner, VSSTrieMiner, TrieSearch
+from querysearch import BooleanSearch
+from snippets import makeSnippet
+from trie import completions
+from threading import Thread
+import logging, tempfile, os, random, time
+from testhelpers import check
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+def startTimes(results):
+	return sorted(chunk.startTime for chunk in results)
+
+random.seed(0)
+vocabulary = "we need to go deeper a dream within dream kick limbo totem spinning top".split()
+
+vtt = tempfile.NamedTemporaryFile(suffix=".vtt", delete=False)
+vtt.write("WEBVTT\n##\n")
+for index in range(5000):
+	vtt.write("00:{:02d}:{:02d}.000 --> 00:{:02d}:{:02d}.500\n{}\n\n".format(index // 60 % 60, index % 60, index // 60 % 60, index % 60, " ".join(random.choice(vocabulary) for i in range(random.randint(2, 8)))))
+vtt.close()
+
+print "### Fused miner builds the same trie as the two steps:"
+staged = TrieMiner(completions=5).build(VSSChunkMiner(recordPositions=True).build(vtt.name))
+fused = VSSTrieMiner(recordPositions=True, completions=5).build(vtt.name)
+
+for query in ("kick", "dream within", '"spinning top"', "limbo OR totem", "de"):
+	check("  '{}'".format(query), startTimes(BooleanSearch().performSearch(fused, query)) == startTimes(BooleanSearch().performSearch(staged, query)), True)
+
+chunk = BooleanSearch().performSearch(fused, "kick")[0]
+check("  offsets recorded for snippets", (fused.tokens.get(chunk) is not None, makeSnippet(fused, chunk, ["kick"])["highlights"] != []), (True, True))
+check("  completions", completions(fused, "d", 3), completions(staged, "d", 3))
+
+def nodeState(trie, word):
+	node = trie.getNode(word)
+	return [chunk.startTime for chunk in node.content], list(node.frequencies), [list(node.positions.get(i)) for i in range(len(node.content))]
+
+lines = ["WEBVTT", "##", "00:00:05.000 --> 00:00:06.000", "kick dream", "", "00:00:01.000 --> 00:00:02.000", "dream, dream", "", "00:00:03.000 --> 00:00:04.000", "kick"]
+outOfOrder = VSSTrieMiner(recordPositions=True).build(lines)
+check("  cues out of order", [nodeState(outOfOrder, word) for word in ("dream", "kick")], [([1.0, 5.0], [2, 1], [[0, 1], [1]]), ([3.0, 5.0], [1, 1], [[0], [0]])])
+
+print ""
+print "### Transient corpora are dropped once read:"
+class FileAcquirer(Acquirer):
+	def acquire(self):
+		return vtt.name
+
+class CountingMiner(VSSChunkMiner):
+	builds = 0
+
+	def build(self, data):
+		CountingMiner.builds += 1
+		return VSSChunkMiner.build(self, data)
+
+pipe = Pipeline()
+pipe.addAcquirer(FileAcquirer(), 'file')
+pipe.addMiner(CountingMiner(), 'vss')
+pipe.addMiner(TrieMiner(), 'trie')
+pipe.addMiner(TrieMiner(), 'trie2')
+pipe.addMiner(VSSTrieMiner(), 'fused')
+pipe.addSearch(TrieSearch(), 'search')
+pipe.markTransient('vss')
+
+first = Timeline("First", 'file', ['vss', 'trie'], ['vss', 'trie'], 'search')
+second = Timeline("Second", 'file', ['vss', 'trie2'], ['vss', 'trie2'], 'search')
+pipe.generateTimeline(first)
+
+expected = startTimes(TrieSearch().performSearch(staged, ["kick"]))
+check("  timeline ready", first.status, READY)
+check("  corpora kept", sorted(pipe.corpus.keys()), ['trie'])
+check("  transient miner out of date", pipe.getMinerStatus('vss'), OUT_OF_DATE)
+check("  search", startTimes(pipe.performSearch('trie', 'search', ["kick"])) == expected, True)
+
+pipe.generateTimeline(first)
+check("  not rebuilt for an up-to-date timeline", CountingMiner.builds, 1)
+
+pipe.generateTimeline(second)
+check("  rebuilt for another timeline", (CountingMiner.builds, second.status, sorted(pipe.corpus.keys())), (2, READY, ['trie', 'trie2']))
+
+# timelines generated at once share the transient corpus
+pipe.clearMemory()
+CountingMiner.builds = 0
+threads = [Thread(target=pipe.generateTimeline, args=(timeline,)) for timeline in (first, second)]
+for thread in threads:
+	thread.start()
+for thread in threads:
+	thread.join()
+check("  generated at once", (first.status, second.status, sorted(pipe.corpus.keys()), pipe.transientUsers), (READY, READY, ['trie', 'trie2'], {}))
+check("  both searchable", [startTimes(pipe.performSearch(tag, 'search', ["kick"])) == expected for tag in ('trie', 'trie2')], [True, True])
+
+print ""
+print "### Time to build, fused vs two steps:"
+for name, build in (("two steps", lambda: TrieMiner().build(VSSChunkMiner(recordPositions=True).build(vtt.name))), ("fused", lambda: VSSTrieMiner(recordPositions=True).build(vtt.name))):
+	start = time.time()
+	build()
+	print "  {}: {:.0f} ms".format(name, (time.time() - start) * 1000)
+
+os.remove(vtt.name)
@@ -0,0 +1,64 @@
+""" Compares fuzzy search against exact TrieSearch, and against computing
+	the edit distance to every word in the vocabulary, over a synthetic
+	transcript with some words misrecognised.
+"""
+
+from fuzzysearch import FuzzySearch
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner, TrieSearch
+import random, timeit, logging
+from testhelpers import makeChunks
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+random.seed(0)
+
+letters = "abcdefghijklmnopqrstuvwxyz"
+vocabulary = ["".join(random.choice(letters) for i in range(random.randint(3, 10))) for j in range(5000)]
+
+def misrecognise(word):
+	""" Replaces one letter, as speech recognition often does """
+
+	index = random.randrange(len(word))
+	return word[:index] + random.choice(letters) + word[index + 1:]
+
+def transcriptLine():
+	words = [vocabulary[int(len(vocabulary) * random.random() ** 3)] for w in range(8)]
+	return " ".join(misrecognise(w) if random.random() < 0.2 else w for w in words)
+
+chunks = makeChunks([transcriptLine() for i in range(1200)], 3)
+
+def editDistance(a, b):
+	row = range(len(b) + 1)
+	for i in range(1, len(a) + 1):
+		previous, row = row, [i]
+		for j in range(1, len(b) + 1):
+			row.append(min(previous[j - 1] + (a[i - 1] != b[j - 1]), row[j - 1] + 1, previous[j] + 1))
+	return row[-1]
+
+index = SRTChunkListToRIDict().build(chunks)
+queries = [vocabulary[i] for i in range(0, 200, 10)]
+
+for name, corpus in (("Trie", TrieMiner().build(index)), ("CompactTrie", CompactTrieMiner().build(index))):
+	print "###", name, "({} words)".format(len(index))
+
+	exact = TrieSearch()
+	t = timeit.timeit(lambda: [exact.performSearch(corpus, [q]) for q in queries], number=5)
+	exactHits = sum(len(exact.performSearch(corpus, [q])) for q in queries)
+	print "{:>22}: {:7.3f} ms per query, {} hits".format("exact TrieSearch", t / (5 * len(queries)) * 1000, exactHits)
+
+	for distance in (1, 2):
+		fuzzy = FuzzySearch(maxDistance=distance)
+		t = timeit.timeit(lambda: [fuzzy.performSearch(corpus, [q]) for q in queries], number=5)
+		hits = 0
+		visited = 0
+		for q in queries:
+			timings = []
+			hits += len(fuzzy.performSearch(corpus, [q], timings))
+			visited += timings[0][2]
+		print "{:>22}: {:7.3f} ms per query, {} hits, {} nodes visited per query".format(
+			"fuzzy, {} edit(s)".format(distance), t / (5 * len(queries)) * 1000, hits, visited / len(queries))
+
+	t = timeit.timeit(lambda: [[w for w in index if editDistance(q, w) <= 2] for q in queries], number=1)
+	print "{:>22}: {:7.3f} ms per query".format("brute force, 2 edits", t / len(queries) * 1000)
+
+	print ""
@@ -0,0 +1,49 @@
+from pipeline import Pipeline
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner
+from globalindex import GlobalIndex
+import logging, os, shutil, tempfile, time
+from testhelpers import check, makeChunks
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+# Pipeline saves to ./sav/, so work in a scratch directory
+workDir = tempfile.mkdtemp()
+os.chdir(workDir)
+
+def buildIndex(texts):
+	return SRTChunkListToRIDict().build(makeChunks(texts, 10, 5))
+
+def times(results):
+	return dict((video, [hit['start'] for hit in hits]) for video, hits in results.items())
+
+pipe = Pipeline()
+
+pipe.corpus['trieminer'] = TrieMiner().build(buildIndex(["a dream within a dream", "kick"]))
+pipe.saveCorpus('trieminer', 'video1')
+pipe.corpus['trieminer'] = CompactTrieMiner().build(buildIndex(["no dreams", "the dreamer", "limbo"]))
+pipe.saveCorpus('trieminer', 'video2')
+pipe.corpus['faces'] = [[1], {}] # not searchable by word; ignored
+pipe.saveCorpus('faces', 'video2')
+
+index = GlobalIndex(shardCount=2, workers=2)
+
+print "### Searching across saved videos:"
+check("dream:", times(index.search(['dream'])), {'video1': [0], 'video2': [0, 10]})
+check("kick limbo:", times(index.search('kick limbo')), {'video1': [10], 'video2': [20]})
+
+print "### Changed and deleted corpora are picked up:"
+time.sleep(1.1) # let the file's mtime change
+pipe.corpus['trieminer'] = TrieMiner().build(buildIndex(["kick again"]))
+pipe.saveCorpus('trieminer', 'video2')
+check("kick:", times(index.search('kick')), {'video1': [10], 'video2': [0]})
+
+pipe.deleteSavedCorpus('trieminer', 'video1')
+check("kick:", times(index.search('kick')), {'video2': [0]})
+
+print "### Files still being saved are skipped:"
+with open(os.path.join('sav', 'video2', 'trieminer.tmp'), 'wb') as partial:
+	partial.write('SIAVIDCF')
+index.refresh()
+check("indexed:", sorted(key for shard in index.shards for key in shard.corpora), [('video2', 'faces'), ('video2', 'trieminer')])
+
+shutil.rmtree(workDir)
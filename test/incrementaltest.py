@@ -0,0 +1,130 @@
+from pipeline import Pipeline, Timeline, Acquirer, DataMiner, READY
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, TrieSearch
+from reverseindex import ReverseIndex
+from querysearch import BooleanSearch
+from rankedsearch import BM25Search
+from suffixarray import InfixSearch
+from intervalindex import TimeWindowSearch
+from trie import Trie
+import logging, random
+from testhelpers import check, makeChunks
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+def startTimes(results):
+	return sorted(chunk.startTime for chunk in results)
+
+random.seed(0)
+vocabulary = "we need to go deeper a dream within dream kick limbo totem spinning top".split()
+
+chunks = makeChunks(" ".join(random.choice(vocabulary) for i in range(random.randint(2, 8))) for index in range(60))
+
+# chunks arrive out of order, as from several transcription threads
+shuffled = list(chunks)
+random.shuffle(shuffled)
+removed = shuffled[:10]
+kept = [chunk for chunk in chunks if chunk not in removed]
+
+def indexState(index):
+	return dict((word, ([chunk.startTime for chunk in index[word]], list(index.frequencies[word]), [list(index.positions[word].get(i)) for i in range(len(index[word]))])) for word in index)
+
+print "### ReverseIndex updated chunk by chunk:"
+miner = SRTChunkListToRIDict(recordPositions=True)
+index = None
+for start in range(0, len(shuffled), 7):
+	index = miner.addChunks(index, shuffled[start:start + 7])
+check("same as built in order", indexState(index) == indexState(miner.build(chunks)), True)
+miner.removeChunks(index, removed)
+check("after removing", indexState(index) == indexState(miner.build(kept)), True)
+check("stats", (index.stats.count(), index.stats.total), (len(kept), sum(len(chunk.getFullText().split()) for chunk in kept)))
+
+searches = (
+	("prefix", TrieSearch(), ["dee"]),
+	("boolean", BooleanSearch(), "dream AND NOT kick"),
+	("phrase", BooleanSearch(), '"spinning top"'),
+	("infix", InfixSearch(), ["imb"]),
+	("window", TimeWindowSearch(TrieSearch()), ["we", "from:10", "to:30"]),
+)
+
+print ""
+print "### Trie updated chunk by chunk:"
+trieMiner = TrieMiner(subtreeRanges=True, infixIndex=True)
+trie = None
+for start in range(0, len(shuffled), 7):
+	trie = trieMiner.addChunks(trie, shuffled[start:start + 7])
+full = trieMiner.build(miner.build(chunks))
+for name, engine, terms in searches:
+	check("  {} {}".format(name, terms), startTimes(engine.performSearch(trie, terms)), startTimes(engine.performSearch(full, terms)))
+check("  ranked", [chunk.startTime for chunk in BM25Search().performRankedSearch(trie, ["dream", "kick"], 5)], [chunk.startTime for chunk in BM25Search().performRankedSearch(full, ["dream", "kick"], 5)])
+
+trieMiner.removeChunks(trie, removed)
+full = trieMiner.build(miner.build(kept))
+for name, engine, terms in searches:
+	check("  removed {} {}".format(name, terms), startTimes(engine.performSearch(trie, terms)), startTimes(engine.performSearch(full, terms)))
+
+counted = None
+for start in range(0, len(shuffled), 7):
+	counted = TrieMiner().addChunks(counted, shuffled[start:start + 7])
+TrieMiner().removeChunks(counted, removed)
+prefixes = ["", "d", "dre", "kick", "sp", "x"]
+check("  posting counts", [counted.postingCount(prefix) for prefix in prefixes], [full.postingCount(prefix) for prefix in prefixes])
+check("  posting counts, from subtree ranges", [trie.postingCount(prefix) for prefix in prefixes], [full.postingCount(prefix) for prefix in prefixes])
+
+print ""
+print "### A trie and the ReverseIndex it was built from, both updated:"
+index = miner.build(chunks[:5] + chunks[6:30])
+trie = TrieMiner().build(index)
+for chunk in (chunks[45], chunks[5], chunks[50]):
+	miner.addChunks(index, [chunk])
+	TrieMiner().addChunks(trie, [chunk])
+miner.removeChunks(index, [chunks[10]])
+TrieMiner().removeChunks(trie, [chunks[10]])
+expected = TrieMiner().build(miner.build(chunks[:10] + chunks[11:30] + [chunks[45], chunks[50]]))
+check("  index", indexState(index) == indexState(miner.build(chunks[:10] + chunks[11:30] + [chunks[45], chunks[50]])), True)
+for name, engine, terms in searches[:3]:
+	check("  {} {}".format(name, terms), startTimes(engine.performSearch(trie, terms)), startTimes(engine.performSearch(expected, terms)))
+check("  ranked", [chunk.startTime for chunk in BM25Search().performRankedSearch(trie, ["dream"], 5)], [chunk.startTime for chunk in BM25Search().performRankedSearch(expected, ["dream"], 5)])
+
+print ""
+print "### Updating a trie leaves the ReverseIndex it was built from unchanged:"
+index = miner.build(chunks[:30])
+before = indexState(index), index.stats.count(), index.stats.total, dict(index.tokens.tokens)
+trie = TrieMiner().build(index)
+TrieMiner().addChunks(trie, [chunks[45]])
+TrieMiner().removeChunks(trie, [chunks[2]])
+check("  index", (indexState(index), index.stats.count(), index.stats.total, dict(index.tokens.tokens)) == before, True)
+check("  trie stats", trie.stats.count(), 30)
+check("  trie tokens", (chunks[45] in trie.tokens.tokens, chunks[2] in trie.tokens.tokens), (True, False))
+
+print ""
+print "### Searching a timeline while its first miner runs:"
+
+class PublishingMiner(DataMiner):
+	""" Publishes chunks one at a time, searching between them """
+
+	def build(self, data):
+		for count, chunk in enumerate(data):
+			if self.publish is not None:
+				self.publish([chunk])
+			if count in (0, 9):
+				seen.append(startTimes(pipe.performSearch('trie', 'search', ['']) or []))
+		return list(data)
+
+class ChunkAcquirer(Acquirer):
+	def acquire(self):
+		return chunks[:20]
+
+seen = []
+pipe = Pipeline()
+pipe.addAcquirer(ChunkAcquirer(), 'chunks')
+pipe.addMiner(PublishingMiner(), 'publisher')
+pipe.addMiner(SRTChunkListToRIDict(), 'ridict')
+pipe.addMiner(TrieMiner(), 'trieminer')
+pipe.addSearch(TrieSearch(), 'search')
+
+timeline = Timeline("Incremental", 'chunks', ['publisher', 'ridict', 'trieminer'], ['chunks2', 'ridict', 'trie'], 'search')
+pipe.generateTimeline(timeline)
+
+check("after one chunk", seen[0], [0])
+check("after ten chunks", seen[1], range(10))
+check("finished", (timeline.status, startTimes(pipe.performSearch('trie', 'search', ['']))), (READY, range(20)))
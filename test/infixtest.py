@@ -0,0 +1,41 @@
+from suffixarray import SuffixArray, InfixSearch
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner
+from testhelpers import makeChunks
+import random
+
+texts = ["inception is a deception", "the reception desk", "perception", "a new concept"]
+
+chunks = makeChunks(texts)
+
+index = SRTChunkListToRIDict().build(chunks)
+
+print "### Words containing a substring:"
+suffixes = SuffixArray(index)
+for infix, expected in (('ception', ['deception', 'inception', 'perception', 'reception']), ('ep', ['concept', 'deception', 'inception', 'perception', 'reception']), ('zz', [])):
+	result = suffixes.find(infix)
+	print infix, "=>", result, "OK" if result == expected else "FAIL"
+
+print ""
+print "### Words added to an existing array:"
+added = SuffixArray(["the", "desk", "a", "new"])
+added.add(["inception", "is", "deception", "desk"])
+added.add(["reception", "perception", "concept", "inception"])
+for infix in ('ception', 'ep', 'e', 'zz', ''):
+	result, expected = added.find(infix), suffixes.find(infix)
+	print infix, "=>", result, "OK" if result == expected else "FAIL, expected {}".format(expected)
+
+random.seed(2)
+vocabulary = list(set("".join(random.choice("abcde") for i in range(random.randint(1, 7))) for index in range(4000)))
+grown = SuffixArray(vocabulary[:1000])
+for start in range(1000, len(vocabulary), 400):
+	grown.add(vocabulary[start:start + 400])
+fresh = SuffixArray(vocabulary)
+infixes = [word[random.randint(0, len(word) - 1):] for word in random.sample(vocabulary, 100)]
+wrong = [infix for infix in infixes if grown.find(infix) != fresh.find(infix)]
+print "many words added in batches =>", wrong, "OK" if wrong == [] and len(grown.suffixes) == len(fresh.suffixes) else "FAIL"
+
+print ""
+print "### Chunks matching an infix search (start times):"
+for name, corpus in (("Trie", TrieMiner(infixIndex=True).build(index)), ("CompactTrie", CompactTrieMiner(infixIndex=True).build(index)), ("Trie without suffix array", TrieMiner().build(index))):
+	result = sorted(chunk.startTime for chunk in InfixSearch().performSearch(corpus, ['ception']))
+	print name, "=>", result, "OK" if result == [0, 1, 2] else "FAIL"
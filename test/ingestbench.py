@@ -0,0 +1,56 @@
+""" Times building a trie from a word-indexed dict with the original
+	per-word getSubtree/addSubtree insertion, against Trie.bulkLoad.
+	TrieMiner.build, which also builds the trie's indexes, is shown for
+	comparison.
+"""
+
+from exampleplugins import TrieMiner, TrieSearch
+from trie import Trie, TrieNode
+import random, timeit
+
+random.seed(0)
+
+letters = "abcdefghijklmnopqrstuvwxyz'"
+
+def perWordInsert(words):
+	""" The insertion loop the trie miners used before bulkLoad """
+
+	trie = Trie()
+	for word in words:
+		if word != '':
+			target = trie.getSubtree(word)
+			if target == None:
+				target = TrieNode()
+				trie.addSubtree(word, target)
+			else:
+				target = target.root
+
+			for item in words[word]:
+				target.content.append(item)
+	return trie
+
+def bulkLoad(words):
+	trie = Trie()
+	trie.bulkLoad(words)
+	return trie
+
+for vocabSize, maxLength in ((5000, 12), (20000, 12), (5000, 40)):
+	words = {}
+	for i in range(vocabSize):
+		word = "".join(random.choice(letters) for j in range(random.randint(1, maxLength)))
+		words.setdefault(word, []).append(i)
+
+	letterCount = sum(len(word) for word in words)
+
+	print "### {} words, {} characters (max length {})".format(len(words), letterCount, maxLength)
+
+	for name, build in (("per-word insert", perWordInsert), ("bulkLoad", bulkLoad), ("TrieMiner.build", TrieMiner().build)):
+		t = min(timeit.repeat(lambda: build(words), number=1, repeat=3))
+		print "{:>16}: {:8.1f} ms, {:6.2f} Mchars/s".format(name, t * 1000, letterCount / t / 1000000)
+
+	# the builds must agree
+	old = perWordInsert(words)
+	for new in (bulkLoad(words), TrieMiner().build(words)):
+		for prefix in ("", "a", "th", "'"):
+			assert sorted(TrieSearch().performSearch(old, [prefix])) == sorted(TrieSearch().performSearch(new, [prefix]))
+	print ""
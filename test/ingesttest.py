@@ -0,0 +1,105 @@
+from ingest import ingest, ingestFile, batches, subtitleFiles, videoID
+from exampleplugins import SRTTrieMiner, VSSTrieMiner, TrieSearch
+from corpusfile import loadCorpusFile
+from querysearch import BooleanSearch
+from globalindex import GlobalIndex
+from multiprocessing import cpu_count
+import tempfile, shutil, os, random, logging, time
+from testhelpers import check
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+def startTimes(results):
+	return sorted(chunk.startTime for chunk in results)
+
+random.seed(0)
+vocabulary = "we need to go deeper a dream within dream kick limbo totem spinning top".split()
+
+def cueText():
+	return " ".join(random.choice(vocabulary) for i in range(random.randint(2, 8)))
+
+def stamp(seconds, separator):
+	return "{:02d}:{:02d}:{:02d}{}{:03d}".format(int(seconds) // 3600, int(seconds) // 60 % 60, int(seconds) % 60, separator, int(seconds * 1000) % 1000)
+
+def writeSRT(filename, cues):
+	with open(filename, "w") as file:
+		for index in range(cues):
+			file.write("{}\n{} --> {}\n{}\n\n".format(index + 1, stamp(index, ","), stamp(index + 0.5, ","), cueText()))
+
+def writeVTT(filename, cues):
+	with open(filename, "w") as file:
+		file.write("WEBVTT\n##\n")
+		for index in range(cues):
+			file.write("{} --> {}\n{}\n\n".format(stamp(index, "."), stamp(index + 0.5, "."), cueText()))
+
+root = tempfile.mkdtemp()
+source = os.path.join(root, "subs")
+os.makedirs(os.path.join(source, "more"))
+
+# many small files and one large one, which must not hold up the rest
+for index in range(60):
+	writeVTT(os.path.join(source, "video{:02d}.en.vtt".format(index)), 200)
+writeVTT(os.path.join(source, "huge.en.vtt"), 20000)
+for index in range(5):
+	writeSRT(os.path.join(source, "more", "film{}.srt".format(index)), 300)
+
+with open(os.path.join(source, "more", "broken.srt"), "w") as file:
+	file.write("1\nnot a time --> at all\nhello\n")
+with open(os.path.join(source, "notes.txt.bak"), "w") as file:
+	file.write("ignored\n")
+
+manifest = os.path.join(root, "manifest")
+with open(manifest, "w") as file:
+	file.write("# two of them\nsubs/video00.en.vtt\n\nsubs/more/film0.srt\n")
+
+print "### Finding files:"
+check("  directory", len(subtitleFiles([source])), 67)
+check("  manifest", [os.path.relpath(path, root) for path in subtitleFiles([manifest])], ["subs/video00.en.vtt", "subs/more/film0.srt"])
+check("  video ID", videoID("/tmp/dQw4w9WgXcQ.en.vtt"), "dQw4w9WgXcQ")
+
+jobs = [(path, None, None, True, 10) for path in sorted(subtitleFiles([source]), key=os.path.getsize, reverse=True)]
+grouped = list(batches(jobs, 16))
+check("  batches, the largest file alone", ([os.path.basename(job[0]) for job in grouped[0]], sum(grouped, []) == jobs), (["huge.en.vtt"], True))
+check("  several small files to a batch", len(grouped) < len(jobs) / 4, True)
+
+print ""
+print "### Ingesting into the store:"
+store = os.path.join(root, "sav")
+finished = []
+files, size, seconds, failures = ingest([source], store, workers=4, progress=finished.append)
+
+check("  files", (files, len(finished)), (67, 67))
+check("  failures", [(os.path.basename(path), error.split(":")[0]) for path, error in failures], [("broken.srt", "ValueError")])
+check("  small files finished while the largest was indexed", [os.path.basename(result[0]) for result in finished].index("huge.en.vtt") > 3, True)
+check("  saved", (len(os.listdir(store)), os.path.isfile(os.path.join(store, "video07", "vsstrieminer")), os.path.isfile(os.path.join(store, "film3", "srttrieminer"))), (66, True, True))
+
+for path, miner, saved in ((os.path.join(source, "video07.en.vtt"), VSSTrieMiner(), os.path.join(store, "video07", "vsstrieminer")), (os.path.join(source, "more", "film3.srt"), SRTTrieMiner(), os.path.join(store, "film3", "srttrieminer"))):
+	expected = startTimes(TrieSearch().performSearch(miner.build(path), ["kick"]))
+	check("  " + os.path.basename(path) + " searches as built directly", startTimes(TrieSearch().performSearch(loadCorpusFile(saved), ["kick"])) == expected, True)
+
+saved = loadCorpusFile(os.path.join(store, "video07", "vsstrieminer"))
+check("  positions and tokens saved", (saved.getNode("dream").positions is not None, saved.tokens is not None), (True, True))
+check("  phrase search", startTimes(BooleanSearch().performSearch(saved, '"dream kick"')), startTimes(BooleanSearch().performSearch(VSSTrieMiner().build(os.path.join(source, "video07.en.vtt")), '"dream kick"')))
+
+results = GlobalIndex(store).search("limbo")
+check("  found by global search", len(results), 66)
+
+print ""
+print "### Duplicate video IDs are not overwritten:"
+writeSRT(os.path.join(source, "more", "video00.en.srt"), 10)
+writeVTT(os.path.join(source, "more", "film1.de.vtt"), 10)
+files, size, seconds, failures = ingest([manifest, os.path.join(source, "more")], os.path.join(root, "sav2"), corpusTag="subs", workers=2)
+check("  failures", sorted((os.path.basename(path), error.startswith("same video ID")) for path, error in failures), [("broken.srt", False), ("film0.srt", True), ("film1.de.vtt", True), ("video00.en.srt", True)])
+
+print ""
+print "### Throughput, with {} CPUs:".format(cpu_count())
+files = subtitleFiles([source])
+start = time.time()
+for path in files:
+	ingestFile((path, os.path.join(root, "sav3"), None, True, 10))
+print "  in this process: {:.1f} files/s".format(len(files) / (time.time() - start))
+for workers in (1, 4):
+	files, size, seconds, failures = ingest([source], os.path.join(root, "sav{}".format(workers + 2)), workers=workers)
+	print "  {} workers: {:.1f} files/s, {:.2f} MB/s".format(workers, files / seconds, size / 1048576.0 / seconds)
+
+shutil.rmtree(root)
@@ -0,0 +1,107 @@
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, TrieSearch
+from querysearch import BooleanSearch
+from rankedsearch import BM25Search
+from suffixarray import InfixSearch
+from intervalindex import TimeWindowSearch
+from trie import Trie
+import random, time
+from testhelpers import check, makeChunks
+
+def startTimes(results):
+	return sorted(chunk.startTime for chunk in results)
+
+def nodes(trie):
+	stack = [('', trie.root)]
+	while stack:
+		word, node = stack.pop()
+		yield word, node
+		for label, child in node.children.iteritems():
+			stack.append((word + label, child))
+
+def hasDuplicates(trie):
+	for word, node in nodes(trie):
+		if len(set(id(chunk) for chunk in node.content)) != len(node.content):
+			return True
+	return False
+
+def inOrder(trie):
+	for word, node in nodes(trie):
+		keys = [(chunk.startTime, chunk.endTime) for chunk in node.content]
+		if keys != sorted(keys):
+			return False
+	return True
+
+random.seed(1)
+vocabulary = "we need to go deeper a dream within dream kick limbo totem spinning top projection".split()
+
+chunks = makeChunks(" ".join(random.choice(vocabulary) for i in range(random.randint(2, 8))) for index in range(80))
+
+miner = SRTChunkListToRIDict(recordPositions=True)
+trieMiner = TrieMiner(subtreeRanges=True, infixIndex=True)
+
+searches = (
+	("prefix", TrieSearch(), ["dee"]),
+	("boolean", BooleanSearch(), "dream AND NOT kick"),
+	("phrase", BooleanSearch(), '"spinning top"'),
+	("near", BooleanSearch(), "dream NEAR/3 limbo"),
+	("infix", InfixSearch(), ["imb"]),
+	("window", TimeWindowSearch(TrieSearch()), ["we", "from:10", "to:50"]),
+)
+
+def compare(title, first, second):
+	print "### " + title
+	expected = trieMiner.build(miner.build(sorted(set(first) | set(second), key=lambda chunk: chunk.startTime)))
+	trie = trieMiner.merge(trieMiner.build(miner.build(first)), trieMiner.build(miner.build(second)))
+
+	for name, engine, terms in searches:
+		check("  {} {}".format(name, terms), startTimes(engine.performSearch(trie, terms)), startTimes(engine.performSearch(expected, terms)))
+	check("  ranked", [chunk.startTime for chunk in BM25Search().performRankedSearch(trie, ["dream", "kick"], 5)], [chunk.startTime for chunk in BM25Search().performRankedSearch(expected, ["dream", "kick"], 5)])
+	check("  no duplicate postings", hasDuplicates(trie), False)
+	check("  postings in time order", inOrder(trie), True)
+	check("  stats", (trie.stats.count(), trie.stats.total), (expected.stats.count(), expected.stats.total))
+	check("  intervals", [chunk.startTime for chunk in trie.intervals.chunks], [chunk.startTime for chunk in expected.intervals.chunks])
+	print ""
+
+compare("Disjoint halves:", chunks[:40], chunks[40:])
+compare("Interleaved:", chunks[::2], chunks[1::2])
+compare("Overlapping:", chunks[:50], chunks[30:])
+compare("Small into large:", chunks[:75], chunks[70:])
+compare("Large into small:", chunks[70:], chunks[:75])
+
+print "### Without frequencies or an index:"
+first, second = Trie(), Trie()
+first.bulkLoad({"dream": chunks[0:3], "deep": chunks[1:2]})
+second.bulkLoad({"dream": chunks[2:5], "drop": chunks[4:5]})
+first.merge(second)
+check("  dream", startTimes(first.getPostings("dream")), [0, 1, 2, 3, 4])
+check("  prefix d", len(first.getPostings("d")), 7)
+empty = Trie()
+empty.merge(first)
+check("  into an empty trie", startTimes(empty.getPostings("dr")), [0, 1, 2, 3, 4, 4])
+print ""
+
+print "### Merge cost follows the smaller trie:"
+random.seed(2)
+words = {}
+letters = "abcdefghijklmnopqrstuvwxyz"
+for index in range(50000):
+	word = "".join(random.choice(letters) for i in range(random.randint(3, 9)))
+	words.setdefault(word, []).append(chunks[index % 80])
+small = {"zzzz": chunks[:1]}
+
+large = Trie()
+large.bulkLoad(words)
+small1 = Trie()
+small1.bulkLoad(small)
+start = time.time()
+large.merge(small1)
+print "  merging one word into {} words: {:.2f} ms".format(len(words), (time.time() - start) * 1000)
+
+large2 = Trie()
+large2.bulkLoad(words)
+small2 = Trie()
+small2.bulkLoad(small)
+start = time.time()
+small2.merge(large2)
+print "  merging {} words into one: {:.2f} ms".format(len(words), (time.time() - start) * 1000)
+check("  zzzz", startTimes(small2.getPostings("zzzz")), startTimes(large.getPostings("zzzz")))
@@ -0,0 +1,122 @@
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner, CompressedIndexMiner, TrieSearch
+from corpusfile import saveCorpusFile, loadCorpusFile
+from querysearch import QueryParser, BooleanSearch
+from queryplanner import coveringTerms, narrowestTerms, orderByCost, estimate
+from postings import sortPostings, intersect
+from tokeniser import tokenise
+import os, random, shutil, tempfile, time
+from testhelpers import check, makeChunks
+
+print "### Term pruning:"
+check("  OR keeps", coveringTerms(["learning", "learn", "deep", "learned", "dee", "kick"]), ["dee", "kick", "learn"])
+check("  AND keeps", narrowestTerms(["learning", "learn", "deep", "learned", "dee", "kick"]), ["deep", "kick", "learned", "learning"])
+check("  empty term", coveringTerms(["", "a", "b"]), [""])
+print ""
+
+random.seed(5)
+common = "we the a to go dream learn".split()
+rare = "deeper limbo totem spinning top kick learning learned projection architect".split()
+
+def randomLine():
+	words = [random.choice(common) for i in range(random.randint(4, 12))]
+	if random.random() < 0.1:
+		words.insert(random.randint(0, len(words)), random.choice(rare))
+	return " ".join(words)
+
+chunks = makeChunks([randomLine() for index in range(3000)])
+
+words = SRTChunkListToRIDict(recordPositions=True).build(chunks)
+trie = TrieMiner().build(words)
+
+print "### Costs from posting counts:"
+check("  'the'", estimate(trie, ('TERM', 'the')), len(words['the']))
+check("  'l' covers learn, learning and learned", estimate(trie, ('TERM', 'l')), sum(len(words[word]) for word in words if word.startswith('l')))
+check("  cheapest first", [q[1] for q in orderByCost(trie, [('TERM', 'the'), ('TERM', 'kick'), ('TERM', 'zzz')])], ['zzz', 'kick', 'the'])
+check("  unknown costs last", [q[1] for q in orderByCost(words, [('TERM', 'the'), ('TERM', 'kick')])], ['the', 'kick'])
+print ""
+
+def matches(query, text):
+	""" Evaluates a query tree against a chunk's words directly """
+
+	kind = query[0]
+	if kind == 'TERM':
+		return any(word.startswith(query[1]) for word in text)
+	if kind == 'PHRASE':
+		n = len(query[1])
+		return any(text[i:i + n] == query[1] for i in range(len(text)))
+	if kind == 'NEAR':
+		a = [i for i, word in enumerate(text) if word == query[2]]
+		b = [i for i, word in enumerate(text) if word == query[3]]
+		return any(abs(i - j) <= query[1] for i in a for j in b)
+	if kind == 'NOT':
+		return not matches(query[1], text)
+	if kind == 'AND':
+		return all(matches(q, text) for q in query[1])
+	return any(matches(q, text) for q in query[1])
+
+queries = [
+	"the AND kick",
+	"kick the",
+	"learn learning",
+	"learn AND NOT learning",
+	"learn OR learning OR learned",
+	"l AND NOT learn",
+	"dream AND to AND we AND go AND a",
+	"(kick OR totem) AND NOT dream",
+	"NOT the AND NOT a",
+	"zzz AND the",
+	"the AND zzz",
+	'"spinning top" OR (limbo AND NOT we)',
+	"learned NEAR/2 dream",
+	"dee OR deeper OR d",
+	"the NOT kick",
+]
+
+expected = dict((query, [chunk.startTime for chunk in chunks if matches(QueryParser().parse(query), tokenise(chunk.getFullText()))]) for query in queries)
+
+workDir = tempfile.mkdtemp()
+path = os.path.join(workDir, 'corpus')
+saveCorpusFile(trie, path)
+
+corpora = (
+	("trie", trie),
+	("trie with subtree ranges", TrieMiner(subtreeRanges=True).build(words)),
+	("compact trie", CompactTrieMiner().build(words)),
+	("compressed index", CompressedIndexMiner().build(words)),
+	("memory-mapped corpus", loadCorpusFile(path)),
+	("reverse-indexed dict", words),
+)
+
+print "### Planned searches match direct evaluation:"
+for name, corpus in corpora:
+	wrong = [query for query in queries if [chunk.startTime for chunk in BooleanSearch().performSearch(corpus, query)] != expected[query]]
+	check("  {}".format(name), wrong, [])
+
+found = sorted(chunk.startTime for chunk in TrieSearch().performSearch(trie, ["learn", "learning", "kick"]))
+check("  TrieSearch with overlapping terms", found == sorted(set(expected["learn OR learning OR learned"]) | set(chunk.startTime for chunk in words['kick'])), True)
+shutil.rmtree(workDir)
+print ""
+
+print "### Time per query, planned vs every term fetched in full:"
+
+def unplanned(corpus, terms):
+	""" What BooleanSearch did before: fetch and sort every term's
+		postings, then intersect """
+	return intersect([sortPostings(corpus.getPostings(term) or []) for term in terms])
+
+for query in ("kick the", "the a we go kick", "zzz the a we", "learn learning"):
+	terms = query.split()
+	results = BooleanSearch().performSearch(trie, query)
+	check("  '{}', {} results, same as unplanned".format(query, len(results)), results == unplanned(trie, terms), True)
+
+	start = time.time()
+	for repeat in range(20):
+		unplanned(trie, terms)
+	before = (time.time() - start) / 20
+
+	start = time.time()
+	for repeat in range(20):
+		BooleanSearch().performSearch(trie, query)
+	after = (time.time() - start) / 20
+
+	print "    {:.2f} ms -> {:.2f} ms".format(before * 1000, after * 1000)
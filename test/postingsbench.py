@@ -0,0 +1,64 @@
+""" Compares the memory taken by a ReverseIndex's posting lists of chunk
+	references against a CompressedIndex's varint-encoded chunk IDs, on
+	a long synthetic transcript, and times AND queries over a Trie and
+	the CompressedIndex.
+"""
+
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompressedIndexMiner
+from querysearch import BooleanSearch
+import random, sys, timeit, cPickle
+from testhelpers import makeChunks
+
+random.seed(0)
+
+# Zipf-like vocabulary, as in real speech: a few very common words
+def spell(rank):
+	""" A distinct lower-case word for each rank """
+	letters = ""
+	rank += 1
+	while rank:
+		rank, letter = divmod(rank - 1, 26)
+		letters = chr(ord('a') + letter) + letters
+	return letters
+
+vocabulary = [spell(i) for i in range(8000)]
+weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+total = sum(weights)
+cumulative = []
+running = 0.0
+for weight in weights:
+	running += weight / total
+	cumulative.append(running)
+
+from bisect import bisect_left
+def randomWord():
+	return vocabulary[min(bisect_left(cumulative, random.random()), len(vocabulary) - 1)]
+
+# ten hours of subtitles, one chunk every three seconds
+chunks = makeChunks([" ".join(randomWord() for j in range(random.randint(6, 14))) for i in range(12000)], 3)
+
+words = SRTChunkListToRIDict().build(chunks)
+compressed = CompressedIndexMiner().build(words)
+
+postingCount = sum(len(chunkList) for chunkList in words.itervalues())
+print "### {} chunks, {} words, {} postings".format(len(chunks), len(words), postingCount)
+
+listBytes = sum(sys.getsizeof(chunkList) for chunkList in words.itervalues())
+encodedBytes = sys.getsizeof(compressed.data) + sys.getsizeof(compressed.offsets) + sys.getsizeof(compressed.chunks)
+print "{:>24}: {:8.1f} KB".format("lists of chunks", listBytes / 1024.0)
+print "{:>24}: {:8.1f} KB ({:.1f}x smaller, {:.2f} bytes per posting)".format("varint IDs + chunk table", encodedBytes / 1024.0, float(listBytes) / encodedBytes, float(len(compressed.data)) / postingCount)
+
+# pickled posting lists alone, as chunk references are shared in both
+listPickle = len(cPickle.dumps(dict((word, [id(chunk) for chunk in chunkList]) for word, chunkList in words.iteritems()), 2))
+encodedPickle = len(cPickle.dumps((compressed.words, compressed.data, compressed.offsets.tostring()), 2))
+print "{:>24}: {:8.1f} KB pickled, against {:.1f} KB".format("varint IDs", encodedPickle / 1024.0, listPickle / 1024.0)
+
+print ""
+print "### AND of two words, by BooleanSearch"
+trie = TrieMiner().build(words)
+for pair in ((spell(0), spell(1)), (spell(5), spell(400)), (spell(2000), spell(3000))):
+	query = " AND ".join(pair)
+	t1 = min(timeit.repeat(lambda: BooleanSearch().performSearch(trie, query), number=100, repeat=3)) / 100
+	t2 = min(timeit.repeat(lambda: BooleanSearch().performSearch(compressed, query), number=100, repeat=3)) / 100
+	assert [c.startTime for c in BooleanSearch().performSearch(trie, query)] == [c.startTime for c in BooleanSearch().performSearch(compressed, query)]
+	print "{:>12} ({:5d}, {:5d} postings): trie {:7.3f} ms, compressed {:7.3f} ms".format(query, trie.postingCount(pair[0]), trie.postingCount(pair[1]), t1 * 1000, t2 * 1000)
@@ -0,0 +1,72 @@
+from querysearch import QueryParser, BooleanSearch
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner
+from testhelpers import check, makeChunks
+
+### Build a small trie corpus
+
+texts = [
+	"machine learning is fun",
+	"learning to code",
+	"a machine that learns",
+	"deep learning machine",
+	"nothing to see here",
+	"Machine, learning!",
+]
+
+chunks = makeChunks(texts)
+
+trie = TrieMiner().build(SRTChunkListToRIDict().build(chunks))
+
+# the same corpus with token positions recorded, so phrase and NEAR
+# queries do not need to read the chunks' text
+positional = SRTChunkListToRIDict(recordPositions=True).build(chunks)
+
+print "### Parse trees:"
+print ""
+
+for query in ['machine learning', '"machine learning" OR code', 'learn NOT deep', '(deep OR code) learning', 'machine NEAR/2 fun']:
+	print query, "=>", QueryParser().parse(query)
+
+print ""
+print "### Operators are only recognised in upper case:"
+for query, tree in (
+		('to be or not to be', ('AND', [('TERM', 'to'), ('TERM', 'be'), ('TERM', 'or'), ('TERM', 'not'), ('TERM', 'to'), ('TERM', 'be')])),
+		('not', ('TERM', 'not')),
+		('or', ('TERM', 'or')),
+		('a near/2', ('AND', [('TERM', 'a'), ('TERM', 'near')])),
+		('a NEAR/2 b', ('NEAR', 2, 'a', 'b'))):
+	check(query + " =>", QueryParser().parse(query), tree)
+check("search 'not' =>", [chunk.startTime for chunk in BooleanSearch().performSearch(trie, 'not')], [4])
+check("search 'nothing or code' =>", [chunk.startTime for chunk in BooleanSearch().performSearch(trie, 'nothing or code')], [])
+
+print ""
+print "### Search results (chunk start times):"
+print ""
+
+search = BooleanSearch()
+
+expected = [
+	('machine learning', [0, 3, 5]),
+	('"machine learning"', [0, 5]),
+	('"learning machine"', [3]),
+	('machine OR code', [0, 1, 2, 3, 5]),
+	('learn NOT deep', [0, 1, 2, 5]),
+	('NOT machine', [1, 4]),
+	('(deep OR code) learning', [1, 3]),
+	(['machine', 'learning'], [0, 3, 5]), # as split by the frontend
+	('machine NEAR/3 fun', [0]),
+	('machine NEAR/2 fun', []),
+	('learning NEAR/1 machine', [0, 3, 5]),
+	('"deep learning" NEAR/1 machine', [3]),
+]
+
+for name, corpus in (("Trie", trie), ("Positional reverse index", positional),
+		("Positional trie", TrieMiner().build(positional)), ("Positional CompactTrie", CompactTrieMiner().build(positional))):
+	print "#", name
+
+	for query, times in expected:
+		result = [chunk.startTime for chunk in search.performSearch(corpus, query)]
+		print query, "=>", result, "OK" if result == times else "FAIL, expected {}".format(times)
+	print ""
+
+print "### Recorded positions of 'learning':", [list(positional.positions['learning'].get(i)) for i in range(len(positional['learning']))]
@@ -0,0 +1,44 @@
+from rankedsearch import BM25Search
+from querysearch import BooleanSearch
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner
+from pipeline import Pipeline
+from testhelpers import makeChunks
+
+### Build a small corpus where 'dream' is common and 'limbo' is rare
+
+texts = [
+	"a dream within a dream within a dream",
+	"we have to go deeper into the dream",
+	"limbo is raw infinite subconscious",
+	"you mustn't be afraid to dream a little bigger darling",
+	"the dream has become their reality who are you to say otherwise",
+	"limbo dream",
+]
+
+chunks = makeChunks(texts)
+
+index = SRTChunkListToRIDict().build(chunks)
+
+pipe = Pipeline()
+pipe.addSearch(BM25Search(), 'bm25')
+pipe.addSearch(BooleanSearch(), 'bool')
+
+for name, corpus in (("Reverse index", index), ("Trie", TrieMiner().build(index)), ("CompactTrie", CompactTrieMiner().build(index))):
+	pipe.corpus['test'] = corpus
+
+	print "###", name
+
+	# repeated and short chunks first; the rare word outweighs the common one
+	result = [chunk.startTime for chunk in pipe.performSearch('test', 'bm25', ['dream'], 3)]
+	print "dream, top 3:", result, "OK" if result == [0, 5, 1] else "FAIL"
+
+	result = [chunk.startTime for chunk in pipe.performSearch('test', 'bm25', ['limbo', 'dream'], 2)]
+	print "limbo dream, top 2:", result, "OK" if result == [5, 2] else "FAIL"
+
+	result = [chunk.startTime for chunk in pipe.performSearch('test', 'bm25', ['limbo', 'dream'])]
+	print "limbo dream, all:", result, "OK" if len(result) == 6 else "FAIL"
+
+	# boolean matches ranked the same way
+	result = [chunk.startTime for chunk in pipe.performSearch('test', 'bool', ['dream', 'NOT', 'limbo'], 2)]
+	print "dream NOT limbo, top 2:", result, "OK" if result == [0, 1] else "FAIL"
+	print ""
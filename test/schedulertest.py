@@ -0,0 +1,187 @@
+from pipeline import Pipeline, Timeline, Acquirer, DataMiner, READY, ERROR
+from scheduler import Scheduler
+from threading import Lock
+import logging, time
+from testhelpers import check
+
+logging.getLogger('pipeline').setLevel(logging.CRITICAL)
+
+runs = []
+runsLock = Lock()
+
+def ran(tag):
+	with runsLock:
+		runs.append(tag)
+
+class TextAcquirer(Acquirer):
+	def __init__(self, text, delay=0.0):
+		Acquirer.__init__(self)
+		self.text = text
+		self.delay = delay
+
+	def acquire(self, *args):
+		ran(self.tag)
+		time.sleep(self.delay)
+		return self.text + "".join(args)
+
+class FailingAcquirer(Acquirer):
+	def acquire(self, *args):
+		ran(self.tag)
+		return None, ERROR
+
+class AppendMiner(DataMiner):
+	""" Appends its suffix to its input, after a delay """
+
+	def __init__(self, suffix, delay=0.0):
+		DataMiner.__init__(self)
+		self.suffix = suffix
+		self.delay = delay
+
+	def build(self, data):
+		ran(self.tag)
+		time.sleep(self.delay)
+		return data + self.suffix
+
+class BrokenMiner(DataMiner):
+	def build(self, data):
+		ran(self.tag)
+		raise ValueError("broken")
+
+def makePipeline(delay=0.0):
+	pipe = Pipeline()
+	plugins = (
+		('acquire', 'src', TextAcquirer("src", delay)),
+		('acquire', 'other', TextAcquirer("other", delay)),
+		('acquire', 'fail', FailingAcquirer()),
+		('mine', 'lines', AppendMiner("+lines", delay)),
+		('mine', 'trie', AppendMiner("+trie", delay)),
+		('mine', 'trie2', AppendMiner("+trie2", delay)),
+		('mine', 'broken', BrokenMiner()),
+	)
+	for kind, tag, plugin in plugins:
+		plugin.tag = tag
+		if kind == 'acquire':
+			pipe.addAcquirer(plugin, tag)
+		else:
+			pipe.addMiner(plugin, tag)
+	pipe.addSearch(None, 'search')
+	return pipe
+
+def timelines():
+	return {
+		'subtitles': Timeline("Subtitles", ['fail', 'src'], ['lines', 'trie'], ['lines', 'trie'], 'search'),
+		'subtitles2': Timeline("Duplicate", 'src', ['lines', 'trie'], ['lines', 'trie'], 'search'),
+		'alt': Timeline("Alternative", 'src', ['lines', 'trie2'], ['lines', 'alt'], 'search'),
+		'othertrie': Timeline("Same miner, other input", 'other', ['trie'], ['othertrie'], 'search'),
+		'broken': Timeline("Broken", 'src', ['lines', 'broken'], ['lines', 'broken'], 'search'),
+	}
+
+print "### Shared stages run once:"
+pipe = makePipeline()
+scheduler = Scheduler(pipe)
+tl = timelines()
+scheduler.generate(tl.values(), "!")
+
+check("  statuses", dict((name, timeline.status) for name, timeline in tl.items()), {'subtitles': READY, 'subtitles2': READY, 'alt': READY, 'othertrie': READY, 'broken': ERROR})
+check("  runs", sorted(runs), sorted(['fail', 'src', 'other', 'lines', 'trie', 'trie2', 'trie', 'broken']))
+check("  corpora", dict((tag, pipe.corpus.get(tag)) for tag in ('lines', 'trie', 'alt', 'othertrie')), {'lines': "src!+lines", 'trie': "src!+lines+trie", 'alt': "src!+lines+trie2", 'othertrie': "other!+trie"})
+check("  successful acquirer", tl['subtitles'].succesfulAcquirer, 1)
+
+del runs[:]
+scheduler.generate([tl['subtitles'], tl['alt']], "!")
+check("  resubmitted timelines reuse their stages", (runs, tl['subtitles'].status), ([], READY))
+
+print ""
+print "### A miner shared by timelines with different inputs:"
+# generateTimeline() keys work by miner alone, so the second timeline
+# finds 'trie' READY and never builds its corpus
+pipe = makePipeline()
+tl = timelines()
+pipe.generateTimeline(tl['subtitles2'], "!")
+pipe.generateTimeline(tl['othertrie'], "!")
+check("  generateTimeline", pipe.corpus.get('othertrie'), None)
+
+pipe = makePipeline()
+tl = timelines()
+Scheduler(pipe).generate([tl['subtitles2'], tl['othertrie']], "!")
+check("  scheduler", pipe.corpus.get('othertrie'), "other!+trie")
+
+print ""
+print "### One miner on two inputs, stored as one corpus:"
+pipe = makePipeline()
+scheduler = Scheduler(pipe)
+tl = timelines()
+tl['samecorpus'] = Timeline("Same miner and corpus, other input", 'other', ['trie'], ['trie'], 'search')
+scheduler.generate([tl['subtitles2']], "!")
+scheduler.generate([tl['samecorpus']], "!")
+check("  other timeline rejected", (tl['subtitles2'].status, tl['samecorpus'].status, pipe.corpus.get('trie')), (READY, ERROR, "src!+lines+trie"))
+scheduler.generate([tl['subtitles2']], "?")
+check("  other acquire arguments rejected", (tl['subtitles2'].status, pipe.corpus.get('lines'), pipe.corpus.get('trie')), (ERROR, "src!+lines", "src!+lines+trie"))
+scheduler.regenerate(tl['subtitles2'], "?").wait()
+check("  regenerated", (tl['subtitles2'].status, pipe.corpus.get('trie')), (READY, "src?+lines+trie"))
+scheduler.clear()
+scheduler.generate([tl['samecorpus']], "!")
+check("  cleared", (tl['samecorpus'].status, pipe.corpus.get('trie')), (READY, "other!+trie"))
+
+print ""
+print "### Independent branches run in parallel:"
+del runs[:]
+pipe = makePipeline(0.2)
+tl = timelines()
+start = time.time()
+Scheduler(pipe).generate([tl['subtitles2'], tl['alt'], tl['othertrie']], "!")
+elapsed = time.time() - start
+# src, lines, then trie and trie2 at once, alongside other and its trie
+check("  three timelines in the time of one chain", elapsed < 0.75, True)
+print "  {:.2f}s, against {:.2f}s for its {} stages one after another".format(elapsed, 0.2 * len(runs), len(runs))
+
+print ""
+print "### Transient corpora:"
+del runs[:]
+pipe = makePipeline()
+pipe.markTransient('lines')
+scheduler = Scheduler(pipe)
+tl = timelines()
+scheduler.generate([tl['subtitles2'], tl['alt']], "!")
+check("  dropped once every reader has run", (sorted(pipe.corpus.keys()), tl['alt'].status), (['alt', 'trie'], READY))
+check("  built once", runs.count('lines'), 1)
+
+del runs[:]
+scheduler.generate([tl['subtitles']], "!")
+check("  not rebuilt for a timeline whose last stage is built", (runs, pipe.corpus.get('trie'), tl['subtitles'].status), (['fail'], "src!+lines+trie", READY))
+
+print ""
+print "### Failures after a stage has run end the timeline:"
+class FailingDrop(Pipeline):
+	def dropCorpus(self, corpusTag):
+		raise IOError("cannot drop " + corpusTag)
+
+failing = makePipeline()
+failing.__class__ = FailingDrop
+failing.markTransient('lines')
+tl = timelines()
+check("  finished", Scheduler(failing).submit(tl['subtitles2'], "!").wait(5), True)
+check("  status", (tl['subtitles2'].status, failing.transientUsers), (ERROR, {}))
+
+class FailingStore(Pipeline):
+	def setCorpus(self, corpusTag, corpus):
+		if corpusTag == 'lines':
+			raise IOError("cannot store " + corpusTag)
+		Pipeline.setCorpus(self, corpusTag, corpus)
+
+failing = makePipeline()
+failing.__class__ = FailingStore
+tl = timelines()
+check("  corpus not stored", (Scheduler(failing).submit(tl['subtitles2'], "!").wait(5), tl['subtitles2'].status), (True, ERROR))
+
+print ""
+print "### Regenerating and clearing:"
+del runs[:]
+scheduler.regenerate(tl['subtitles2'], "!").wait()
+check("  regenerated", (sorted(runs), tl['subtitles2'].status), (['lines', 'src', 'trie'], READY))
+
+del runs[:]
+pipe.clearMemory()
+scheduler.clear()
+scheduler.generate([tl['othertrie']], "?")
+check("  cleared", (runs, pipe.corpus.get('othertrie')), (['other', 'trie'], "other?+trie"))
@@ -0,0 +1,55 @@
+from pipeline import Pipeline, DataMiner, SearchEngine, OUT_OF_DATE
+import logging
+from testhelpers import check
+
+logging.getLogger('pipeline').setLevel(logging.WARNING)
+
+class CountingSearch(SearchEngine):
+	""" Returns the corpus items containing any term, counting calls """
+
+	calls = 0
+
+	def performSearch(self, corpus, terms):
+		CountingSearch.calls += 1
+		return [item for item in corpus if any(term in item for term in terms)]
+
+class ListMiner(DataMiner):
+	def build(self, data):
+		return list(data)
+
+pipe = Pipeline(cacheSize=2)
+pipe.addSearch(CountingSearch(), 'count')
+pipe.addMiner(ListMiner(), 'list')
+
+pipe.rawData['raw'] = ["inception", "limbo", "kick"]
+pipe.buildCorpus('list', 'words', 'raw')
+
+print "### Repeated searches are served from the cache:"
+pipe.performSearch('words', 'count', ['in'])
+pipe.performSearch('words', 'count', [' in ', ''])	# normalises to the same terms
+check("search calls:", CountingSearch.calls, 1)
+check("hits/misses:", (pipe.cacheHits, pipe.cacheMisses), (1, 1))
+
+print "### Least recently used entries are evicted:"
+pipe.performSearch('words', 'count', ['ki'])
+pipe.performSearch('words', 'count', ['li'])	# evicts ['in']
+pipe.performSearch('words', 'count', ['in'])
+check("search calls:", CountingSearch.calls, 4)
+
+print "### Replacing the corpus invalidates its results:"
+pipe.setMinerStatus('list', OUT_OF_DATE)
+pipe.rawData['raw'] = ["dream", "inside", "a", "dream"]
+pipe.buildCorpus('list', 'words', 'raw')
+check("results:", pipe.performSearch('words', 'count', ['in']), ["inside"])
+
+pipe.clearMemory()
+pipe.corpus['words'] = ["kick"]
+check("results after clearMemory:", pipe.performSearch('words', 'count', ['in']), [])
+
+print "### Terms differing in case are cached apart, as operators are upper case:"
+calls = CountingSearch.calls
+pipe.performSearch('words', 'count', ['ki'])
+pipe.performSearch('words', 'count', ['KI'])
+check("search calls:", CountingSearch.calls - calls, 2)
+
+pipe.reportStatus()
@@ -0,0 +1,52 @@
+from snippets import snippetTerms, makeSnippet
+from tokeniser import tokenise, tokeniseWithOffsets
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner, CompressedIndexMiner, TrieSearch
+import timeit
+from testhelpers import checkRepr, makeChunk, makeChunks
+
+def marked(snippet):
+	text = snippet['text']
+	for start, end in reversed(snippet['highlights']):
+		text = text[:start] + "[" + text[start:end] + "]" + text[end:]
+	return text
+
+print "### Token offsets:"
+for text in ("We need to go deeper.", "  (dream)  within--a 'dream' 42", "", "Inception!"):
+	words, offsets = tokeniseWithOffsets(text)
+	checkRepr(repr(text), words == tokenise(text) and all(text[offsets[2 * i]:offsets[2 * i + 1]].lower() == words[i] for i in range(len(words))), True)
+
+print ""
+print "### Search terms:"
+checkRepr("boolean", snippetTerms(['dream', 'AND', 'NOT', '"kick', 'off"', 'NEAR/3', 'from:10:00', '(limbo)']), ['dream', 'kick', 'off', 'limbo'])
+checkRepr("lower-case operators are words", snippetTerms(['to', 'be', 'or', 'not']), ['to', 'be', 'or', 'not'])
+
+texts = ["We need to go deeper, into a dream within a dream.", "You mustn't be afraid to dream a little bigger, darling. " * 4, u"Caf\xe9 dreams in Paris".encode('utf-8')]
+chunks = makeChunks(texts)
+
+print ""
+print "### Snippets:"
+for name, corpus in (("Trie", TrieMiner().build(SRTChunkListToRIDict(recordPositions=True).build(chunks))), ("CompactTrie", CompactTrieMiner().build(SRTChunkListToRIDict(recordPositions=True).build(chunks))), ("CompressedIndex", CompressedIndexMiner().build(SRTChunkListToRIDict(recordPositions=True).build(chunks))), ("no offsets recorded", TrieMiner().build(SRTChunkListToRIDict().build(chunks)))):
+	results = sorted(TrieSearch().performSearch(corpus, ["dream"]), key=lambda chunk: chunk.startTime)
+	snippets = [makeSnippet(corpus, chunk, ["dream"]) for chunk in results]
+	checkRepr(name + " short", marked(snippets[0]), "We need to go deeper, into a [dream] within a [dream].")
+	checkRepr(name + " window", marked(snippets[1]), "You mustn't be afraid to [dream] a little bigger, darling. You mustn't be afraid to [dream] a little...")
+	checkRepr(name + " unicode", marked(snippets[2]), u"Caf\xe9 [dreams] in Paris")
+
+long = makeChunk("word " * 200 + "the totem spins " + "word " * 200, 10, 11)
+corpus = TrieMiner().build(SRTChunkListToRIDict(recordPositions=True).build([long]))
+checkRepr("match in the middle", marked(makeSnippet(corpus, long, ["totem"], 40)), "...word the [totem] spins word word word word...")
+
+print ""
+print "### Added incrementally:"
+trie = TrieMiner().addChunks(None, chunks[:1])
+checkRepr("tokens recorded", trie.tokens.get(chunks[0]) is not None, True)
+TrieMiner().removeChunks(trie, chunks[:1])
+checkRepr("tokens removed", trie.tokens.get(chunks[0]), None)
+
+print ""
+print "### Cost per snippet:"
+corpus = TrieMiner().build(SRTChunkListToRIDict(recordPositions=True).build(chunks))
+plain = TrieMiner().build(SRTChunkListToRIDict().build(chunks))
+for name, c in (("recorded offsets", corpus), ("re-tokenised", plain)):
+	t = min(timeit.repeat(lambda: makeSnippet(c, chunks[1], ["dream"]), number=1000, repeat=3))
+	print "{:>18}: {:.1f} us".format(name, t * 1000)
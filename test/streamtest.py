@@ -0,0 +1,95 @@
+from chunker import SRTChunker, readSRT, readVTT, timestampToSeconds
+from exampleplugins import SRTChunkMiner, VSSChunkMiner, SRTTrieMiner, TrieSearch
+import tempfile, os, random, weakref, time
+from testhelpers import check
+
+def stamp(seconds, separator):
+	return "{:02d}:{:02d}:{:02d}{}{:03d}".format(int(seconds) // 3600, int(seconds) // 60 % 60, int(seconds) % 60, separator, int(round(seconds * 1000)) % 1000)
+
+random.seed(0)
+vocabulary = "we need to go deeper a dream within dream kick limbo totem spinning top".split()
+cues = [(index * 2.5, index * 2.5 + 2, [" ".join(random.choice(vocabulary) for i in range(random.randint(2, 6))) for line in range(random.randint(1, 2))]) for index in range(20000)]
+
+srt = tempfile.NamedTemporaryFile(suffix=".srt", delete=False)
+for index, (start, end, lines) in enumerate(cues):
+	srt.write("{}\n{} --> {}\n{}\n\n".format(index + 1, stamp(start, ","), stamp(end, ","), "\n".join("<i>" + line + "</i>" for line in lines)))
+srt.close()
+
+vtt = tempfile.NamedTemporaryFile(suffix=".vtt", delete=False)
+vtt.write("WEBVTT\nKind: captions\nLanguage: en\n##\n")
+for start, end, lines in cues:
+	vtt.write("{} --> {} align:start position:0%\n{}\n\n".format(stamp(start, "."), stamp(end, "."), "\n".join(lines)))
+vtt.close()
+
+print "### Timestamps:"
+check("  srt", timestampToSeconds("01:02:03,500"), 3723.5)
+check("  vtt", timestampToSeconds("01:02:03.500"), 3723.5)
+check("  vtt without hours", timestampToSeconds("02:03.250"), 123.25)
+
+print ""
+print "### Every cue is read, including the last:"
+for name, reader, filename in (("srt", readSRT, srt.name), ("vtt", readVTT, vtt.name)):
+	chunks = list(reader(filename))
+	check("  " + name, (len(chunks), chunks[-1].startTime, chunks[-1].content), (len(cues), cues[-1][0], cues[-1][2]))
+
+chunks = list(readVTT(["WEBVTT", "##", "02:03.250 --> 02:05.000 align:start", "short stamps"]))
+check("  vtt without hours, with cue settings", [(chunk.startTime, chunk.endTime, chunk.content) for chunk in chunks], [(123.25, 125.0, ["short stamps"])])
+
+print ""
+print "### Streaming reads only as far as each chunk:"
+class CountingLines:
+	def __init__(self, filename):
+		self.file = open(filename)
+		self.count = 0
+
+	def __iter__(self):
+		for line in self.file:
+			self.count += 1
+			yield line
+
+# the first cue's lines, and up to the next cue's times
+for name, reader, filename, first in (("srt", readSRT, srt.name, len(cues[0][2]) + 5), ("vtt", readVTT, vtt.name, len(cues[0][2]) + 7)):
+	lines = CountingLines(filename)
+	chunks = reader(lines)
+	chunks.next()
+	check("  {} lines read for the first chunk".format(name), lines.count, first)
+
+# only the current chunk is held, so those already passed on are freed
+alive = 0
+references = []
+for chunk in readSRT(srt.name):
+	references.append(weakref.ref(chunk))
+	alive = max(alive, sum(1 for reference in references[-10:] if reference() is not None))
+	del chunk
+check("  most chunks alive at once", alive, 1)
+
+print ""
+print "### Miners take a filename or a list of lines:"
+def index(words):
+	return dict((word, [chunk.startTime for chunk in chunks]) for word, chunks in words.iteritems())
+
+for name, miner, filename in (("srt", SRTChunkMiner(), srt.name), ("vtt", VSSChunkMiner(), vtt.name)):
+	with open(filename) as file:
+		lines = file.readlines()
+	check("  " + name + " same index", index(miner.build(filename)) == index(miner.build(lines)), True)
+
+results = TrieSearch().performSearch(SRTTrieMiner().build(srt.name), ["limbo"])
+check("  SRTTrieMiner finds every 'limbo'", len(results), sum(1 for start, end, lines in cues if "limbo" in " ".join(lines).split()))
+
+print ""
+print "### SRTChunkers do not share chunks:"
+first = SRTChunker(srt.name)
+second = SRTChunker(srt.name)
+check("  chunks", (len(first.chunks), len(second.chunks)), (len(cues), len(cues)))
+check("  words", len(second.words["limbo"]), len(first.words["limbo"]))
+
+print ""
+print "### Time to index {} cues:".format(len(cues))
+for name, miner in (("srt", SRTChunkMiner()), ("vtt", VSSChunkMiner())):
+	filename = srt.name if name == "srt" else vtt.name
+	start = time.time()
+	miner.build(filename)
+	print "  {}: {:.2f}s ({:.1f} MB)".format(name, time.time() - start, os.path.getsize(filename) / 1048576.0)
+
+os.remove(srt.name)
+os.remove(vtt.name)
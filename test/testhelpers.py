@@ -0,0 +1,28 @@
+from chunker import SRTChunk
+
+def check(description, result, expected, show=str):
+	""" Prints the result of a test, with OK or FAIL """
+
+	print description, show(result), "OK" if result == expected else "FAIL, expected {}".format(show(expected))
+
+def checkRepr(description, result, expected):
+	""" As check, showing the repr of the result """
+
+	check(description, result, expected, repr)
+
+def makeChunk(content, start, end):
+	""" Returns an SRTChunk of the given text, or list of lines """
+
+	chunk = SRTChunk()
+	chunk.content = [content] if isinstance(content, basestring) else list(content)
+	chunk.startTime = start
+	chunk.endTime = end
+	return chunk
+
+def makeChunks(texts, spacing=1, length=None):
+	""" Returns a chunk for each text, the nth starting at n * spacing and
+		lasting length (by default spacing) """
+
+	if length is None:
+		length = spacing
+	return [makeChunk(text, index * spacing, index * spacing + length) for index, text in enumerate(texts)]
@@ -0,0 +1,37 @@
+from intervalindex import IntervalIndex, TimeWindowSearch, parseTime
+from querysearch import BooleanSearch
+from rankedsearch import BM25Search
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner
+from testhelpers import check, makeChunk, makeChunks
+
+### One chunk every 30 seconds for 40 minutes, mentioning 'dream' every other chunk
+
+# each overlaps the next chunk slightly
+chunks = makeChunks(["dream number {}".format(index) if index % 2 == 0 else "kick number {}".format(index) for index in range(80)], 30, 32)
+
+index = SRTChunkListToRIDict().build(chunks)
+
+print "### Interval index lookups:"
+intervals = IntervalIndex(chunks)
+check("at 12:34:", [chunk.startTime for chunk in intervals.at(parseTime("12:34"))], [750])
+check("at 12:31 (overlap):", [chunk.startTime for chunk in intervals.at(parseTime("12:31"))], [720, 750])
+check("10:00 to 11:00:", [chunk.startTime for chunk in intervals.overlapping(600, 660)], [570, 600, 630, 660])
+
+added = IntervalIndex(makeChunks(["a", "b"], 10, 5))
+for chunk in (makeChunk("c", 10, 20), makeChunk("d", 10, 12), makeChunk("e", 0, 3)):
+	added.add(chunk)
+check("added in posting order:", [(chunk.startTime, chunk.endTime) for chunk in added.chunks], [(0, 3), (0, 5), (10, 12), (10, 15), (10, 20)])
+added.merge(IntervalIndex([makeChunk("f", 10, 13)]))
+check("then merged:", [(chunk.startTime, chunk.endTime) for chunk in added.chunks], [(0, 3), (0, 5), (10, 12), (10, 13), (10, 15), (10, 20)])
+
+print ""
+print "### Time-window searches:"
+search = TimeWindowSearch(BooleanSearch())
+for name, corpus in (("Trie", TrieMiner().build(index)), ("CompactTrie", CompactTrieMiner().build(index)), ("Reverse index", index)):
+	print "#", name
+	check("dream from:10:00 to:20:00:", [chunk.startTime for chunk in search.performSearch(corpus, ['dream', 'from:10:00', 'to:20:00'])][:3], [600, 660, 720])
+	check("count:", len(search.performSearch(corpus, ['dream', 'from:10:00', 'to:20:00'])), 11)
+	check("at:12:34:", [chunk.getFullText() for chunk in search.performSearch(corpus, ['at:12:34'])], ["kick number 25"])
+	check("no window:", len(search.performSearch(corpus, ['dream'])), 40)
+	ranked = [chunk.startTime for chunk in BM25Search().performRankedSearch(corpus, ['number'], None)]
+	check("ranked, from:10:00 to:20:00:", [chunk.startTime for chunk in TimeWindowSearch(BM25Search()).performRankedSearch(corpus, ['number', 'from:10:00', 'to:20:00'], 5)], [time for time in ranked if 570 <= time <= 1200][:5])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from tokeniser import Tokeniser, tokenise, tokeniseWithOffsets, normaliseWord, uniqueWords
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, TrieSearch
+from corpusfile import saveCorpusFile, loadCorpusFile
+from querysearch import BooleanSearch
+from snippets import makeSnippet
+from chunker import ChunkTable
+import os, random, re, shutil, tempfile, time
+from testhelpers import checkRepr, makeChunk, makeChunks
+
+def spans(text, tokeniser):
+	words, offsets = tokeniser.withOffsets(text)
+	return [text[offsets[2 * i]:offsets[2 * i + 1]] for i in range(len(words))]
+
+print "### Default tokeniser:"
+checkRepr("  words", tokenise("Well...I don't KNOW, 42 times!"), ["well", "i", "don't", "know", "42", "times"])
+checkRepr("  offsets", spans("Well...I don't KNOW", Tokeniser()), ["Well", "I", "don't", "KNOW"])
+checkRepr("  unique", uniqueWords("a dream within a dream"), set(["a", "dream", "within"]))
+checkRepr("  search term", normaliseWord('"Dream,'), "dream")
+checkRepr("  term without a word", normaliseWord("--"), "--")
+checkRepr("  accented letters split words", tokenise("caf\xc3\xa9 cr\xc3\xa8me"), ["caf", "cr", "me"])
+print ""
+
+print "### Unicode and folding tokenisers:"
+text = "Caf\xc3\xa9 CR\xc3\x88ME br\xc3\xbbl\xc3\xa9e, \xef\xac\x81n" # UTF-8, with an 'fi' ligature
+checkRepr("  unicode words", Tokeniser(unicode=True).words(text), [u"caf\xe9", u"cr\xe8me", u"br\xfbl\xe9e", u"ﬁn"])
+checkRepr("  unicode byte offsets", spans(text, Tokeniser(unicode=True)), ["Caf\xc3\xa9", "CR\xc3\x88ME", "br\xc3\xbbl\xc3\xa9e", "\xef\xac\x81n"])
+checkRepr("  folded words", Tokeniser(fold=True).words(text), [u"cafe", u"creme", u"brulee", u"fin"])
+checkRepr("  folded search term", Tokeniser(fold=True).normalise(u"Cr\xe8me"), u"creme")
+print ""
+
+print "### Corpora built with a folding tokeniser:"
+table = ChunkTable(makeChunks(["Caf\xc3\xa9 au lait", "the creme brulee", "CR\xc3\x88ME caramel"]))
+
+words = SRTChunkListToRIDict(recordPositions=True, tokeniser=Tokeniser(fold=True)).build(table)
+trie = TrieMiner().build(words)
+checkRepr("  prefix 'cr'", [chunk.startTime for chunk in TrieSearch().performSearch(trie, ["cr"])], [1, 2])
+checkRepr("  boolean, folded query", [chunk.startTime for chunk in BooleanSearch().performSearch(trie, u"Cr\xe8me AND NOT brulee")], [2])
+checkRepr("  phrase", [chunk.startTime for chunk in BooleanSearch().performSearch(trie, '"creme caramel"')], [2])
+checkRepr("  snippet", makeSnippet(trie, table[2], [u"creme"]), {'text': u"CR\xc8ME caramel", 'highlights': [[0, 5]]})
+
+workDir = tempfile.mkdtemp()
+path = os.path.join(workDir, 'corpus')
+saveCorpusFile(trie, path)
+mapped = loadCorpusFile(path)
+checkRepr("  saved and loaded", (mapped.tokeniser.unicode, mapped.tokeniser.fold), (True, True))
+checkRepr("  loaded, boolean", [chunk.startTime for chunk in BooleanSearch().performSearch(mapped, u"Cr\xe8me AND NOT brulee")], [2])
+shutil.rmtree(workDir)
+
+TrieMiner().addChunks(trie, [makeChunk("Cr\xc3\xa8me fra\xc3\xaeche", 3, 4)])
+checkRepr("  added chunk", [c.startTime for c in TrieSearch().performSearch(trie, ["fraiche"])], [3])
+print ""
+
+print "### Tokens per second:"
+
+# the per-word search the miners used before
+oldPattern = "([A-Za-z']+)"
+def oldTokenise(text):
+	words = []
+	for word in text.split(" "):
+		tmp = re.search(oldPattern, word)
+		if tmp:
+			word = tmp.group(1)
+		word = word.lower()
+		if word != '':
+			words.append(word)
+	return words
+
+def oldUnique(text):
+	usedwords = []
+	for word in oldTokenise(text):
+		if word not in usedwords:
+			usedwords.append(word)
+	return usedwords
+
+random.seed(4)
+vocabulary = "we need to go deeper, a dream within a dream. Kick! limbo totem spinning top don't you 'mal' 1010 projection".split()
+texts = [" ".join(random.choice(vocabulary) for i in range(random.randint(5, 40))) for index in range(2000)]
+tokenCount = sum(len(tokenise(text)) for text in texts)
+
+def rate(function):
+	start = time.time()
+	for text in texts:
+		function(text)
+	return tokenCount / (time.time() - start)
+
+baseline = rate(oldTokenise)
+print "  per-word re.search: {:,.0f} tokens/s".format(baseline)
+for name, function in (
+		("default words", tokenise),
+		("default unique", uniqueWords),
+		("default with offsets", tokeniseWithOffsets),
+		("unicode words", Tokeniser(unicode=True).words),
+		("folded words", Tokeniser(fold=True).words)):
+	print "  {}: {:,.0f} tokens/s".format(name, rate(function))
+print "  per-word re.search, list dedupe: {:,.0f} tokens/s".format(rate(oldUnique))
+checkRepr("  faster than per-word search", rate(tokenise) > 2 * baseline, True)
@@ -0,0 +1,90 @@
+""" Compares memory use, pickle size and lookup latency of the dict-based
+	Trie (with and without subtree ranges) against the array-backed
+	CompactTrie, over a synthetic transcript roughly the length of a
+	one-hour video.  CompactTrie trades slower single lookups (a bisect
+	per character rather than a dict lookup) for a fraction of the
+	memory; the checks at the end keep both within bounds.
+"""
+
+from exampleplugins import SRTChunkListToRIDict, TrieMiner, CompactTrieMiner, TrieSearch
+from trie import Trie, TrieNode, CompactTrie, CompactTrieNode
+from chunker import SRTChunk
+from array import array
+import random, pickle, sys, timeit
+from testhelpers import check, makeChunks
+
+random.seed(0)
+
+letters = "abcdefghijklmnopqrstuvwxyz"
+vocabulary = ["".join(random.choice(letters) for i in range(random.randint(2, 12))) for j in range(6000)]
+
+# one chunk every 3 seconds for an hour, ~8 words per chunk, zipf-ish word choice
+chunks = makeChunks([" ".join(vocabulary[int(len(vocabulary) * random.random() ** 3)] for w in range(8)) for i in range(1200)], 3)
+
+words = SRTChunkListToRIDict().build(chunks)
+
+def deepSize(obj, seen=None):
+	""" Approximate size in bytes of obj and everything it references,
+		not counting the (shared) chunks themselves """
+
+	if seen is None:
+		seen = set()
+
+	if id(obj) in seen or isinstance(obj, SRTChunk):
+		return 0
+	seen.add(id(obj))
+
+	size = sys.getsizeof(obj)
+
+	if isinstance(obj, dict):
+		for key in obj:
+			size += deepSize(key, seen) + deepSize(obj[key], seen)
+	elif isinstance(obj, (list, tuple)):
+		for item in obj:
+			size += deepSize(item, seen)
+	elif hasattr(obj, '__dict__'):
+		size += deepSize(obj.__dict__, seen)
+
+	return size
+
+trie = TrieMiner().build(words)
+ranged = TrieMiner(subtreeRanges=True).build(words)
+compact = CompactTrieMiner().build(words)
+
+print "Vocabulary:", len(words), "words over", len(chunks), "chunks"
+print ""
+
+memory, getNode, search = {}, {}, {}
+
+for name, corpus in (("Trie", trie), ("Trie (subtree ranges)", ranged), ("CompactTrie", compact)):
+	print "###", name
+	memory[name] = deepSize(corpus) / 1024.0
+	print "Memory (excluding chunks): {:.1f} KB".format(memory[name])
+
+	start = timeit.default_timer()
+	data = pickle.dumps(corpus, 2)
+	print "Pickle: {:.1f} KB in {:.1f} ms".format(len(data) / 1024.0, (timeit.default_timer() - start) * 1000)
+
+	# best of several runs, as the timings are compared below
+	lookups = sorted(words)
+	t = min(timeit.repeat(lambda: [corpus.getNode(word) for word in lookups], number=5, repeat=5))
+	getNode[name] = t / (5 * len(lookups)) * 1000000
+	print "getNode: {:.2f} us per lookup".format(getNode[name])
+
+	t = min(timeit.repeat(lambda: TrieSearch().performSearch(corpus, ["a", "th", "mo"]), number=5, repeat=5))
+	search[name] = t / 5 * 1000
+	print "TrieSearch ['a', 'th', 'mo']: {:.2f} ms".format(search[name])
+	print ""
+
+# both tries should give identical search results
+for term in ["a", "b", "zz", vocabulary[0], vocabulary[1][:2]]:
+	expected = TrieSearch().performSearch(trie, [term])
+	assert expected == TrieSearch().performSearch(ranged, [term])
+	assert expected == TrieSearch().performSearch(compact, [term])
+print "Search results match."
+
+print ""
+print "### CompactTrie against Trie:"
+check("  under a tenth of the memory", memory["CompactTrie"] < memory["Trie"] / 10, True)
+check("  getNode at most 5x as slow", getNode["CompactTrie"] < 5 * getNode["Trie"], True)
+check("  TrieSearch at most 2x as slow", search["CompactTrie"] < 2 * search["Trie"], True)
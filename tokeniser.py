@@ -0,0 +1,156 @@
+"""
+    SiaVid - A pluggable, customisable framework for indexing and searching data retrieved and generated from video.
+    Copyright (C) 2018  Gareth Morgan, James Barnden, Antonios Plessas
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from array import array
+from itertools import chain
+import re, unicodedata
+
+class Tokeniser(object):
+	""" Splits text into the normalised words the miners index it under,
+		with one compiled pattern run over the whole text.
+
+		By default a word is a run of ASCII letters and apostrophes, or of
+		digits, and is lowercased.  If unicode is set, letters from any
+		script count, and words are unicode strings.  If fold is set
+		(which implies unicode), accents and compatibility forms are also
+		stripped, so 'Cafe' matches 'caf\\xe9'.
+
+		Search engines normalise query terms with the corpus's own
+		tokeniser (see tokeniserFor()), so they match what was indexed.
+	"""
+
+	def __init__(self, unicode=False, fold=False):
+		self.unicode = unicode or fold
+		self.fold = fold
+		self.folded = {} # word => folded word, as vocabularies are small
+
+		if self.unicode:
+			self.pattern = re.compile(r"(?:[^\W\d_]|')+|\d+", re.UNICODE)
+		else:
+			self.pattern = re.compile(r"[A-Za-z']+|[0-9]+")
+
+	def __reduce__(self):
+		return (Tokeniser, (self.unicode, self.fold))
+
+	def prepare(self, text):
+		""" Returns the lowercased text the pattern is run over """
+
+		if self.unicode and isinstance(text, str):
+			text = text.decode('utf-8', 'replace')
+		return text.lower()
+
+	def foldWord(self, word):
+		""" Strips accents and compatibility forms from a word """
+
+		folded = self.folded.get(word)
+
+		if folded is None:
+			folded = unicodedata.normalize('NFKD', word)
+			folded = u''.join(char for char in folded if not unicodedata.combining(char))
+			self.folded[word] = folded
+		return folded
+
+	def words(self, text):
+		""" Returns the list of normalised words in 'text'.  A word's index
+			in this list is its token position within the text.
+		"""
+
+		words = self.pattern.findall(self.prepare(text))
+
+		if self.fold:
+			words = [self.foldWord(word) for word in words]
+		return words
+
+	def unique(self, text):
+		""" Returns the set of distinct normalised words in 'text' """
+
+		return set(self.words(text))
+
+	def withOffsets(self, text):
+		""" Returns the words words() would, and an array holding the start
+			and end of each within 'text': word i is text[offsets[2i]:
+			offsets[2i+1]] before normalising.
+		"""
+
+		prepared = self.prepare(text)
+
+		matches = list(self.pattern.finditer(prepared))
+		offsets = array('I', chain.from_iterable([match.span() for match in matches]))
+		words = [match.group() for match in matches]
+
+		if self.fold:
+			words = [self.foldWord(word) for word in words]
+		elif type(prepared) is str:
+			# shared with the index's keys rather than a copy per token
+			words = map(intern, words)
+
+		# offsets into the decoded text; chunk text is UTF-8 bytes
+		if self.unicode and isinstance(text, str) and len(prepared) != len(text):
+			offsets = self.byteOffsets(prepared, offsets)
+
+		return words, offsets
+
+	def byteOffsets(self, decoded, offsets):
+		""" Converts offsets into a decoded string to offsets into its
+			UTF-8 encoding """
+
+		converted = array('I')
+		previous = 0
+		length = 0
+
+		for offset in offsets:
+			length += len(decoded[previous:offset].encode('utf-8'))
+			converted.append(length)
+			previous = offset
+
+		return converted
+
+	def normalise(self, word):
+		""" Reduces a search term to the form the miners index it under:
+			its first word, or the whole term if it has none """
+
+		words = self.words(word)
+
+		if words:
+			return words[0]
+		return self.prepare(word)
+
+# the tokeniser used unless a corpus was built with another
+defaultTokeniser = Tokeniser()
+
+def tokeniserFor(corpus):
+	""" Returns the tokeniser a corpus was built with """
+
+	return getattr(corpus, 'tokeniser', None) or defaultTokeniser
+
+def normaliseWord(word):
+	""" Reduces a word to the form the miners index it under """
+	return defaultTokeniser.normalise(word)
+
+def tokenise(text):
+	""" Returns the list of normalised words in 'text' """
+	return defaultTokeniser.words(text)
+
+def tokeniseWithOffsets(text):
+	""" Returns the normalised words in 'text' and their offsets """
+	return defaultTokeniser.withOffsets(text)
+
+def uniqueWords(text):
+	""" Returns the set of distinct normalised words in 'text' """
+	return defaultTokeniser.unique(text)
@@ -16,7 +16,19 @@
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+from reverseindex import ChunkStats, ChunkTokens, Positions, wordPositions
+from tokeniser import defaultTokeniser
+from postings import insertionPoint, locate, mergePoints, splice
+from array import array
+from bisect import bisect_left
+from heapq import nsmallest
+
 class TrieNode:
+	# occurrences and token positions of this word within each chunk in
+	# content, if recorded by a ReverseIndex
+	frequencies = None
+	positions = None
+
 	def __init__(self):
 		self.content = []
 		self.children = {}
@@ -32,6 +44,39 @@ class TrieNode:
 			self.children.pop(index)
 
 class Trie:
+	# flat, depth-first list of node contents, set by indexSubtrees()
+	postings = None
+
+	# whether postings are to be laid out again, by indexSubtrees(), when
+	# next used after addChunks() or removeChunks() discarded them
+	subtreesStale = False
+
+	# number of completions stored on each node, set by indexCompletions()
+	completions = None
+
+	# whether each node's 'count' holds the number of postings in its
+	# subtree, set by indexCounts()
+	counted = False
+
+	# ChunkStats of the indexed chunks, if loaded from a ReverseIndex
+	stats = None
+
+	# ChunkTokens of the indexed chunks, if recorded by a ReverseIndex
+	tokens = None
+
+	# whether stats and tokens are shared with a ReverseIndex or another
+	# trie, so must be copied before they are changed
+	shared = False
+
+	# Tokeniser the indexed chunks were split into words with
+	tokeniser = defaultTokeniser
+
+	# SuffixArray over the whole vocabulary, if built by the miner
+	suffixes = None
+
+	# IntervalIndex of every chunk in the trie, if built by the miner
+	intervals = None
+
 	def __init__(self, root = None):
 		if root is None:
 			self.root = TrieNode()
@@ -42,6 +87,10 @@ class Trie:
 		""" Removes a subtree rooted at node 'target' """
 		result = self.getNode(target[:-1])
 		result.children.pop(target[-1:]) 
+		self.postings = None
+		self.subtreesStale = False
+		self.completions = None
+		self.counted = False
 		
 	def addMissingNodes(self, missing, rootNode):
 		for index in missing:
@@ -66,8 +115,151 @@ class Trie:
 
 		if result is not None:
 			result.addChild(target[-1:], rootNode)
-		
-		
+
+		self.postings = None
+		self.subtreesStale = False
+		self.completions = None
+		self.counted = False
+
+	def indexSubtrees(self):
+		""" Lays out all node contents depth-first in self.postings, and
+			records on each node the [start, end) range of postings
+			covering its whole subtree, so getPostings() is one descent
+			plus one slice.  Modifying the trie discards the index;
+			adding or removing chunks discards it until next used.
+		"""
+
+		postings = []
+
+		# iterative, so long words cannot hit the recursion limit
+		stack = [(self.root, False)]
+		while stack:
+			node, done = stack.pop()
+
+			if done:
+				node.end = len(postings)
+				continue
+
+			node.start = len(postings)
+			postings.extend(node.content)
+
+			stack.append((node, True))
+			for label in node.children:
+				stack.append((node.children[label], False))
+
+		self.postings = postings
+		self.subtreesStale = False
+
+	def indexCounts(self):
+		""" Records on each node the number of postings in its subtree,
+			so the cost of searching for a prefix can be estimated
+			without walking it.  Adding or removing chunks updates the
+			counts along their words; other changes discard them.
+		"""
+
+		stack = [(self.root, False)]
+		while stack:
+			node, done = stack.pop()
+
+			if not done:
+				stack.append((node, True))
+				for child in node.children.itervalues():
+					stack.append((child, False))
+				continue
+
+			node.count = len(node.content)
+			for child in node.children.itervalues():
+				node.count += child.count
+
+		self.counted = True
+
+	def postingCount(self, target):
+		""" Returns the number of postings (which may include duplicates)
+			in the subtree rooted at 'target', 0 if not found, or None if
+			neither indexSubtrees() nor indexCounts() has been run """
+
+		node = self.getNode(target)
+
+		if node is None:
+			return 0
+		if self.subtreesStale:
+			self.indexSubtrees()
+		if self.postings is not None:
+			return node.end - node.start
+		if self.counted:
+			return node.count
+		return None
+
+	def indexCompletions(self, k):
+		""" Records on each node, as a list of (word, number of chunks)
+			pairs, the k words below it found in the most chunks, so
+			complete() is one descent.  A node's list is taken from its
+			own word and its children's lists.  Adding or removing chunks
+			updates the lists along their words; other changes discard
+			the index.
+		"""
+
+		stack = [(self.root, '', False)]
+		while stack:
+			node, word, done = stack.pop()
+
+			if not done:
+				stack.append((node, word, True))
+				for label in node.children:
+					stack.append((node.children[label], word + label, False))
+				continue
+
+			node.completions = nodeCompletions(node, word, k)
+
+		self.completions = k
+
+	def updateIndexes(self, paths):
+		""" Updates the completion lists of the nodes on 'paths' (a dict
+			of word => node for every prefix of the words changed), deepest
+			first, so each is taken from its children's updated lists """
+
+		if self.completions is None:
+			return
+
+		for word in sorted(paths, key=len, reverse=True):
+			paths[word].completions = nodeCompletions(paths[word], word, self.completions)
+
+	def complete(self, prefix, limit):
+		""" Returns up to 'limit' (word, number of chunks) pairs for the
+			words beginning with 'prefix' found in the most chunks """
+
+		node = self.getNode(prefix)
+
+		if node is None:
+			return []
+
+		if self.completions is not None and limit <= self.completions:
+			return node.completions[:limit]
+
+		return walkCompletions(node, prefix, limit)
+
+	def getPostings(self, target):
+		""" Returns the contents of every node in the subtree rooted at
+			'target' (which may contain duplicates), or None if not found
+		"""
+
+		node = self.getNode(target)
+
+		if node is None:
+			return None
+
+		if self.subtreesStale:
+			self.indexSubtrees()
+		if self.postings is not None:
+			return self.postings[node.start:node.end]
+
+		results = []
+		stack = [node]
+		while stack:
+			node = stack.pop()
+			results.extend(node.content)
+			stack.extend(node.children.values())
+		return results
 
 	def getSubtree(self, target):
 		""" Returns trie rooted at node 'target', or None if not found """
@@ -77,21 +269,752 @@ class Trie:
 		if result is None:
 			return result
 		else:
-			return Trie(result)
+			subtree = Trie(result)
+			if self.subtreesStale:
+				self.indexSubtrees()
+			subtree.postings = self.postings
+			subtree.completions = self.completions
+			subtree.counted = self.counted
+			subtree.stats = self.stats
+			subtree.tokens = self.tokens
+			subtree.shared = self.stats is not None or self.tokens is not None
+			subtree.tokeniser = self.tokeniser
+			return subtree
  
 	def getNode(self, target):
 		""" Returns a reference to the node 'target' or None if not found """
 
 		result = self.root
 
-		address = ""
-
 		for step in target:
-			address = address + step
-			if (result.children.has_key(step)):
-				result = result.children[step]
-			else:
-				result = None
+			result = result.children.get(step)
+			if result is None:
 				break
 		return result
-		
+
+	def bulkLoad(self, words):
+		""" Inserts every word in 'words' (a dict of word => list of
+			contents) in a single pass over the sorted vocabulary.
+			Each word descends from the end of its common prefix with
+			the previous word, so only its new nodes are visited.
+			Empty words are ignored.  Word frequencies and positions
+			recorded by a ReverseIndex are kept alongside each word's
+			content.
+		"""
+
+		frequencies = getattr(words, 'frequencies', None)
+		positions = getattr(words, 'positions', None)
+
+		path = [self.root] # path[i] is the node for previous[:i]
+		previous = ''
+
+		for word in sorted(words):
+			if word == '':
+				continue
+
+			# length of the prefix shared with the previous word
+			common = 0
+			limit = min(len(word), len(previous))
+			while common < limit and word[common] == previous[common]:
+				common += 1
+
+			del path[common + 1:]
+			node = path[-1]
+
+			for step in word[common:]:
+				child = node.children.get(step)
+				if child is None:
+					child = TrieNode()
+					node.children[step] = child
+				path.append(child)
+				node = child
+
+			if node.content:
+				# can no longer be kept aligned with content
+				node.frequencies = None
+				node.positions = None
+			else:
+				if frequencies is not None:
+					node.frequencies = frequencies.get(word)
+				if positions is not None:
+					node.positions = positions.get(word)
+
+			node.content.extend(words[word])
+			previous = word
+
+		if self.stats is None:
+			self.stats = getattr(words, 'stats', None)
+			self.shared = self.shared or self.stats is not None
+		if self.tokens is None:
+			self.tokens = getattr(words, 'tokens', None)
+			self.shared = self.shared or self.tokens is not None
+		self.tokeniser = getattr(words, 'tokeniser', self.tokeniser)
+
+		self.postings = None
+		self.subtreesStale = False
+		self.completions = None
+		self.counted = False
+
+	def loadChunks(self, chunks, recordPositions=False):
+		""" Inserts a stream of chunks into an empty trie as they arrive,
+			in a single pass: each word's node is found when the word is
+			first seen, and later chunks containing it are added there,
+			so no word-indexed dict of the whole stream is built first.
+			Frequencies, stats and, if recordPositions is set, positions
+			and tokens are recorded as a ReverseIndex would.  Returns the
+			vocabulary.
+		"""
+
+		tokeniser = self.tokeniser
+		self.stats = ChunkStats()
+		self.tokens = ChunkTokens() if recordPositions else None
+
+		nodes = {} # word => its node
+
+		for chunk in chunks:
+			if recordPositions:
+				words, offsets = tokeniser.withOffsets(chunk.getFullText())
+				self.tokens.add(chunk, words, offsets)
+			else:
+				words = tokeniser.words(chunk.getFullText())
+
+			self.stats.add(chunk, len(words))
+
+			found = wordPositions(words)
+
+			for word in found:
+				node = nodes.get(word)
+
+				if node is None:
+					node = self.root
+					for step in word:
+						child = node.children.get(step)
+						if child is None:
+							child = TrieNode()
+							node.children[step] = child
+						node = child
+
+					nodes[word] = node
+					node.frequencies = array('H')
+					if recordPositions:
+						node.positions = Positions()
+
+				# subtitle cues usually arrive in time order
+				index = insertionPoint(node.content, chunk)
+				node.content.insert(index, chunk)
+
+				if index == len(node.content) - 1:
+					node.frequencies.append(len(found[word]))
+					if recordPositions:
+						node.positions.append(found[word])
+				else:
+					node.frequencies.insert(index, len(found[word]))
+					if recordPositions:
+						node.positions = node.positions.inserted(index, found[word])
+
+		self.postings = None
+		self.subtreesStale = False
+		self.completions = None
+		self.counted = False
+
+		return nodes.keys()
+
+	def addChunks(self, words):
+		""" Adds new chunks, given as a ReverseIndex of just those chunks,
+			inserting each into its words' content in time order.  Word
+			frequencies, positions and chunk lengths are added where the
+			trie records them, and counts and completions are updated
+			along each word.
+		"""
+
+		if not self.root.children:
+			if self.stats is None:
+				self.stats = ChunkStats()
+			if self.tokens is None and words.tokens is not None:
+				self.tokens = ChunkTokens()
+			self.tokeniser = words.tokeniser
+
+		self.unshare()
+
+		paths = {}
+
+		for word in words:
+			if word == '':
+				continue
+
+			added = len(words[word])
+
+			node = self.root
+			path = [node]
+			for step in word:
+				child = node.children.get(step)
+				if child is None:
+					child = TrieNode()
+					child.count = 0
+					node.children[step] = child
+				node = child
+				path.append(node)
+
+			for depth, pathNode in enumerate(path):
+				paths[word[:depth]] = pathNode
+				if self.counted:
+					pathNode.count += added
+
+			if not node.content:
+				node.content = list(words[word])
+				node.frequencies = words.frequencies.get(word)
+				node.positions = None if words.positions is None else words.positions.get(word)
+				continue
+
+			# frequencies and positions may be shared with a ReverseIndex,
+			# so are replaced rather than changed in place
+			frequencies = None
+			if node.frequencies is not None:
+				frequencies = array(node.frequencies.typecode, node.frequencies)
+			positions = node.positions
+
+			for i, chunk in enumerate(words[word]):
+				index = insertionPoint(node.content, chunk)
+				node.content.insert(index, chunk)
+
+				if frequencies is not None:
+					frequencies.insert(index, words.frequencies[word][i])
+				if positions is not None:
+					positions = positions.inserted(index, words.positions[word].get(i))
+
+			node.frequencies = frequencies
+			node.positions = positions
+
+		if self.stats is not None:
+			for chunk, length in words.stats.lengths.iteritems():
+				self.stats.add(chunk, length)
+
+		if self.tokens is not None and words.tokens is not None:
+			for chunk, (chunkWords, offsets) in words.tokens.tokens.iteritems():
+				self.tokens.add(chunk, chunkWords, offsets)
+
+		self.updateIndexes(paths)
+		self.discardSubtrees()
+
+	def removeChunks(self, chunks):
+		""" Removes every reference to the given chunks.  Nodes left empty
+			stay in the trie.  Counts and completions are updated along
+			each word.
+		"""
+
+		self.unshare()
+
+		paths = {}
+
+		for chunk in chunks:
+			if self.stats is not None:
+				self.stats.remove(chunk)
+			if self.tokens is not None:
+				self.tokens.remove(chunk)
+
+			for word in self.tokeniser.unique(chunk.getFullText()):
+				node = self.root
+				path = [node]
+				for step in word:
+					node = node.children.get(step)
+					if node is None:
+						break
+					path.append(node)
+				if node is None:
+					continue
+
+				index = locate(node.content, chunk)[0]
+				if index is None:
+					continue
+
+				del node.content[index]
+
+				for depth, pathNode in enumerate(path):
+					paths[word[:depth]] = pathNode
+					if self.counted:
+						pathNode.count -= 1
+
+				if node.frequencies is not None:
+					frequencies = array(node.frequencies.typecode, node.frequencies)
+					del frequencies[index]
+					node.frequencies = frequencies
+				if node.positions is not None:
+					node.positions = node.positions.removed(index)
+
+		self.updateIndexes(paths)
+		self.discardSubtrees()
+
+	def discardSubtrees(self):
+		""" Discards the postings laid out by indexSubtrees() after chunks
+			are added or removed, to be laid out again when next used """
+
+		if self.postings is not None:
+			self.postings = None
+			self.subtreesStale = True
+
+	def merge(self, other):
+		""" Merges another trie into this one, e.g. to combine the tries
+			of two timelines or of separately indexed segments.
+
+			Both tries are walked together, descending only into nodes
+			found in both: a subtree found in just one is kept or grafted
+			on whole, and each node takes the larger of the two children
+			dicts, so the walk costs at most the size of the smaller trie.
+			The contents of shared nodes are merged as posting lists,
+			without duplicates.  'other' should not be used afterwards,
+			since its nodes become part of this trie.
+		"""
+
+		empty = not self.root.children and not self.root.content
+
+		stack = [(self.root, other.root)]
+		while stack:
+			node, otherNode = stack.pop()
+			mergeContent(node, otherNode)
+
+			children, otherChildren = node.children, otherNode.children
+			if len(children) < len(otherChildren):
+				children, otherChildren = otherChildren, children
+				node.children = children
+
+			for label, child in otherChildren.iteritems():
+				mine = children.get(label)
+				if mine is None:
+					children[label] = child
+				else:
+					stack.append((mine, child))
+
+		if empty:
+			self.stats = other.stats
+			self.tokens = other.tokens
+			self.shared = other.shared
+			self.intervals = other.intervals
+		else:
+			self.stats = mergeStats(self.stats, other.stats)
+			self.tokens = mergeTokens(self.tokens, other.tokens)
+			self.shared = False
+
+			if self.intervals is not None and other.intervals is not None:
+				self.intervals.merge(other.intervals)
+			else:
+				self.intervals = None
+
+		# the vocabulary has changed
+		self.suffixes = None
+		self.postings = None
+		self.subtreesStale = False
+		self.completions = None
+		self.counted = False
+
+	def unshare(self):
+		""" Copies stats and tokens shared with a ReverseIndex or another
+			trie, before they are changed """
+
+		if self.shared:
+			if self.stats is not None:
+				self.stats = self.stats.copy()
+			if self.tokens is not None:
+				self.tokens = self.tokens.copy()
+			self.shared = False
+
+def completionKey(completion):
+	""" Orders (word, count) pairs most chunks first, then alphabetically """
+	return (-completion[1], completion[0])
+
+def nodeCompletions(node, word, k):
+	""" Returns the k (word, number of chunks) pairs found in the most
+		chunks among a node's own word and its children's completions """
+
+	candidates = []
+	if node.content:
+		candidates.append((word, len(node.content)))
+	for child in node.children.itervalues():
+		candidates.extend(child.completions)
+
+	return nsmallest(k, candidates, key=completionKey)
+
+def walkCompletions(node, prefix, limit):
+	""" Returns up to 'limit' (word, number of chunks) pairs for the words
+		in the subtree of 'node' (the node for 'prefix') found in the most
+		chunks, by walking the whole subtree """
+
+	candidates = []
+	stack = [(node, prefix)]
+	while stack:
+		node, word = stack.pop()
+		if node.content:
+			candidates.append((word, len(node.content)))
+		for label, child in node.children.iteritems():
+			stack.append((child, word + label))
+
+	return nsmallest(limit, candidates, key=completionKey)
+
+def completions(corpus, prefix, limit):
+	""" Returns up to 'limit' (word, number of chunks) pairs for the words
+		in any trie or reverse-indexed dict beginning with 'prefix' """
+
+	if hasattr(corpus, 'complete'):
+		return corpus.complete(prefix, limit)
+
+	if isinstance(corpus, dict):
+		candidates = [(word, len(corpus[word])) for word in corpus if word.startswith(prefix) and corpus[word]]
+		return nsmallest(limit, candidates, key=completionKey)
+
+	node = corpus.getNode(prefix)
+	if node is None:
+		return []
+	return walkCompletions(node, prefix, limit)
+
+def mergeContent(node, other):
+	""" Merges the content of trie node 'other' into 'node', keeping
+		frequencies and positions only if both nodes have them """
+
+	if not other.content:
+		return
+
+	if not node.content:
+		node.content = other.content
+		node.frequencies = other.frequencies
+		node.positions = other.positions
+		return
+
+	# merge the shorter list into the longer
+	content, frequencies, positions = node.content, node.frequencies, node.positions
+	if len(content) < len(other.content):
+		content, frequencies, positions, other = other.content, other.frequencies, other.positions, node
+
+	points = mergePoints(content, other.content)
+
+	node.content = splice(content, points, other.content)
+
+	if frequencies is None or other.frequencies is None:
+		node.frequencies = None
+	else:
+		node.frequencies = splice(frequencies, points, other.frequencies)
+
+	if positions is None or other.positions is None:
+		node.positions = None
+	else:
+		node.positions = positions.spliced(points, other.positions)
+
+def mergeStats(stats, other):
+	""" Returns new ChunkStats covering the chunks of both, or None if
+		either is missing.  Tries share stats with their ReverseIndex, so
+		neither is changed. """
+
+	if stats is None or other is None:
+		return None
+
+	if len(stats.lengths) < len(other.lengths):
+		stats, other = other, stats
+
+	merged = ChunkStats()
+	merged.lengths = dict(stats.lengths)
+	merged.total = stats.total
+	for chunk, length in other.lengths.iteritems():
+		merged.add(chunk, length)
+	return merged
+
+def mergeTokens(tokens, other):
+	""" Returns new ChunkTokens covering the chunks of both, or None if
+		either is missing """
+
+	if tokens is None or other is None:
+		return None
+
+	merged = ChunkTokens()
+	merged.tokens = dict(tokens.tokens)
+	merged.tokens.update(other.tokens)
+	return merged
+
+class FlatFrequencies(object):
+	""" Node index => word frequencies of a CompactTrie, held in one array
+		in step with its postings rather than one array per node """
+
+	def __init__(self, frequencies, trie):
+		self.frequencies = frequencies
+		self.trie = trie
+
+	def __getstate__(self):
+		frequencies = self.frequencies
+		if isinstance(frequencies, array):
+			frequencies = (frequencies.typecode, frequencies.tostring())
+		return frequencies, self.trie
+
+	def __setstate__(self, state):
+		frequencies, self.trie = state
+		if isinstance(frequencies, tuple):
+			frequencies = array(*frequencies)
+		self.frequencies = frequencies
+
+	def get(self, index, default=None):
+		trie = self.trie
+		return self.frequencies[trie.contentStart[index]:trie.contentEnd[index]]
+
+class CompactTrieNode(object):
+	""" Lightweight view of a single node in a CompactTrie, exposing the
+		same 'content' and 'children' attributes as a TrieNode """
+
+	__slots__ = ('trie', 'index')
+
+	def __init__(self, trie, index):
+		self.trie = trie
+		self.index = index
+
+	@property
+	def content(self):
+		trie = self.trie
+		return trie.postings[trie.contentStart[self.index]:trie.contentEnd[self.index]]
+
+	@property
+	def frequencies(self):
+		return self.trie.frequencies.get(self.index)
+
+	@property
+	def positions(self):
+		return self.trie.positions.get(self.index)
+
+	@property
+	def children(self):
+		trie = self.trie
+		first = trie.firstChild[self.index]
+		children = {}
+
+		for child in range(first, first + trie.childCount[self.index]):
+			children[trie.labels[child]] = CompactTrieNode(trie, child)
+
+		return children
+
+class CompactTrie(object):
+	""" Read-only trie held in flat arrays rather than one TrieNode and one
+		dict per character.
+
+		Nodes are numbered breadth-first, so the children of a node occupy
+		a contiguous run of indices sorted by their edge label and can be
+		found by binary search over 'labels'.  Node contents are stored in
+		one flat 'postings' list, laid out depth-first, with word
+		frequencies in step with it.
+
+		It takes about a twentieth of the memory of a Trie, and pickles
+		several times faster, but each step of a lookup reads two arrays
+		and bisects the labels where a Trie does one dict lookup, so
+		getNode() takes two to four times as long (see
+		test/triecomparison.py).  Searches that read postings, such as
+		TrieSearch, take about as long as on a Trie.
+	"""
+
+	# number of completions stored for each node, if the trie had them
+	completions = None
+
+	tokeniser = defaultTokeniser
+
+	arrays = ('firstChild', 'childCount', 'contentStart', 'contentEnd', 'subtreeEnd', 'completionStart', 'completionCounts')
+
+	def __init__(self, trie=None):
+		""" Builds a compact copy of the given Trie (or an empty trie) """
+
+		self.rootIndex = 0
+
+		if trie is None:
+			trie = Trie()
+
+		# number nodes breadth-first, children sorted by label
+		order = [trie.root]
+		labels = ['\0'] # placeholder label for the root
+		self.firstChild = array('i')
+		self.childCount = array('i')
+
+		for node in order:
+			self.firstChild.append(len(order))
+			self.childCount.append(len(node.children))
+			for label in sorted(node.children):
+				labels.append(label)
+				order.append(node.children[label])
+
+		try:
+			self.labels = ''.join(labels)
+		except UnicodeDecodeError:
+			# mixed byte and unicode labels; bisect works on a list too
+			self.labels = labels
+
+		# lay out contents depth-first
+		indices = dict((id(node), index) for index, node in enumerate(order))
+		self.postings = []
+		self.stats = trie.stats
+		self.tokens = trie.tokens
+		self.tokeniser = trie.tokeniser
+		self.suffixes = trie.suffixes
+		self.intervals = trie.intervals
+
+		# node index => word frequencies and token positions, where recorded
+		frequencies = {}
+		self.positions = {}
+		self.contentStart = array('i', [0] * len(order))
+		self.contentEnd = array('i', [0] * len(order))
+
+		stack = [trie.root]
+		while stack:
+			node = stack.pop()
+			index = indices[id(node)]
+
+			self.contentStart[index] = len(self.postings)
+			self.postings.extend(node.content)
+			self.contentEnd[index] = len(self.postings)
+
+			if node.frequencies is not None:
+				frequencies[index] = node.frequencies
+			if node.positions is not None:
+				self.positions[index] = node.positions
+
+			for label in sorted(node.children, reverse=True):
+				stack.append(node.children[label])
+
+		self.frequencies = self.flattenFrequencies(frequencies)
+
+		# each node's completions, as completionWords[completionStart[i]:
+		# completionStart[i + 1]] with their counts in completionCounts
+		if trie.completions is not None:
+			self.completions = trie.completions
+			self.completionStart = array('i', [0])
+			self.completionWords = []
+			self.completionCounts = array('i')
+
+			for node in order:
+				for word, count in node.completions:
+					self.completionWords.append(word)
+					self.completionCounts.append(count)
+				self.completionStart.append(len(self.completionWords))
+
+		# children have higher indices than their parents, and the last
+		# child's subtree is the last part of its parent's subtree
+		self.subtreeEnd = array('i', self.contentEnd)
+		for index in reversed(range(len(order))):
+			if self.childCount[index]:
+				lastChild = self.firstChild[index] + self.childCount[index] - 1
+				self.subtreeEnd[index] = self.subtreeEnd[lastChild]
+
+	def __getstate__(self):
+		""" Pickles arrays as raw bytes rather than lists of ints """
+
+		state = self.__dict__.copy()
+		for key in self.arrays:
+			if key in state:
+				state[key] = (state[key].typecode, state[key].tostring())
+		return state
+
+	def __setstate__(self, state):
+		for key in self.arrays:
+			if key in state:
+				state[key] = array(*state[key])
+		self.__dict__.update(state)
+
+	def flattenFrequencies(self, frequencies):
+		""" Returns the word frequencies of every node as a FlatFrequencies
+			in step with the postings, or the dict of node index =>
+			frequencies if some node's are not recorded """
+
+		flat = array('H', [0]) * len(self.postings)
+
+		for index in range(len(self.contentStart)):
+			start, end = self.contentStart[index], self.contentEnd[index]
+			if start == end:
+				continue
+
+			found = frequencies.get(index)
+			if found is None or len(found) != end - start:
+				return frequencies
+			flat[start:end] = array('H', found)
+
+		return FlatFrequencies(flat, self)
+
+	def findChild(self, index, label):
+		""" Returns the index of the child of node 'index' reached by
+			'label', or None if there is no such child """
+
+		first = self.firstChild[index]
+		last = first + self.childCount[index]
+
+		child = bisect_left(self.labels, label, first, last)
+		if child < last and self.labels[child] == label:
+			return child
+		return None
+
+	def getIndex(self, target):
+		""" Returns the index of the node 'target' or None if not found """
+
+		# findChild inlined, as this is the hot path for every lookup
+		labels, firstChild, childCount = self.labels, self.firstChild, self.childCount
+		index = self.rootIndex
+
+		for step in target:
+			first = firstChild[index]
+			last = first + childCount[index]
+			index = bisect_left(labels, step, first, last)
+			if index == last or labels[index] != step:
+				return None
+		return index
+
+	def getSubtree(self, target):
+		""" Returns trie rooted at node 'target', or None if not found """
+
+		index = self.getIndex(target)
+
+		if index is None:
+			return None
+
+		# shares the underlying arrays with this trie
+		subtree = CompactTrie.__new__(CompactTrie)
+		subtree.__dict__.update(self.__dict__)
+		subtree.rootIndex = index
+		subtree.suffixes = None # covers words outside the subtree
+		return subtree
+
+	def postingCount(self, target):
+		""" Returns the number of postings (which may include duplicates)
+			in the subtree rooted at 'target', or 0 if not found """
+
+		index = self.getIndex(target)
+
+		if index is None:
+			return 0
+		return self.subtreeEnd[index] - self.contentStart[index]
+
+	def complete(self, prefix, limit):
+		""" Returns up to 'limit' (word, number of chunks) pairs for the
+			words beginning with 'prefix' found in the most chunks """
+
+		index = self.getIndex(prefix)
+
+		if index is None:
+			return []
+
+		if self.completions is None or limit > self.completions:
+			return walkCompletions(CompactTrieNode(self, index), prefix, limit)
+
+		start = self.completionStart[index]
+		end = min(self.completionStart[index + 1], start + limit)
+		return zip(self.completionWords[start:end], self.completionCounts[start:end])
+
+	def getPostings(self, target):
+		""" Returns the contents of every node in the subtree rooted at
+			'target' (which may contain duplicates), or None if not found
+		"""
+
+		index = self.getIndex(target)
+
+		if index is None:
+			return None
+		return self.postings[self.contentStart[index]:self.subtreeEnd[index]]
+
+	def getNode(self, target):
+		""" Returns a view of the node 'target' or None if not found """
+
+		index = self.getIndex(target)
+
+		if index is None:
+			return None
+		return CompactTrieNode(self, index)
+
+	@property
+	def root(self):
+		return CompactTrieNode(self, self.rootIndex)